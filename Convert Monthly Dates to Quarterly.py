@@ -1,15 +1,15 @@
 import pandas as pd
 
+from period_keys import format_quarters, month_keys, quarter_keys_from_months
+
 # Read the CSV file
 df = pd.read_csv('Primary_CallReports_v1.5.csv')
 
-# Convert 'Year&Month' to datetime
-df['Year&Month'] = pd.to_datetime(df['Year&Month'], format='%y-%b')
+# Integer month keys for 'Year&Month' ('YY-Mon' or 'YYYY-MM'), parsed once per distinct month
+months = month_keys(df['Year&Month'])
 
-# Create new column with 'YYYY Q#' format
-df['Quarter'] = df['Year&Month'].dt.year.astype(str) + ' Q' + df['Year&Month'].dt.quarter.astype(str)
+# Create new column with 'YYYY Q#' format (each quarter label is built once)
+df['Quarter'] = format_quarters(quarter_keys_from_months(months))
 
 # Save the result to a new CSV
 df.to_csv('test.csv', index=False)
-
-
@@ -1,17 +1,12 @@
-import pandas as pd
+import os
 
-# Load the merged dataset
-df = pd.read_csv('Primary_CallReports_v1.7.csv')
+from call_cube import load_or_build_cube
 
-# Group by Year&Month and Quarter to count calls per month
-monthly_calls = df.groupby(['Year&Month', 'Quarter'])['CallReportNum'].count().reset_index()
-monthly_calls.rename(columns={'CallReportNum': 'TotalCalls'}, inplace=True)
+# Load the pre-aggregated call counts (built once from the CSV, then reused)
+cube = load_or_build_cube('Primary_CallReports_v1.7.csv')
 
-# Keep only unique Quarter-to-OpiodEMSResponsesAB mapping
-opioid_by_quarter = df[['Quarter', 'QuarterlyOpioidEMSResponsesAB']].drop_duplicates()
-
-# Merge the call counts with opioid data
-monthly_data = pd.merge(monthly_calls, opioid_by_quarter, on='Quarter', how='left')
+# Calls per month and quarter, with the opioid EMS responses for each quarter
+monthly_data = cube.monthly(['QuarterlyOpioidEMSResponsesAB'], by_quarter=True)
 
 # Check correlation
 correlation = monthly_data['TotalCalls'].corr(monthly_data['QuarterlyOpioidEMSResponsesAB'])
@@ -20,13 +15,15 @@ correlation = monthly_data['TotalCalls'].corr(monthly_data['QuarterlyOpioidEMSRe
 print(monthly_data)
 print(f"\nCorrelation between monthly total calls and quarterly opioid EMS responses: {correlation:.4f}")
 
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-sns.scatterplot(x='QuarterlyOpioidEMSResponsesAB', y='TotalCalls', data=monthly_data)
-plt.title('Monthly Call Volume vs Quarterly Opioid EMS Responses')
-plt.xlabel('Quarterly Opioid EMS Responses (AB)')
-plt.ylabel('Monthly Total Calls')
-plt.grid(True)
-plt.tight_layout()
-plt.show()
+# Plotting libraries are only imported when a plot is wanted (cli.py --no-plot skips them)
+if not os.environ.get('DATATHON_NO_PLOT'):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    sns.scatterplot(x='QuarterlyOpioidEMSResponsesAB', y='TotalCalls', data=monthly_data)
+    plt.title('Monthly Call Volume vs Quarterly Opioid EMS Responses')
+    plt.xlabel('Quarterly Opioid EMS Responses (AB)')
+    plt.ylabel('Monthly Total Calls')
+    plt.grid(True)
+    plt.tight_layout()
+    plt.show()
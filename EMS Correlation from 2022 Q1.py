@@ -1,22 +1,17 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import os
 
-# Load the merged dataset
-df = pd.read_csv('Primary_CallReports_v1.7.csv')
+from call_cube import load_or_build_cube
+from period_keys import parse_quarter, quarter_keys
 
-# Filter to include only data from 2022 Q1 onwards
-df = df[df['Quarter'] >= '2022 Q1']
+# Load the pre-aggregated call counts (built once from the CSV, then reused)
+cube = load_or_build_cube('Primary_CallReports_v1.7.csv')
 
-# Group by Year&Month and Quarter to count calls per month
-monthly_calls = df.groupby(['Year&Month', 'Quarter'])['CallReportNum'].count().reset_index()
-monthly_calls.rename(columns={'CallReportNum': 'TotalCalls'}, inplace=True)
+# Calls per month and quarter, with the opioid EMS responses for each quarter
+monthly_data = cube.monthly(['QuarterlyOpioidEMSResponsesAB'], by_quarter=True)
 
-# Get unique values for opioid responses per quarter
-opioid_by_quarter = df[['Quarter', 'QuarterlyOpioidEMSResponsesAB']].drop_duplicates()
-
-# Merge the grouped calls with the opioid EMS responses
-monthly_data = pd.merge(monthly_calls, opioid_by_quarter, on='Quarter', how='left')
+# Filter to include only data from 2022 Q1 onwards (integer quarter keys, not string order)
+monthly_data = monthly_data[quarter_keys(monthly_data['Quarter']) >= parse_quarter('2022 Q1')] \
+    .reset_index(drop=True)
 
 # Calculate correlation
 correlation = monthly_data['TotalCalls'].corr(monthly_data['QuarterlyOpioidEMSResponsesAB'])
@@ -25,11 +20,15 @@ correlation = monthly_data['TotalCalls'].corr(monthly_data['QuarterlyOpioidEMSRe
 print(monthly_data)
 print(f"\nCorrelation between monthly total calls and quarterly opioid EMS responses (2022 Q1+): {correlation:.4f}")
 
-# Optional: plot the relationship
-sns.scatterplot(x='QuarterlyOpioidEMSResponsesAB', y='TotalCalls', data=monthly_data)
-plt.title('Monthly Call Volume vs Quarterly Opioid EMS Responses (2022 Q1+)')
-plt.xlabel('Quarterly Opioid EMS Responses (AB)')
-plt.ylabel('Monthly Total Calls')
-plt.grid(True)
-plt.tight_layout()
-plt.show()
+# Optional: plot the relationship (cli.py --no-plot skips it and the plotting imports)
+if not os.environ.get('DATATHON_NO_PLOT'):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    sns.scatterplot(x='QuarterlyOpioidEMSResponsesAB', y='TotalCalls', data=monthly_data)
+    plt.title('Monthly Call Volume vs Quarterly Opioid EMS Responses (2022 Q1+)')
+    plt.xlabel('Quarterly Opioid EMS Responses (AB)')
+    plt.ylabel('Monthly Total Calls')
+    plt.grid(True)
+    plt.tight_layout()
+    plt.show()
@@ -1,9 +1,10 @@
 import openmeteo_requests
 import requests_cache
-import pandas as pd
 from retry_requests import retry
 import os
 
+from weather_decode import decode_responses, to_pandas, write_weather
+
 # Setup the Open-Meteo API client with cache and retry on error
 cache_session = requests_cache.CachedSession('.cache', expire_after=-1)
 retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
@@ -33,35 +34,14 @@ print(f"Elevation {response.Elevation()} m asl")
 print(f"Timezone {response.Timezone()} {response.TimezoneAbbreviation()}")
 print(f"Timezone difference to GMT+0 {response.UtcOffsetSeconds()} s")
 
-# Process daily data
-daily = response.Daily()
-daily_temperature_2m_max = daily.Variables(0).ValuesAsNumpy()
-daily_temperature_2m_min = daily.Variables(1).ValuesAsNumpy()
-daily_rain_sum = daily.Variables(2).ValuesAsNumpy()
-daily_precipitation_hours = daily.Variables(3).ValuesAsNumpy()
-daily_daylight_duration = daily.Variables(4).ValuesAsNumpy()
-daily_sunshine_duration = daily.Variables(5).ValuesAsNumpy()
-
-daily_data = {"date": pd.date_range(
-    start=pd.to_datetime(daily.Time(), unit="s", utc=True),
-    end=pd.to_datetime(daily.TimeEnd(), unit="s", utc=True),
-    freq=pd.Timedelta(seconds=daily.Interval()),
-    inclusive="left"
-)}
-
-daily_data["temperature_2m_max"] = daily_temperature_2m_max
-daily_data["temperature_2m_min"] = daily_temperature_2m_min
-daily_data["rain_sum"] = daily_rain_sum
-daily_data["precipitation_hours"] = daily_precipitation_hours
-daily_data["daylight_duration"] = daily_daylight_duration
-daily_data["sunshine_duration"] = daily_sunshine_duration
-
-daily_dataframe = pd.DataFrame(data=daily_data)
+# Decode all daily variables straight into one columnar table (no per-variable
+# arrays, no dict/DataFrame copies)
+daily_table = decode_responses(responses, params["daily"], names=["Edmonton"])
 print("\nDaily data sample:")
-print(daily_dataframe.head())
+print(to_pandas(daily_table.slice(0, 5)))
 
-# Save to CSV file in the project folder
-daily_csv_path = os.path.join(os.getcwd(), "edmonton_daily_weather.csv")
-daily_dataframe.to_csv(daily_csv_path, index=False)
+# Save to a Parquet file in the project folder
+daily_path = os.path.join(os.getcwd(), "edmonton_daily_weather.parquet")
+write_weather(daily_table, daily_path)
 
-print(f"\nDaily weather data saved to: {daily_csv_path}")
+print(f"\nDaily weather data saved to: {daily_path}")
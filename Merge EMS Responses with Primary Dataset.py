@@ -1,17 +1,23 @@
 import pandas as pd
 
-# Load the datasets
+from dimension_join import DimensionJoiner, ems_dimension
+from period_keys import quarter_keys_from_labels
+
+# Load the call reports and register the opioid EMS table as a quarterly dimension
+# (column QuarterlyOpioidEMSResponsesAB, the name the pipeline and the cube use)
 primary_df = pd.read_csv('Primary_CallReports_v1.6.csv')
-opioid_df = pd.read_csv('OpiodEMSResponsesAlberta.csv')
+joiner = DimensionJoiner()
+joiner.register(ems_dimension('OpiodEMSResponsesAlberta.csv'))
 
-# Select only relevant columns and rename for clarity
-opioid_df = opioid_df[['Year_Quarter', 'Value']].rename(columns={'Year_Quarter': 'Quarter', 'Value': 'OpiodEMSResponsesAB'})
+# Integer quarter key from the 'YYYY Q#' label
+primary_df['quarter_key'] = quarter_keys_from_labels(primary_df['Quarter'])
 
-# Merge on 'Quarter' with a left join
-merged_df = pd.merge(primary_df, opioid_df, on='Quarter', how='left')
+# Attach the EMS responses by direct lookup on the quarter key
+joiner.attach(primary_df)
 
-# Save the output as version 1.7
-merged_df.to_csv('Primary_CallReports_v1.7.csv', index=False)
+# Save the output as version 1.7 (without the integer key)
+primary_df.to_csv('Primary_CallReports_v1.7.csv', index=False,
+                  columns=[c for c in primary_df.columns if c != 'quarter_key'])
 
 # Preview a few rows
-print(merged_df.head())
+print(primary_df.head())
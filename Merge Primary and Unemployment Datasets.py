@@ -1,19 +1,21 @@
 import pandas as pd
 
-# Load both CSVs
-calls_df = pd.read_csv("Primary_CallReports_v1.3.csv")
-unemp_df = pd.read_csv("Unemployment_Rate_Alberta_Cleaned.csv")
+from datetime_parsing import month_labels
+from dimension_join import KEY_COLUMNS, add_join_keys, exogenous_joiner
 
-# Create a new column for join key in calls_df
-calls_df["Year&Month"] = calls_df["CallDateAndTimeStart"].astype(str).str[:7].str.strip()
+# Load the call reports and register the unemployment table as a dimension
+calls_df = pd.read_csv("Primary_CallReports_v1.3.csv")
+joiner = exogenous_joiner(unemployment_csv="Unemployment_Rate_Alberta_Cleaned.csv")
 
-# Rename columns in the unemployment DataFrame
-unemp_df.rename(columns={"Date": "Year&Month", "Value": "AlbertaUnemploymentRate"}, inplace=True)
+# Create integer join keys (each distinct timestamp is parsed once)
+add_join_keys(calls_df)
+calls_df["Year&Month"] = month_labels(calls_df["month_key"])
 
-# Perform left join
-merged_df = pd.merge(calls_df, unemp_df, on="Year&Month", how="left")
+# Attach AlbertaUnemploymentRate by direct lookup on the month key
+joiner.attach(calls_df)
 
-# Save to new version
-merged_df.to_csv("Primary_CallReports_v1.4.csv", index=False)
+# Save to new version (without the integer keys)
+calls_df.to_csv("Primary_CallReports_v1.4.csv", index=False,
+                columns=[c for c in calls_df.columns if c not in KEY_COLUMNS])
 
 print("✅ Merged file saved as 'Primary_CallReports_v1.4.csv'")
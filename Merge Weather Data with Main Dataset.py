@@ -1,18 +1,19 @@
 import pandas as pd
 
-# Load the datasets
-calls_df = pd.read_csv('Primary_CallReports_v1.4.csv')
-weather_df = pd.read_csv('edmonton_daily_weather.csv')
+from dimension_join import KEY_COLUMNS, add_join_keys, exogenous_joiner
+from weather_decode import find_weather
 
-# Convert date columns to string and extract the first 10 characters (assumed to be YYYY-MM-DD)
-calls_df['date_key'] = calls_df['CallDateAndTimeStart'].astype(str).str[:10]
-weather_df['date_key'] = weather_df['date'].astype(str).str[:10]
+# Load the call reports and register the daily weather as a dimension
+calls_df = pd.read_csv('Primary_CallReports_v1.4.csv')
+# (edmonton_daily_weather.parquet, or the CSV written by older versions of the API script)
+joiner = exogenous_joiner(weather_csv=find_weather())
 
-# Merge datasets, retaining all rows from calls_df (left join)
-merged_df = pd.merge(calls_df, weather_df, on='date_key', how='left')
+# Create integer join keys (day_key = days since 1970-01-01)
+add_join_keys(calls_df)
 
-# Drop the join key if not needed
-merged_df.drop(columns=['date_key'], inplace=True)
+# Attach the weather columns by direct lookup on the day key
+joiner.attach(calls_df)
 
-# Export the result to CSV
-merged_df.to_csv('test.csv', index=False)
+# Export the result to CSV (without the integer keys)
+calls_df.to_csv('test.csv', index=False,
+                columns=[c for c in calls_df.columns if c not in KEY_COLUMNS])
@@ -1,16 +1,20 @@
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+import os
+
+from call_cube import load_or_build_cube
 
-# Load your data
-df = pd.read_csv("Primary_CallReports_v1.4.csv")
+# Load the pre-aggregated call counts (built once from the CSV, then reused)
+cube = load_or_build_cube("Primary_CallReports_v1.4.csv")
 
-# Group by Year&Month and calculate total calls per month
-monthly_calls = df.groupby("Year&Month").size().reset_index(name="TotalCalls")
+# Total calls per month with the unemployment rate for each month
+combined = cube.monthly(["AlbertaUnemploymentRate"])
 
-# Merge with unemployment rate (assuming it’s constant per month in the dataset)
-monthly_rates = df[["Year&Month", "AlbertaUnemploymentRate"]].drop_duplicates()
-combined = pd.merge(monthly_calls, monthly_rates, on="Year&Month")
+# Without plotting (cli.py --no-plot), print the plotted values instead
+if os.environ.get('DATATHON_NO_PLOT'):
+    print(combined)
+    raise SystemExit(0)
+
+import seaborn as sns
+import matplotlib.pyplot as plt
 
 # Plot
 plt.figure(figsize=(10, 6))
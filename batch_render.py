@@ -0,0 +1,252 @@
+"""
+Mental Health Datathon - Headless Batch Chart Rendering
+=======================================================
+
+Renders many charts without a display. Each chart is described by a spec
+(a dict, or an entry of a JSON spec file); the data for every spec is taken
+from the pre-aggregated call volume cube in the main process, and the small
+resulting tables are rendered in parallel by a process pool using the
+non-interactive Agg backend. Each spec is drawn once and saved once per
+requested format. A manifest.json listing every file is written next to the
+charts.
+
+Spec keys:
+----------
+name      : output file stem (required)
+kind      : 'distribution' (bar chart of call counts) or 'scatter'
+dimension : for distributions, one of Year, MonthName, Day, Hour, DayOfWeek
+x         : for scatters, the covariate column (y is TotalCalls)
+regression: for scatters, draw a regression line (default False)
+start/end : optional inclusive month ('2022-01') or quarter ('2022 Q1') labels
+title     : chart title
+formats   : list of 'png' / 'svg' (default ['png'])
+
+Usage:
+------
+    python batch_render.py Primary_CallReports_v1.7.csv --output charts/ [--specs specs.json]
+
+Author: [Mike Baran]
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from call_cube import load_or_build_cube
+from correlation import monthly_series
+from datetime_parsing import parse_year_month
+from resampling import filter_period, month_bounds
+from schema import DAY_ORDER, MONTH_ORDER
+
+logger = logging.getLogger(__name__)
+
+DIMENSION_LABELS = {
+    'Year': 'Year',
+    'MonthName': 'Month Name',
+    'Day': 'Day of Month',
+    'Hour': 'Hour of Day',
+    'DayOfWeek': 'Day of Week',
+}
+
+COVARIATE_LABELS = {
+    'AlbertaUnemploymentRate': 'Alberta Unemployment Rate (%)',
+    'QuarterlyOpioidEMSResponsesAB': 'Quarterly Opioid EMS Responses (AB)',
+}
+
+
+def default_specs(start=None, end=None, formats=('png',)):
+    """Distribution charts plus the unemployment and EMS scatters for one period."""
+    suffix = ''.join(f"_{label}".replace(' ', '') for label in (start, end) if label)
+    specs = [{'name': f"calls_by_{dimension}{suffix}", 'kind': 'distribution',
+              'dimension': dimension, 'title': f"Call Distribution by {label}"}
+             for dimension, label in DIMENSION_LABELS.items()]
+    specs.append({'name': f"unemployment_vs_calls{suffix}", 'kind': 'scatter',
+                  'x': 'AlbertaUnemploymentRate', 'regression': True,
+                  'title': 'Unemployment Rate vs Total Distress Line Calls per Month'})
+    specs.append({'name': f"ems_vs_calls{suffix}", 'kind': 'scatter',
+                  'x': 'QuarterlyOpioidEMSResponsesAB',
+                  'title': 'Monthly Call Volume vs Quarterly Opioid EMS Responses'})
+    for spec in specs:
+        spec.update(start=start, end=end, formats=list(formats))
+    return specs
+
+
+def _distribution_data(cube, spec):
+    """Call counts per value of the spec's dimension, in natural order."""
+    counts = cube.counts
+    if spec.get('start') or spec.get('end'):
+        months = parse_year_month(counts['Year&Month'])
+        keep = months.notna()
+        if spec.get('start'):
+            keep &= months >= month_bounds(spec['start'])[0]
+        if spec.get('end'):
+            keep &= months <= month_bounds(spec['end'])[1]
+        counts = counts[keep]
+
+    dimension = spec['dimension']
+    if dimension == 'Year':
+        keys = counts['Date'].dt.year
+    elif dimension == 'MonthName':
+        keys = counts['Date'].dt.month_name()
+    elif dimension == 'Day':
+        keys = counts['Date'].dt.day
+    elif dimension in ('Hour', 'DayOfWeek'):
+        keys = counts[dimension]
+    else:
+        raise ValueError(f"Unknown distribution dimension '{dimension}'")
+
+    totals = counts['Calls'].groupby(keys.to_numpy()).sum()
+    if dimension == 'MonthName':
+        totals = totals.reindex(MONTH_ORDER, fill_value=0)
+    elif dimension == 'DayOfWeek':
+        totals = totals.reindex(DAY_ORDER, fill_value=0)
+    else:
+        totals = totals.sort_index()
+    return pd.DataFrame({dimension: totals.index, 'TotalCalls': totals.to_numpy()})
+
+
+def _scatter_data(monthly, spec):
+    frame = filter_period(monthly, spec.get('start'), spec.get('end'))
+    return frame[[spec['x'], 'TotalCalls']].dropna().reset_index(drop=True)
+
+
+def render_chart(spec, data, output_dir):
+    """
+    Draw one chart and save it once per format (runs in a worker process).
+
+    Returns:
+    --------
+    dict
+        Manifest entry for the chart
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    started = time.perf_counter()
+    plt.style.use('ggplot')
+    sns.set_palette("viridis")
+
+    if spec['kind'] == 'distribution':
+        dimension = spec['dimension']
+        fig, ax = plt.subplots(figsize=(10, 6))
+        sns.barplot(x=data[dimension].astype(str), y=data['TotalCalls'], ax=ax)
+        ax.set_xlabel(DIMENSION_LABELS.get(dimension, dimension), fontsize=12)
+        ax.set_ylabel('Number of Calls', fontsize=12)
+        if dimension in ('MonthName', 'DayOfWeek'):
+            ax.tick_params(axis='x', rotation=45)
+    elif spec['kind'] == 'scatter':
+        fig, ax = plt.subplots(figsize=(10, 6))
+        if spec.get('regression'):
+            sns.regplot(data=data, x=spec['x'], y='TotalCalls', ci=None,
+                        scatter_kws={"s": 50}, ax=ax)
+        else:
+            sns.scatterplot(data=data, x=spec['x'], y='TotalCalls', ax=ax)
+        ax.set_xlabel(COVARIATE_LABELS.get(spec['x'], spec['x']))
+        ax.set_ylabel('Monthly Total Calls')
+        ax.grid(True)
+    else:
+        raise ValueError(f"Unknown chart kind '{spec['kind']}'")
+
+    ax.set_title(spec.get('title', spec['name']), fontsize=16)
+    fig.tight_layout()
+
+    files = []
+    for fmt in spec.get('formats', ['png']):
+        path = os.path.join(output_dir, f"{spec['name']}.{fmt}")
+        fig.savefig(path, dpi=300 if fmt == 'png' else None)
+        files.append(os.path.basename(path))
+    plt.close(fig)
+
+    return {'name': spec['name'], 'kind': spec['kind'], 'files': files,
+            'rows': len(data), 'start': spec.get('start'), 'end': spec.get('end'),
+            'seconds': round(time.perf_counter() - started, 3)}
+
+
+def render_batch(cube, specs, output_dir, max_workers=None):
+    """
+    Render every spec into output_dir and write manifest.json.
+
+    Parameters:
+    -----------
+    cube : CallCube
+        Source of the aggregated counts
+    specs : list of dict
+        Chart specs (see module docstring); names must be unique
+    output_dir : str
+        Destination folder
+    max_workers : int, optional
+        Process pool size (default: number of cores)
+
+    Returns:
+    --------
+    dict
+        The manifest
+    """
+    names = [spec['name'] for spec in specs]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate chart names: {duplicates}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    monthly = None
+    jobs = []
+    for spec in specs:
+        if spec['kind'] == 'scatter':
+            if monthly is None:
+                monthly = monthly_series(cube)
+            if spec['x'] not in monthly.columns:
+                logger.warning(f"Skipping '{spec['name']}': '{spec['x']}' is not in the data")
+                continue
+            data = _scatter_data(monthly, spec)
+        else:
+            data = _distribution_data(cube, spec)
+        jobs.append((spec, data))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        charts = list(pool.map(render_chart, [s for s, _ in jobs], [d for _, d in jobs],
+                               [output_dir] * len(jobs)))
+
+    manifest = {'generated': datetime.datetime.now().isoformat(timespec='seconds'),
+                'charts': charts}
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    """
+    Render the default (or a JSON-specified) set of charts headlessly.
+    """
+    parser = argparse.ArgumentParser(description='Render call volume charts in parallel')
+    parser.add_argument('source', nargs='?', default='Primary_CallReports_v1.7.csv')
+    parser.add_argument('--output', default='charts')
+    parser.add_argument('--specs', help='JSON file with a list of chart specs')
+    parser.add_argument('--period', action='append', default=[],
+                        help="START:END labels for the default specs, e.g. '2022 Q1:'")
+    parser.add_argument('--format', action='append', choices=['png', 'svg'])
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.specs:
+        with open(args.specs) as f:
+            specs = json.load(f)
+    else:
+        formats = args.format or ['png']
+        periods = [tuple(p.split(':', 1)) for p in args.period] or [('', '')]
+        specs = [spec for start, end in periods
+                 for spec in default_specs(start or None, end or None, formats)]
+
+    manifest = render_batch(load_or_build_cube(args.source), specs, args.output, args.workers)
+    print(f"Rendered {len(manifest['charts'])} charts into '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+"""
+Mental Health Datathon - Pipeline Benchmarks
+============================================
+
+Times every pipeline step on synthetic data (see synthetic_data.py) and
+appends the results to a JSON history, so regressions show up as a change
+between runs and hardware can be sized from the throughput at each scale.
+
+Each step runs in a fresh process, so the recorded peak RSS belongs to that
+step alone (worker processes it starts are included). Steps run in pipeline
+order, because each one reads what the previous one wrote; a step selected
+without the steps before it has its missing inputs produced first, untimed:
+
+    datetime_features, clean_unemployment, merge_unemployment, merge_weather,
+    quarter, merge_ems, cube, distributions, correlations
+
+Recorded per step: wall seconds, peak RSS (MB), rows and rows per second.
+
+The 'startup' step times interpreter start-up plus imports: `cli.py --help`
+and `cli.py <command> --help` for every module subcommand, each in a fresh
+interpreter (median of several runs, recorded as 'startup.<command>'), run in
+an empty temporary folder so nothing is written to the working tree. The
+script subcommands that analyse the call data (STARTUP_SCRIPTS) are timed
+doing a whole run with --no-plot, on a small fixture data folder built once
+in the data folder; one untimed run first builds their cached cube.
+
+Usage:
+------
+    python benchmark.py --size 1M
+    python benchmark.py --size 10M --steps cube correlations --history bench.json
+    python benchmark.py --steps startup
+
+Author: [Mike Baran]
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic_data import CALLS_FILE, generate_dataset, parse_size
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY = 'benchmark_history.json'
+DEFAULT_DATA_DIR = 'bench_data'
+REGRESSION_THRESHOLD = 1.2
+STARTUP_STEP = 'startup'
+STARTUP_REPEATS = 5
+# Script subcommands timed end to end with --no-plot, and their fixture size
+STARTUP_SCRIPTS = ['ems-correlation', 'ems-correlation-2022', 'distributions',
+                   'unemployment-scatter']
+STARTUP_FIXTURE_ROWS = 2000
+
+
+# ----------------------------------------------------------------------
+# Steps (each takes the data folder and returns the number of rows handled)
+# ----------------------------------------------------------------------
+
+def _stage_step(name):
+    def run(data_dir):
+        from pipeline import STAGES
+        stage = next(s for s in STAGES if s.name == name)
+        stage.func([os.path.join(data_dir, p) for p in stage.resolve_inputs(data_dir)],
+                   [os.path.join(data_dir, p) for p in stage.outputs])
+    run.__name__ = name
+    return run
+
+
+def _bench_cube_path(data_dir):
+    from call_cube import cube_path_for
+    return cube_path_for(os.path.join(data_dir, 'Primary_CallReports_v1.7.csv')) + '.bench'
+
+
+def _cube_step(data_dir):
+    from call_cube import load_or_build_cube
+    source = os.path.join(data_dir, 'Primary_CallReports_v1.7.csv')
+    path = _bench_cube_path(data_dir)
+    # Always rebuild; a cached cube would only time the cache lookup
+    shutil.rmtree(path, ignore_errors=True)
+    cube = load_or_build_cube(source, path=path)
+    return int(cube.counts['Calls'].sum())
+
+
+def _distributions_step(data_dir):
+    from distributions import DistributionCounts
+    from ingest import read_call_reports
+    df = read_call_reports(os.path.join(data_dir, 'Primary_CallReports_v1.3.csv'),
+                           usecols=['CallDateAndTimeStart'])
+    counts = DistributionCounts.from_frame(df)
+    counts.hour_by_day_of_week()
+    counts.month_by_year()
+    return len(df)
+
+
+def _correlations_step(data_dir):
+    from call_cube import CallCube
+    from correlation import correlate, monthly_series
+    frame = monthly_series(CallCube.load(_bench_cube_path(data_dir)))
+    correlate(frame['TotalCalls'], frame.drop(columns=['TotalCalls']), lags=range(7))
+    return int(frame['TotalCalls'].sum())
+
+
+STEPS = {name: _stage_step(name) for name in
+         ['datetime_features', 'clean_unemployment', 'merge_unemployment',
+          'merge_weather', 'quarter', 'merge_ems']}
+STEPS.update(cube=_cube_step, distributions=_distributions_step,
+             correlations=_correlations_step)
+
+
+# ----------------------------------------------------------------------
+# Measurement
+# ----------------------------------------------------------------------
+
+def _peak_rss_mb():
+    """Peak resident set size of this process and its children, in MB."""
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak * scale / 1e6
+
+
+def _measure(name, data_dir, rows):
+    """Run one step in the current process (a fresh child of run_benchmarks)."""
+    started = time.perf_counter()
+    handled = STEPS[name](data_dir)
+    wall = time.perf_counter() - started
+    handled = rows if handled is None else handled
+    return {'step': name, 'wall_seconds': round(wall, 3), 'peak_rss_mb': round(_peak_rss_mb(), 1),
+            'rows': handled, 'rows_per_second': round(handled / wall, 1) if wall > 0 else None}
+
+
+def _time_command(command, cwd):
+    """Wall seconds and peak RSS (MB) of one command run to completion."""
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command)
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return wall, usage.ru_maxrss * scale / 1e6
+
+
+def prepare_script_fixture(data_dir, rows=STARTUP_FIXTURE_ROWS):
+    """
+    Small data folder holding every file the STARTUP_SCRIPTS read.
+
+    The synthetic inputs are run through the pipeline; the features file is
+    also saved under the name time_based_distributions.py reads.
+    """
+    from pipeline import run_pipeline
+
+    folder = os.path.join(data_dir, f"scripts-{rows}")
+    processed = os.path.join(folder, 'processed_call_reports.csv')
+    if not os.path.exists(processed):
+        logger.info(f"Generating the script fixture data into {folder}")
+        generate_dataset(folder, rows)
+        run_pipeline(folder)
+        shutil.copyfile(os.path.join(folder, 'Primary_CallReports_v1.3.csv'), processed)
+    return folder
+
+
+def startup_times(repeats=STARTUP_REPEATS, data_dir=DEFAULT_DATA_DIR):
+    """
+    Start-up time of the CLI and of each module subcommand, and the run time
+    of the STARTUP_SCRIPTS with --no-plot.
+
+    Returns:
+    --------
+    list of dict
+        One result per command, named 'startup.<command>'
+    """
+    from cli import COMMANDS
+    cli = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cli.py')
+    fixture = prepare_script_fixture(data_dir)
+    scratch = tempfile.mkdtemp(prefix='startup-')
+    commands = [('cli', ['--help'], scratch)]
+    commands += [(name, [name, '--help'], scratch) for name, (target, _) in COMMANDS.items()
+                 if not target.endswith('.py')]
+    commands += [(name, ['--no-plot', name], fixture) for name in STARTUP_SCRIPTS]
+    results = []
+    try:
+        for name, args, cwd in commands:
+            if cwd == fixture:
+                _time_command([sys.executable, cli] + args, cwd)
+            runs = [_time_command([sys.executable, cli] + args, cwd) for _ in range(repeats)]
+            results.append({'step': f'startup.{name}',
+                            'wall_seconds': round(statistics.median(w for w, _ in runs), 3),
+                            'peak_rss_mb': round(max(m for _, m in runs), 1),
+                            'rows': None, 'rows_per_second': None})
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+
+def ensure_inputs(name, data_dir):
+    """
+    Produce the inputs of a step, untimed, when the steps before it have not run.
+
+    Missing pipeline outputs are written by run_pipeline; the correlations
+    step also needs the cube step's cube.
+    """
+    from pipeline import STAGES, run_pipeline
+    names = [s.name for s in STAGES]
+    needed = STAGES[:names.index(name)] if name in names else STAGES
+    if any(not os.path.exists(os.path.join(data_dir, output))
+           for stage in needed for output in stage.outputs):
+        logger.info(f"Running the pipeline stages {name} depends on (untimed)")
+        run_pipeline(data_dir, stages=needed)
+    if name == 'correlations' and not os.path.isdir(_bench_cube_path(data_dir)):
+        logger.info("Building the cube the correlations step reads (untimed)")
+        _cube_step(data_dir)
+
+
+def run_step(name, data_dir, rows):
+    """Run one step in a fresh spawned process and return its measurements."""
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        return pool.apply(_measure, (name, data_dir, rows))
+
+
+def prepare_data(data_dir, size, seed):
+    """Generate the synthetic inputs for one size once; later runs reuse them."""
+    rows = parse_size(size)
+    folder = os.path.join(data_dir, f"{size}-seed{seed}")
+    if not os.path.exists(os.path.join(folder, CALLS_FILE)):
+        logger.info(f"Generating {rows} synthetic rows into {folder}")
+        generate_dataset(folder, rows, seed)
+    return folder, rows
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(size='1M', steps=None, data_dir=DEFAULT_DATA_DIR, seed=0):
+    """
+    Run the selected steps (default: all, in pipeline order, then startup) on one data size.
+
+    Returns:
+    --------
+    dict
+        One history entry
+    """
+    steps = steps or list(STEPS) + [STARTUP_STEP]
+    if any(name != STARTUP_STEP for name in steps):
+        folder, rows = prepare_data(data_dir, size, seed)
+    else:
+        folder, rows = None, parse_size(size)
+    results = []
+    for name in steps:
+        if name == STARTUP_STEP:
+            logger.info("Benchmarking startup time of the CLI commands")
+            results.extend(startup_times(data_dir=data_dir))
+            continue
+        ensure_inputs(name, folder)
+        logger.info(f"Benchmarking {name} on {size} rows")
+        results.append(run_step(name, folder, rows))
+        logger.info(f"{name}: {results[-1]['wall_seconds']}s, "
+                    f"{results[-1]['peak_rss_mb']} MB peak RSS")
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'size': size,
+        'rows': rows,
+        'seed': seed,
+        'host': {'platform': platform.platform(), 'python': platform.python_version(),
+                 'cpus': os.cpu_count()},
+        'results': results,
+    }
+
+
+# ----------------------------------------------------------------------
+# History
+# ----------------------------------------------------------------------
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def append_history(path, entry):
+    history = load_history(path)
+    history.append(entry)
+    with open(path, 'w') as f:
+        json.dump(history, f, indent=2)
+    return history
+
+
+def regressions(history, entry, threshold=REGRESSION_THRESHOLD):
+    """
+    Steps of entry that are slower than the previous run of the same size and host.
+
+    Returns:
+    --------
+    list of (step, previous seconds, current seconds)
+    """
+    previous = [h for h in history if h is not entry and h['size'] == entry['size']
+                and h['seed'] == entry['seed'] and h['host'] == entry['host']]
+    if not previous:
+        return []
+    baseline = {r['step']: r['wall_seconds'] for r in previous[-1]['results']}
+    return [(r['step'], baseline[r['step']], r['wall_seconds']) for r in entry['results']
+            if r['step'] in baseline and r['wall_seconds'] > threshold * baseline[r['step']]]
+
+
+def main():
+    """
+    Benchmark the pipeline steps on synthetic data and record the results.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the call report pipeline')
+    parser.add_argument('--size', default='1M', help="'1M', '10M', '100M' or a row count")
+    parser.add_argument('--steps', nargs='+', choices=list(STEPS) + [STARTUP_STEP])
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--history', default=DEFAULT_HISTORY)
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='flag steps slower than this multiple of the previous run')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    entry = run_benchmarks(args.size, args.steps, args.data_dir, args.seed)
+    history = append_history(args.history, entry)
+
+    print(f"\n{'step':<30}{'wall s':>10}{'peak MB':>10}{'rows/s':>14}")
+    for r in entry['results']:
+        print(f"{r['step']:<30}{r['wall_seconds']:>10}{r['peak_rss_mb']:>10}"
+              f"{r['rows_per_second'] or 0:>14,.0f}")
+
+    slower = regressions(history, entry, args.threshold)
+    for step, before, after in slower:
+        print(f"REGRESSION {step}: {before}s -> {after}s")
+    sys.exit(1 if slower else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Mental Health Datathon - Call Volume Cube
+=========================================
+
+This module keeps a small, persisted table of call counts at the grain of
+(date, hour), tagged with 'Year&Month', 'Quarter' and 'DayOfWeek'. Monthly,
+quarterly, daily, hourly and day-of-week totals are all rollups of this table,
+so the analysis scripts never need to group millions of raw call rows.
+
+The exogenous values that were joined onto the call table (unemployment rate
+per month, opioid EMS responses per quarter, weather per day) are stored
+alongside the counts, once per key.
+
+Usage:
+------
+    from call_cube import load_or_build_cube
+    cube = load_or_build_cube("Primary_CallReports_v1.7.csv")
+    monthly = cube.monthly(["QuarterlyOpioidEMSResponsesAB"], by_quarter=True)
+
+New call batches are folded in with cube.update(new_rows) followed by
+cube.save(path); existing counts are not recomputed. A batch passed with a
+key is folded in at most once: the keys are saved with the counts, so
+replaying the same batch after an interrupted run does not count it twice.
+
+Author: [Mike Baran]
+"""
+
+import json
+import logging
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from call_store import call_report_columns, load_call_reports
+from instrumentation import stage
+
+logger = logging.getLogger(__name__)
+
+CUBE_KEYS = ['Date', 'Hour', 'Year&Month', 'Quarter', 'DayOfWeek']
+MONTHLY_EXOGENOUS = ['AlbertaUnemploymentRate']
+QUARTERLY_EXOGENOUS = ['QuarterlyOpioidEMSResponsesAB']
+DAILY_EXOGENOUS = ['temperature_2m_max', 'temperature_2m_min', 'rain_sum',
+                   'precipitation_hours', 'daylight_duration', 'sunshine_duration']
+
+# Key of the parquet schema metadata listing the batches folded into the counts
+BATCHES_METADATA_KEY = b'datathon.batches'
+
+_EXOGENOUS_LEVELS = [('monthly', 'Year&Month', MONTHLY_EXOGENOUS),
+                     ('quarterly', 'Quarter', QUARTERLY_EXOGENOUS),
+                     ('daily', 'Date', DAILY_EXOGENOUS)]
+
+
+def _cube_keys(df):
+    """Derive the cube key columns for a frame of raw call rows."""
+    timestamps = pd.to_datetime(df['CallDateAndTimeStart'], errors='coerce')
+    keys = pd.DataFrame({
+        'Date': timestamps.dt.normalize(),
+        'Hour': timestamps.dt.hour.astype('Int8'),
+    }, index=df.index)
+    if 'Year&Month' in df.columns:
+        keys['Year&Month'] = df['Year&Month'].astype(str).where(df['Year&Month'].notna())
+    else:
+        keys['Year&Month'] = timestamps.dt.strftime('%Y-%m')
+    keys['Quarter'] = df['Quarter'].astype(object) if 'Quarter' in df.columns else None
+    keys['DayOfWeek'] = timestamps.dt.day_name()
+    return keys
+
+
+def aggregate_calls(df):
+    """
+    Count raw call rows per cube key and collect their exogenous values.
+
+    Returns:
+    --------
+    (pd.DataFrame, dict)
+        Counts per CUBE_KEYS combination and the exogenous tables by level,
+        the parts a CallCube is made of (partial results of several frames
+        can be combined, see parallel_backend.reduce_cube)
+    """
+    keys = _cube_keys(df)
+    counts = (keys.groupby(CUBE_KEYS, dropna=False).size()
+              .reset_index(name='Calls'))
+
+    exogenous = {}
+    for level, key, candidates in _EXOGENOUS_LEVELS:
+        columns = [c for c in candidates if c in df.columns]
+        if not columns:
+            exogenous[level] = pd.DataFrame()
+            continue
+        values = df[columns].copy()
+        values[key] = keys[key]
+        exogenous[level] = values.groupby(key).first()
+    return counts, exogenous
+
+
+class CallCube:
+    """
+    Pre-aggregated call counts plus the exogenous values keyed alongside them.
+
+    Parameters:
+    -----------
+    counts : pd.DataFrame
+        One row per CUBE_KEYS combination with a 'Calls' column
+    exogenous : dict of str -> pd.DataFrame
+        'monthly', 'quarterly' and 'daily' tables indexed by their key
+    batches : iterable of str, optional
+        Keys of the batches already folded in with update()
+    """
+
+    def __init__(self, counts, exogenous, batches=()):
+        self.counts = counts
+        self.exogenous = exogenous
+        self.batches = set(batches)
+
+    @classmethod
+    def from_calls(cls, df):
+        """Build a cube from raw call rows."""
+        counts, exogenous = aggregate_calls(df)
+        return cls(counts, exogenous)
+
+    def update(self, new_calls, batch=None):
+        """
+        Fold a batch of newly appended call rows into the cube.
+
+        Counts for keys already present are incremented; exogenous values
+        already stored are kept and only new keys are added. A batch whose
+        key is already in self.batches is skipped.
+        """
+        if batch is not None:
+            if batch in self.batches:
+                logger.info(f"Batch {batch} is already in the cube; not counted again")
+                return self
+            self.batches.add(batch)
+        counts, exogenous = aggregate_calls(new_calls)
+        combined = pd.concat([self.counts, counts], ignore_index=True)
+        self.counts = (combined.groupby(CUBE_KEYS, dropna=False)['Calls'].sum()
+                       .reset_index())
+        for level, table in exogenous.items():
+            current = self.exogenous.get(level, pd.DataFrame())
+            self.exogenous[level] = table if current.empty else current.combine_first(table)
+        return self
+
+    def counts_by(self, dimensions):
+        """
+        Total calls per combination of the given cube dimensions.
+
+        Parameters:
+        -----------
+        dimensions : list of str
+            Any of 'Date', 'Hour', 'Year&Month', 'Quarter', 'DayOfWeek'
+
+        Returns:
+        --------
+        pd.DataFrame
+            The dimension columns plus 'TotalCalls'
+        """
+        return (self.counts.groupby(list(dimensions))['Calls'].sum()
+                .reset_index(name='TotalCalls'))
+
+    def monthly(self, exogenous=(), by_quarter=False):
+        """
+        Monthly call totals with the requested exogenous columns attached.
+
+        Parameters:
+        -----------
+        exogenous : list of str
+            Columns from the monthly or quarterly exogenous tables
+        by_quarter : bool
+            Also group by 'Quarter' (needed for quarterly covariates)
+
+        Returns:
+        --------
+        pd.DataFrame
+        """
+        quarterly = [c for c in exogenous if c in self.exogenous['quarterly'].columns]
+        dimensions = ['Year&Month'] + (['Quarter'] if by_quarter or quarterly else [])
+        result = self.counts_by(dimensions)
+
+        for column in exogenous:
+            for level, key, _ in _EXOGENOUS_LEVELS[:2]:
+                table = self.exogenous[level]
+                if column in table.columns:
+                    result[column] = result[key].map(table[column])
+                    break
+            else:
+                raise KeyError(f"'{column}' is not a monthly or quarterly exogenous column")
+        return result
+
+    def daily(self, exogenous=()):
+        """Daily call totals with the requested daily exogenous columns."""
+        result = self.counts_by(['Date'])
+        table = self.exogenous['daily']
+        for column in exogenous:
+            result[column] = result['Date'].map(table[column])
+        return result
+
+    def save(self, path):
+        """
+        Persist the cube as a folder of small Parquet files.
+
+        The counts file, which also lists the folded-in batches, is replaced
+        atomically and last, so an interrupted save leaves counts and batch
+        keys consistent (the exogenous tables only ever gain keys).
+        """
+        os.makedirs(path, exist_ok=True)
+        for level, table in self.exogenous.items():
+            table.to_parquet(os.path.join(path, f'{level}_exogenous.parquet'))
+        table = pa.Table.from_pandas(self.counts, preserve_index=False)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            BATCHES_METADATA_KEY: json.dumps(sorted(self.batches)).encode('utf-8')})
+        counts_path = os.path.join(path, 'counts.parquet')
+        pq.write_table(table, counts_path + '.tmp')
+        os.replace(counts_path + '.tmp', counts_path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a cube written by save()."""
+        table = pq.read_table(os.path.join(path, 'counts.parquet'))
+        batches = json.loads((table.schema.metadata or {}).get(BATCHES_METADATA_KEY, b'[]'))
+        exogenous = {level: pd.read_parquet(os.path.join(path, f'{level}_exogenous.parquet'))
+                     for level, _, _ in _EXOGENOUS_LEVELS}
+        return cls(table.to_pandas(), exogenous, batches)
+
+
+def cube_path_for(source):
+    """Folder used for the cube built from a call report CSV or store."""
+    return os.path.splitext(source.rstrip(os.sep))[0] + '.cube'
+
+
+def _source_signature(source):
+    """Cheap change marker for the source file or store folder."""
+    paths = [source]
+    if os.path.isdir(source):
+        paths = []
+        for folder, dirs, names in os.walk(source):
+            # Skip side folders such as the time index; only data files count
+            dirs[:] = [d for d in dirs if not d.startswith(('_', '.'))]
+            paths.extend(os.path.join(folder, name) for name in names)
+    return sorted([os.path.relpath(p, source) if p != source else os.path.basename(p),
+                   os.path.getsize(p), os.path.getmtime(p)] for p in paths)
+
+
+def write_cube_meta(source, path):
+    """Record that the cube at path is current for the source as it is now."""
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump({'source': os.path.abspath(source),
+                   'source_signature': _source_signature(source)}, f)
+
+
+def load_or_build_cube(source, path=None):
+    """
+    Load the cube for a call report source, rebuilding it if the source changed.
+
+    Parameters:
+    -----------
+    source : str
+        Call report CSV (or its Parquet store folder)
+    path : str, optional
+        Cube folder, defaults to cube_path_for(source)
+
+    Returns:
+    --------
+    CallCube
+    """
+    path = path or cube_path_for(source)
+    meta_path = os.path.join(path, 'meta.json')
+    signature = _source_signature(source)
+
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            if json.load(f).get('source_signature') == signature:
+                return CallCube.load(path)
+
+    logger.info(f"Building call volume cube from {source}")
+    available = call_report_columns(source)
+    wanted = ['CallDateAndTimeStart', 'Year&Month', 'Quarter'] + \
+        MONTHLY_EXOGENOUS + QUARTERLY_EXOGENOUS + DAILY_EXOGENOUS
+    columns = [c for c in wanted if c in available]
+    with stage('build_cube') as metrics:
+        calls = load_call_reports(source, columns=columns)
+        metrics.rows = len(calls)
+        cube = CallCube.from_calls(calls)
+        cube.save(path)
+    write_cube_meta(source, path)
+    return cube
@@ -0,0 +1,248 @@
+"""
+Mental Health Datathon - Columnar Call Report Store
+===================================================
+
+This module materializes the call report table as a Parquet dataset
+partitioned by 'Year&Month' (one folder per month, hive style), with typed
+columns instead of re-parsed text:
+
+- CallDateAndTimeStart as datetime64
+- DayOfWeek and MonthName as ordered categoricals
+- Year/Month/Day/Hour as small integers (Hour is int8)
+
+(see schema.CALL_REPORT_SCHEMA for the full column list)
+
+Readers ask only for the columns and months they need, so a correlation over
+'Year&Month' and one exogenous column reads a small fraction of the bytes.
+
+Usage:
+------
+1. Build the store next to a CSV: python call_store.py Primary_CallReports_v1.7.csv
+   (creates the folder 'Primary_CallReports_v1.7.parquet')
+2. In scripts: df = load_call_reports("Primary_CallReports_v1.7.csv", columns=[...])
+   which reads from the store when it exists and from the CSV otherwise
+
+Author: [Mike Baran]
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import urllib.parse
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from schema import apply_schema
+
+logger = logging.getLogger(__name__)
+
+PARTITION_COLUMN = 'Year&Month'
+PARTITIONING = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor='hive')
+# Folder value hive partitioning uses for rows without a 'Year&Month'
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+# Small row groups let time-range reads (time_index.py) skip most of a file
+ROW_GROUP_ROWS = 64 * 1024
+
+
+def store_path_for(csv_path):
+    """Folder used for the columnar copy of a call report CSV."""
+    return os.path.splitext(csv_path)[0] + '.parquet'
+
+
+def partition_value(folder_name):
+    """
+    'Year&Month' value of a hive folder name such as 'Year&Month=2022-01'.
+
+    Returns None for the null partition and for folders that are not
+    'Year&Month' partitions.
+    """
+    key, sep, value = folder_name.partition('=')
+    if not sep or urllib.parse.unquote(key) != PARTITION_COLUMN:
+        return None
+    value = urllib.parse.unquote(value)
+    return None if value == NULL_PARTITION else value
+
+
+def _partition_frame(df):
+    """Type the frame and make sure it carries the partition column."""
+    df = apply_schema(df)
+    if PARTITION_COLUMN in df.columns:
+        # Partition values are strings in the hive folder names; missing months
+        # stay null (written to the NULL_PARTITION folder), not the text 'nan'
+        df[PARTITION_COLUMN] = df[PARTITION_COLUMN].astype('string')
+    else:
+        df[PARTITION_COLUMN] = df['CallDateAndTimeStart'].dt.strftime('%Y-%m')
+    if 'CallDateAndTimeStart' in df.columns:
+        # Rows sorted by time inside each file keep time-range reads compact
+        df = df.sort_values('CallDateAndTimeStart', kind='stable')
+    return df
+
+
+def write_partitions(df, root):
+    """
+    Append a frame to the store as new files, one per month it touches.
+
+    Existing files are never rewritten; each call adds uniquely named files.
+    """
+    df = _partition_frame(df)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    ds.write_dataset(
+        table, root,
+        format='parquet',
+        partitioning=PARTITIONING,
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        max_rows_per_group=ROW_GROUP_ROWS,
+        existing_data_behavior='overwrite_or_ignore',
+    )
+
+
+def write_call_store(df, root):
+    """
+    Replace the store at root with the contents of df.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Call report rows (any dataset version)
+    root : str
+        Folder of the Parquet dataset
+    """
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    write_partitions(df, root)
+
+
+def convert_csv_to_store(csv_path, root=None, chunksize=1_000_000):
+    """
+    Stream a call report CSV into a partitioned Parquet store.
+
+    Parameters:
+    -----------
+    csv_path : str
+        Source CSV file
+    root : str, optional
+        Destination folder, defaults to store_path_for(csv_path)
+    chunksize : int
+        Number of CSV rows converted at a time
+
+    Returns:
+    --------
+    str
+        Path of the store folder
+    """
+    root = root or store_path_for(csv_path)
+    if os.path.exists(root):
+        shutil.rmtree(root)
+
+    rows = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        write_partitions(chunk, root)
+        rows += len(chunk)
+        logger.info(f"Converted {rows} rows from {csv_path}")
+    return root
+
+
+def open_call_store(root):
+    """Open the store as a pyarrow dataset (no data is read)."""
+    return ds.dataset(root, format='parquet', partitioning=PARTITIONING)
+
+
+def read_call_store(root, columns=None, months=None, filter=None):
+    """
+    Read selected columns and months from the store.
+
+    Parameters:
+    -----------
+    root : str
+        Folder of the Parquet dataset
+    columns : list of str, optional
+        Columns to load; only these are read from disk
+    months : list of str, optional
+        'Year&Month' values to keep; other partitions are never opened.
+        None selects the rows without a month
+    filter : pyarrow.dataset.Expression, optional
+        Additional row filter pushed down to the Parquet reader
+
+    Returns:
+    --------
+    pd.DataFrame
+    """
+    dataset = open_call_store(root)
+    expression = filter
+    if months is not None:
+        labels = [str(m) for m in months if not pd.isna(m)]
+        month_filter = ds.field(PARTITION_COLUMN).isin(labels)
+        if len(labels) < len(months):
+            month_filter = month_filter | ds.field(PARTITION_COLUMN).is_null()
+        expression = month_filter if expression is None else expression & month_filter
+    table = dataset.to_table(columns=columns, filter=expression)
+    return apply_schema(table.to_pandas())
+
+
+def call_report_columns(path):
+    """List the column names of a call report CSV or store without loading rows."""
+    root = path if os.path.isdir(path) else store_path_for(path)
+    if os.path.isdir(root):
+        return list(open_call_store(root).schema.names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def load_call_reports(path, columns=None, months=None):
+    """
+    Load call reports from the columnar store if one exists for path, else CSV.
+
+    Parameters:
+    -----------
+    path : str
+        CSV file name or store folder
+    columns : list of str, optional
+        Columns to load
+    months : list of str, optional
+        'Year&Month' values to keep
+
+    Returns:
+    --------
+    pd.DataFrame
+    """
+    root = path if os.path.isdir(path) else store_path_for(path)
+    if os.path.isdir(root):
+        return read_call_store(root, columns=columns, months=months)
+
+    usecols = None
+    if columns is not None:
+        usecols = list(columns)
+        if months is not None and PARTITION_COLUMN not in usecols:
+            usecols.append(PARTITION_COLUMN)
+    df = pd.read_csv(path, usecols=usecols)
+    if months is not None:
+        values = df[PARTITION_COLUMN]
+        keep = values.astype(str).isin([str(m) for m in months if not pd.isna(m)]) & values.notna()
+        if any(pd.isna(m) for m in months):
+            keep |= values.isna()
+        df = df[keep]
+        if columns is not None:
+            df = df[list(columns)]
+    return df
+
+
+def main():
+    """
+    Convert a call report CSV into a partitioned Parquet store.
+    """
+    parser = argparse.ArgumentParser(description='Build a columnar call report store')
+    parser.add_argument('csv_path', help='call report CSV to convert')
+    parser.add_argument('--output', help='store folder (default: <csv>.parquet)')
+    parser.add_argument('--chunksize', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    root = convert_csv_to_store(args.csv_path, args.output, args.chunksize)
+    print(f"Call report store written to: {root}")
+
+
+if __name__ == "__main__":
+    main()
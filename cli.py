@@ -0,0 +1,126 @@
+"""
+Mental Health Datathon - Command Line Entry Point
+=================================================
+
+One entry point with a subcommand for every analysis, so scheduled runs start
+a single small interpreter instead of each script importing everything at
+module top level.
+
+This module imports nothing beyond the standard library. A subcommand imports
+its own module only once it has been chosen, so pandas, scipy, matplotlib,
+seaborn and the Open-Meteo client are loaded only by the subcommands that use
+them. With --no-plot, the plotting scripts print their numbers and never
+import matplotlib or seaborn (the flag is passed on as DATATHON_NO_PLOT=1).
+
+Startup time of the subcommands is tracked by `python benchmark.py --steps startup`.
+
+Usage:
+------
+    python cli.py --help
+    python cli.py pipeline --data-dir data
+    python cli.py --no-plot ems-correlation
+    python cli.py correlate Primary_CallReports_v1.7.csv --max-lag 6
+
+Author: [Mike Baran]
+"""
+
+import argparse
+import importlib
+import os
+import runpy
+import sys
+
+NO_PLOT_ENV = 'DATATHON_NO_PLOT'
+
+# name -> (module with a main() or script file, description)
+COMMANDS = {
+    # Data preparation
+    'features': ('process_data', 'add datetime features to the raw call reports'),
+    'pipeline': ('pipeline', 'run the incremental data preparation pipeline'),
+    'store': ('call_store', 'convert a call report CSV to the partitioned Parquet store'),
+    'ingest': ('incremental_ingest', 'append new call batches to the store and cube'),
+    'index': ('time_index', 'build or query the timestamp index of the store'),
+    'parallel': ('parallel_backend', 'build the cube, distributions or features in parallel'),
+    'fetch-weather': ('weather_fetch', 'download daily weather tiles'),
+    'historical-weather': ('HistoricalWeatherAPICall.py', 'download Edmonton daily weather'),
+    'transform-unemployment': ('Transform Unemployment Rate Dataset.py',
+                               'clean the unemployment rate table'),
+    'merge-unemployment': ('Merge Primary and Unemployment Datasets.py',
+                           'join the unemployment rate onto the call reports'),
+    'merge-weather': ('Merge Weather Data with Main Dataset.py',
+                      'join daily weather onto the call reports'),
+    'convert-quarterly': ('Convert Monthly Dates to Quarterly.py', 'add the Quarter column'),
+    'merge-ems': ('Merge EMS Responses with Primary Dataset.py',
+                  'join the opioid EMS responses onto the call reports'),
+    # Analyses
+    'correlate': ('correlation', 'lagged correlations of monthly calls with every covariate'),
+    'resample': ('resampling', 'permutation tests and bootstrap intervals for a correlation'),
+    'sweep': ('sweep', 'parallel correlation sweep over periods and granularities'),
+    'rolling': ('rolling_features', 'build or update the rolling daily feature matrix'),
+    'unemployment-correlation': ('Calculate Correlation Calls per Month with Unemployment Rate.py',
+                                 'correlation of monthly calls with unemployment'),
+    'ems-correlation': ('Correlation Check Calls per Month vs EMS Calls.py',
+                        'correlation of monthly calls with opioid EMS responses'),
+    'ems-correlation-2022': ('EMS Correlation from 2022 Q1.py',
+                             'the EMS correlation from 2022 Q1 onwards'),
+    'unemployment-scatter': ('Scatter Plot for Correlation.py',
+                             'scatter plot of monthly calls against unemployment'),
+    'distributions': ('time_based_distributions.py', 'call distributions by time dimension'),
+    'render': ('batch_render', 'render a batch of charts in parallel'),
+    'serve': ('query_service', 'serve cached aggregate and correlation queries over HTTP'),
+    # Tooling
+    'synthetic': ('synthetic_data', 'generate a synthetic dataset'),
+    'benchmark': ('benchmark', 'benchmark the pipeline steps and startup time'),
+}
+
+
+def run_command(name, args, no_plot=False):
+    """
+    Import and run one subcommand with the given arguments.
+
+    Parameters:
+    -----------
+    name : str
+        Key of COMMANDS
+    args : list of str
+        Arguments passed on to the subcommand
+    no_plot : bool
+        Skip plotting (and the plotting imports) in the plotting scripts
+    """
+    target, _ = COMMANDS[name]
+    if no_plot:
+        os.environ[NO_PLOT_ENV] = '1'
+
+    if target.endswith('.py'):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), target)
+        sys.argv = [path] + list(args)
+        runpy.run_path(path, run_name='__main__')
+    else:
+        sys.argv = [f"{target}.py"] + list(args)
+        importlib.import_module(target).main()
+
+
+def main():
+    """
+    Dispatch to a subcommand.
+    """
+    width = max(len(name) for name in COMMANDS)
+    parser = argparse.ArgumentParser(
+        description='Mental Health Datathon analyses',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='commands:\n' + '\n'.join(f"  {name:<{width}}  {description}"
+                                         for name, (_, description) in COMMANDS.items()))
+    parser.add_argument('--no-plot', action='store_true',
+                        help='skip plotting and the plotting imports')
+    parser.add_argument('command', choices=list(COMMANDS), metavar='command')
+    parser.add_argument('args', nargs=argparse.REMAINDER,
+                        help='arguments for the command (see <command> --help)')
+    args = parser.parse_args()
+
+    # Accept --no-plot after the command as well
+    no_plot = args.no_plot or '--no-plot' in args.args
+    run_command(args.command, [a for a in args.args if a != '--no-plot'], no_plot)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Mental Health Datathon - Correlation Engine
+===========================================
+
+Correlates an aggregated call series with a whole matrix of covariates in one
+vectorized pass: every covariate, every lag and both Pearson and Spearman
+coefficients are computed together as NumPy array operations, with p-values
+from the t distribution (the same test scipy's pearsonr/spearmanr use).
+
+A lag of k pairs the calls in period t with the covariate in period t - k,
+i.e. it tests whether the covariate leads call volume by k periods. Missing
+values are handled pairwise, per covariate and lag.
+
+Usage:
+------
+1. python correlation.py Primary_CallReports_v1.7.csv --max-lag 6
+2. In code:
+       frame = monthly_series(load_or_build_cube("Primary_CallReports_v1.7.csv"))
+       results = correlate(frame['TotalCalls'], frame.drop(columns='TotalCalls'))
+
+Author: [Mike Baran]
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from call_cube import DAILY_EXOGENOUS, MONTHLY_EXOGENOUS, QUARTERLY_EXOGENOUS
+from datetime_parsing import parse_year_month
+
+METHODS = ('pearson', 'spearman')
+
+
+def lagged(covariates, lags):
+    """
+    Stack shifted copies of the covariate matrix.
+
+    Parameters:
+    -----------
+    covariates : np.ndarray
+        Shape (n_periods, n_covariates)
+    lags : list of int
+        Non-negative lags
+
+    Returns:
+    --------
+    np.ndarray
+        Shape (n_lags, n_periods, n_covariates); shifted-out cells are NaN
+    """
+    n = covariates.shape[0]
+    out = np.full((len(lags),) + covariates.shape, np.nan)
+    for i, lag in enumerate(lags):
+        if lag < 0:
+            raise ValueError(f"Lags must be non-negative, got {lag}")
+        if lag < n:
+            out[i, lag:] = covariates[:n - lag]
+    return out
+
+
+def _pairwise_pearson(y, x):
+    """
+    Pearson r over pairwise-complete observations.
+
+    y has shape (..., n_periods, n_covariates) or broadcasts to x's shape.
+    Returns r and the number of pairs, both shaped like x without the period axis.
+    """
+    valid = ~np.isnan(x) & ~np.isnan(y)
+    n = valid.sum(axis=-2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        xs = np.where(valid, x, 0.0)
+        ys = np.where(valid, y, 0.0)
+        dx = np.where(valid, x - (xs.sum(axis=-2) / n)[..., None, :], 0.0)
+        dy = np.where(valid, y - (ys.sum(axis=-2) / n)[..., None, :], 0.0)
+        r = (dx * dy).sum(axis=-2) / np.sqrt((dx ** 2).sum(axis=-2) * (dy ** 2).sum(axis=-2))
+    return np.clip(r, -1.0, 1.0), n
+
+
+def _p_values(r, n):
+    """Two-sided p-values for r under the t distribution with n - 2 dof."""
+    # Imported here so modules that only aggregate do not pay for scipy
+    from scipy import stats
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dof = n - 2
+        t = r * np.sqrt(dof / ((1.0 - r) * (1.0 + r)))
+        p = 2 * stats.t.sf(np.abs(t), dof)
+    return np.where(dof > 0, p, np.nan)
+
+
+def _ranks(values):
+    """Average ranks along the period axis, NaN where values are NaN."""
+    from scipy import stats
+    return stats.rankdata(values, axis=-2, nan_policy='omit')
+
+
+def correlate(calls, covariates, lags=(0,), methods=METHODS):
+    """
+    Correlate a call series with every covariate at every lag.
+
+    Parameters:
+    -----------
+    calls : pd.Series
+        Aggregated call counts, one value per period, in period order
+    covariates : pd.DataFrame
+        One column per covariate, aligned with calls
+    lags : iterable of int
+        Lags (in periods) by which each covariate leads the calls
+    methods : iterable of str
+        Any of 'pearson' and 'spearman'
+
+    Returns:
+    --------
+    pd.DataFrame
+        Columns covariate, lag, method, r, p_value, n
+    """
+    lags = list(lags)
+    x = lagged(covariates.to_numpy(dtype=float), lags)
+    y = np.broadcast_to(calls.to_numpy(dtype=float)[None, :, None], x.shape)
+
+    results = []
+    for method in methods:
+        if method == 'pearson':
+            r, n = _pairwise_pearson(y, x)
+        elif method == 'spearman':
+            # Rank within the pairwise-complete set of each covariate and lag
+            valid = ~np.isnan(x) & ~np.isnan(y)
+            r, n = _pairwise_pearson(_ranks(np.where(valid, y, np.nan)),
+                                     _ranks(np.where(valid, x, np.nan)))
+        else:
+            raise ValueError(f"Unknown correlation method '{method}'")
+
+        p = _p_values(r, n)
+        lag_grid, column_grid = np.meshgrid(lags, np.arange(covariates.shape[1]), indexing='ij')
+        results.append(pd.DataFrame({
+            'covariate': covariates.columns[column_grid.ravel()],
+            'lag': lag_grid.ravel(),
+            'method': method,
+            'r': r.ravel(),
+            'p_value': p.ravel(),
+            'n': n.ravel(),
+        }))
+    return pd.concat(results, ignore_index=True)
+
+
+def monthly_series(cube):
+    """
+    Monthly call totals with every available covariate, in calendar order.
+
+    Monthly and quarterly covariates are taken as stored; daily weather
+    variables are averaged over each month. Months between the first and the
+    last one that have no rows are included as NaN rows, so that a lag of k
+    rows in correlate() is always k calendar months.
+
+    Parameters:
+    -----------
+    cube : CallCube
+        Call volume cube (see call_cube.load_or_build_cube)
+
+    Returns:
+    --------
+    pd.DataFrame
+        Indexed by 'Year&Month' (one row per calendar month), with
+        'TotalCalls' and one column per covariate
+    """
+    monthly_columns = [c for c in MONTHLY_EXOGENOUS + QUARTERLY_EXOGENOUS
+                       if c in cube.exogenous['monthly'].columns
+                       or c in cube.exogenous['quarterly'].columns]
+    frame = cube.monthly(monthly_columns)
+    if 'Quarter' in frame.columns:
+        frame = frame.drop(columns=['Quarter'])
+    frame = frame.groupby('Year&Month', sort=False).agg(
+        {'TotalCalls': 'sum', **{c: 'first' for c in monthly_columns}})
+
+    daily = cube.exogenous['daily']
+    weather_columns = [c for c in DAILY_EXOGENOUS if c in daily.columns]
+    if weather_columns:
+        month_of_day = cube.counts[['Date', 'Year&Month']].drop_duplicates('Date').set_index('Date')
+        weather = daily[weather_columns].join(month_of_day, how='inner')
+        frame = frame.join(weather.groupby('Year&Month').mean())
+
+    return _calendar_months(frame)
+
+
+def _calendar_months(frame):
+    """Reindex a frame keyed by month labels to every month from the first to the last."""
+    months = parse_year_month(frame.index.to_series()).dt.to_period('M')
+    frame = frame[months.notna().to_numpy()]
+    months = pd.PeriodIndex(months.dropna(), freq='M')
+    if frame.empty:
+        return frame
+    labels = dict(zip(months, frame.index))
+    calendar = pd.period_range(months.min(), months.max(), freq='M')
+    frame = frame.set_axis(months).groupby(level=0).first().reindex(calendar)
+    # Keep the stored labels; months without rows get 'YYYY-MM'
+    frame.index = pd.Index([labels.get(p, p.strftime('%Y-%m')) for p in calendar],
+                           name='Year&Month')
+    return frame
+
+
+def main():
+    """
+    Correlate monthly call volume with every covariate in a call report file.
+    """
+    from call_cube import load_or_build_cube
+
+    parser = argparse.ArgumentParser(description='Lagged correlations of monthly call volume')
+    parser.add_argument('source', nargs='?', default='Primary_CallReports_v1.7.csv')
+    parser.add_argument('--max-lag', type=int, default=6)
+    parser.add_argument('--method', action='append', choices=METHODS)
+    args = parser.parse_args()
+
+    frame = monthly_series(load_or_build_cube(args.source))
+    results = correlate(frame['TotalCalls'], frame.drop(columns=['TotalCalls']),
+                        lags=range(args.max_lag + 1), methods=args.method or METHODS)
+    with pd.option_context('display.max_rows', None, 'display.width', 120):
+        print(results.sort_values('p_value').to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
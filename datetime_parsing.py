@@ -0,0 +1,222 @@
+"""
+Mental Health Datathon - Call Timestamp Parsing
+===============================================
+
+Shared parser for 'CallDateAndTimeStart' and the other date columns joined
+onto the call table. Instead of letting pandas infer the layout row by row,
+the format is detected once from a sample and each distinct string is parsed
+once with a fixed-format vectorized call; call start times repeat heavily, so
+rows are mapped back to their parsed value through factorized codes. Parsed
+strings are remembered across calls, which keeps chunked runs cheap.
+
+The module also produces integer day and month keys, replacing the
+'YYYY-MM' and 'YYYY-MM-DD' string slices used by the merge scripts
+(quarter and ISO-week keys are built on them in period_keys):
+
+- day_key:     days since 1970-01-01
+- month_key:   months since 1970-01
+
+Missing timestamps get the key MISSING_KEY (-1).
+
+Usage:
+------
+    parser = TimestampParser()
+    df['CallDateAndTimeStart'] = parser.parse(df['CallDateAndTimeStart'])
+    months = month_key(df['CallDateAndTimeStart'])
+
+Author: [Mike Baran]
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MISSING_KEY = -1
+NAT_INT = np.iinfo(np.int64).min
+
+CANDIDATE_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%d',
+    '%m/%d/%Y %H:%M:%S',
+    '%m/%d/%Y %H:%M',
+    '%m/%d/%Y %I:%M:%S %p',
+    '%m/%d/%Y %I:%M %p',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M',
+    '%Y-%m',
+]
+
+
+def detect_format(values, sample_size=2000):
+    """
+    Pick the candidate format that parses the most values of a sample.
+
+    Parameters:
+    -----------
+    values : array-like of str
+        Timestamp strings (typically the distinct values of a column)
+    sample_size : int
+        Maximum number of values tried against each candidate
+
+    Returns:
+    --------
+    str or None
+        The best strptime format, or None if no candidate parses anything
+    """
+    sample = pd.Series(values, dtype=object).dropna().astype(str).str.strip()
+    sample = sample[sample != '']
+    if sample.empty:
+        return None
+    if len(sample) > sample_size:
+        # Spread the sample over the whole range rather than the first rows
+        sample = sample.iloc[np.linspace(0, len(sample) - 1, sample_size).astype(int)]
+
+    best_format, best_count = None, 0
+    for fmt in CANDIDATE_FORMATS:
+        count = pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum()
+        if count > best_count:
+            best_format, best_count = fmt, count
+            if count == len(sample):
+                break
+    return best_format
+
+
+class TimestampParser:
+    """
+    Fixed-format, memoizing parser for timestamp string columns.
+
+    Parameters:
+    -----------
+    fmt : str, optional
+        strptime format; detected from the first column parsed when omitted
+    cache_size : int
+        Maximum number of distinct strings remembered between calls
+    """
+
+    def __init__(self, fmt=None, cache_size=2_000_000):
+        self.format = fmt
+        self.cache_size = cache_size
+        self._cache = pd.Series(dtype='int64')
+
+    def _parse_uniques(self, strings):
+        """Parse distinct strings to int64 nanoseconds (NAT_INT when invalid)."""
+        if self.format is None:
+            self.format = detect_format(strings)
+            logger.info(f"Detected timestamp format: {self.format}")
+
+        if self.format:
+            parsed = pd.to_datetime(strings, format=self.format, errors='coerce').asi8.copy()
+        else:
+            parsed = np.full(len(strings), NAT_INT, dtype=np.int64)
+
+        failed = parsed == NAT_INT
+        if failed.any():
+            # Values in another layout fall back to inference, on those values only
+            retry = pd.DatetimeIndex(pd.to_datetime(strings[failed], errors='coerce'))
+            if retry.tz is not None:
+                retry = retry.tz_convert('UTC').tz_localize(None)
+            parsed[failed] = retry.asi8
+        return parsed
+
+    def parse(self, values):
+        """
+        Parse a column of timestamp strings.
+
+        Parameters:
+        -----------
+        values : pd.Series
+            Strings (or already parsed datetimes, which are returned as is)
+
+        Returns:
+        --------
+        pd.Series
+            datetime64[ns] values with NaT for unparseable entries
+        """
+        values = pd.Series(values)
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return values
+
+        # Each distinct string is handled once; rows refer to it by code
+        codes, uniques = pd.factorize(values)
+        strings = pd.Index(uniques).astype(str).str.strip()
+
+        parsed = np.full(len(strings), NAT_INT, dtype=np.int64)
+        positions = self._cache.index.get_indexer(strings)
+        hit = positions >= 0
+        parsed[hit] = self._cache.to_numpy()[positions[hit]]
+
+        if not hit.all():
+            new_strings = strings[~hit]
+            parsed[~hit] = self._parse_uniques(new_strings)
+            fresh = pd.Series(parsed[~hit], index=new_strings)
+            fresh = fresh[~fresh.index.duplicated()]
+            self._cache = pd.concat([self._cache, fresh])
+            if len(self._cache) > self.cache_size:
+                self._cache = self._cache.iloc[-self.cache_size:]
+
+        rows = np.full(len(codes), NAT_INT, dtype=np.int64)
+        valid = codes >= 0
+        rows[valid] = parsed[codes[valid]]
+        return pd.Series(rows.view('datetime64[ns]'), index=values.index, name=values.name)
+
+
+def parse_timestamps(values, fmt=None):
+    """One-off convenience wrapper around TimestampParser.parse()."""
+    return TimestampParser(fmt).parse(values)
+
+
+def day_key(timestamps):
+    """Days since 1970-01-01 as int32, MISSING_KEY for NaT."""
+    return _ordinal(timestamps, 'D')
+
+
+def month_key(timestamps):
+    """Months since 1970-01 as int32, MISSING_KEY for NaT."""
+    return _ordinal(timestamps, 'M')
+
+
+def _ordinal(timestamps, unit):
+    values = pd.DatetimeIndex(timestamps)
+    if values.tz is not None:
+        values = values.tz_convert('UTC').tz_localize(None)
+    values = values.to_numpy(dtype='datetime64[ns]')
+    ordinals = values.astype(f'datetime64[{unit}]').astype(np.int64)
+    return np.where(np.isnat(values), MISSING_KEY, ordinals).astype(np.int32)
+
+
+def month_labels(keys):
+    """
+    'YYYY-MM' strings for month keys, formatting each distinct key once.
+
+    Missing keys become NaN.
+    """
+    keys = np.asarray(keys)
+    uniques, inverse = np.unique(keys, return_inverse=True)
+    labels = np.array([np.datetime_as_string(np.datetime64(int(k), 'M')) if k != MISSING_KEY
+                       else np.nan for k in uniques], dtype=object)
+    return labels[inverse]
+
+
+def parse_year_month(labels):
+    """
+    Parse 'Year&Month' labels to month-start timestamps.
+
+    Accepts 'YYYY-MM' (as written by the unemployment merge) and 'YY-Mon'
+    (the same column after a round trip through Excel, e.g. '20-Jan').
+    """
+    labels = pd.Series(labels)
+    # Each distinct label is parsed once; rows take their value by code
+    codes, uniques = pd.factorize(labels)
+    uniques = pd.Series(uniques, dtype=object)
+    parsed = pd.to_datetime(uniques, format='%Y-%m', errors='coerce')
+    parsed = parsed.fillna(pd.to_datetime(uniques, format='%y-%b', errors='coerce'))
+    # Missing labels have code -1, which picks the trailing NaT
+    months = np.append(parsed.to_numpy(dtype='datetime64[ns]'),
+                       np.datetime64('NaT', 'ns'))[codes]
+    return pd.Series(months, index=labels.index, name=labels.name)
@@ -0,0 +1,259 @@
+"""
+Mental Health Datathon - Dimension Joins for Exogenous Data
+===========================================================
+
+The unemployment, weather and opioid EMS tables have at most a few thousand
+rows, while the call table has millions. Rather than hash-merging them (which
+copies the whole call frame for every merge), each small table is registered
+as a dimension keyed by an integer day, month or quarter ordinal (see
+datetime_parsing). Attaching a column is then a direct array lookup: the
+call's key indexes a dense position array, and the value is taken from the
+dimension column.
+
+Joined columns can either be written into the call frame or exposed through
+a JoinedView, which computes them only when they are accessed, so the
+covariates never have to be stored in the call table.
+
+Usage:
+------
+    joiner = exogenous_joiner(unemployment_csv="Unemployment_Rate_Alberta_Cleaned.csv",
+                              weather_csv="edmonton_daily_weather.parquet")
+    add_join_keys(calls_df)
+    view = joiner.view(calls_df)
+    view['AlbertaUnemploymentRate']     # computed on access
+
+Author: [Mike Baran]
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from datetime_parsing import MISSING_KEY, TimestampParser, day_key, month_key
+from period_keys import join_keys, quarter_keys_from_labels
+from weather_decode import read_weather
+
+logger = logging.getLogger(__name__)
+
+KEY_COLUMNS = ('day_key', 'month_key', 'quarter_key')
+
+
+class Dimension:
+    """
+    A small table addressable by an integer key through a dense position array.
+
+    Parameters:
+    -----------
+    name : str
+        Dimension name (e.g. 'unemployment')
+    fact_key : str
+        Key column of the call table used for lookups ('day_key', ...)
+    keys : array-like of int
+        Integer key of each dimension row; MISSING_KEY rows are ignored
+    frame : pd.DataFrame
+        Dimension columns, aligned with keys
+    """
+
+    def __init__(self, name, fact_key, keys, frame):
+        if fact_key not in KEY_COLUMNS:
+            raise ValueError(f"fact_key must be one of {KEY_COLUMNS}, got '{fact_key}'")
+        keys = np.asarray(keys, dtype=np.int64)
+        valid = keys != MISSING_KEY
+
+        self.name = name
+        self.fact_key = fact_key
+        self.frame = frame.reset_index(drop=True)
+        self.offset = int(keys[valid].min()) if valid.any() else 0
+        size = int(keys[valid].max()) - self.offset + 1 if valid.any() else 0
+
+        # Assign in reverse so the first row wins for duplicated keys
+        self.positions = np.full(size, -1, dtype=np.int64)
+        rows = np.flatnonzero(valid)[::-1]
+        self.positions[keys[rows] - self.offset] = rows
+
+    @property
+    def columns(self):
+        return list(self.frame.columns)
+
+    def lookup(self, fact_keys):
+        """Dimension row position for each fact key (-1 when absent)."""
+        slots = np.asarray(fact_keys, dtype=np.int64) - self.offset
+        inside = (slots >= 0) & (slots < len(self.positions))
+        result = np.full(len(slots), -1, dtype=np.int64)
+        result[inside] = self.positions[slots[inside]]
+        return result
+
+    def take(self, column, positions, index=None):
+        """Values of a dimension column at the given positions (NA for -1)."""
+        source = self.frame[column]
+        source = source.array if isinstance(source.dtype, pd.api.extensions.ExtensionDtype) \
+            else source.to_numpy()
+        values = pd.api.extensions.take(source, positions, allow_fill=True)
+        return pd.Series(values, index=index, name=column)
+
+
+class DimensionJoiner:
+    """
+    Registry of dimensions that attaches their columns to call rows.
+    """
+
+    def __init__(self):
+        self.dimensions = {}
+
+    def register(self, dimension):
+        """Add a Dimension; its column names must not clash with others."""
+        for column in dimension.columns:
+            owner = self.owner(column, required=False)
+            if owner is not None:
+                raise ValueError(f"Column '{column}' is already provided by '{owner.name}'")
+        self.dimensions[dimension.name] = dimension
+        return dimension
+
+    def owner(self, column, required=True):
+        """The dimension providing a column."""
+        for dimension in self.dimensions.values():
+            if column in dimension.columns:
+                return dimension
+        if required:
+            raise KeyError(f"No registered dimension provides '{column}'")
+        return None
+
+    @property
+    def columns(self):
+        return [c for d in self.dimensions.values() for c in d.columns]
+
+    def lookup(self, fact, columns=None):
+        """
+        Joined values for the call rows as a new frame (fact is not modified).
+
+        Parameters:
+        -----------
+        fact : pd.DataFrame
+            Call rows with the integer key columns (see add_join_keys)
+        columns : list of str, optional
+            Dimension columns to fetch, defaults to all registered columns
+
+        Returns:
+        --------
+        pd.DataFrame
+            One column per requested dimension column, aligned to fact.index
+        """
+        columns = self.columns if columns is None else list(columns)
+        positions = {}
+        result = {}
+        for column in columns:
+            dimension = self.owner(column)
+            if dimension.name not in positions:
+                positions[dimension.name] = dimension.lookup(fact[dimension.fact_key])
+            result[column] = dimension.take(column, positions[dimension.name], fact.index)
+        return pd.DataFrame(result, index=fact.index)
+
+    def attach(self, fact, columns=None):
+        """Write the joined columns into fact in place and return it."""
+        for column, values in self.lookup(fact, columns).items():
+            fact[column] = values
+        return fact
+
+    def view(self, fact):
+        """A JoinedView exposing the dimension columns lazily."""
+        return JoinedView(fact, self)
+
+
+class JoinedView:
+    """
+    Read-only view of the call rows plus virtual dimension columns.
+
+    Columns of the call frame are returned directly; dimension columns are
+    looked up on first access and memoized, without being stored in the
+    call frame.
+    """
+
+    def __init__(self, fact, joiner):
+        self.fact = fact
+        self.joiner = joiner
+        self._positions = {}
+        self._values = {}
+
+    @property
+    def columns(self):
+        return list(self.fact.columns) + [c for c in self.joiner.columns
+                                          if c not in self.fact.columns]
+
+    def __len__(self):
+        return len(self.fact)
+
+    def __getitem__(self, column):
+        if isinstance(column, (list, tuple)):
+            return self.to_frame(column)
+        if column in self.fact.columns:
+            return self.fact[column]
+        if column not in self._values:
+            dimension = self.joiner.owner(column)
+            if dimension.name not in self._positions:
+                self._positions[dimension.name] = dimension.lookup(self.fact[dimension.fact_key])
+            self._values[column] = dimension.take(
+                column, self._positions[dimension.name], self.fact.index)
+        return self._values[column]
+
+    def to_frame(self, columns=None):
+        """Materialize the selected (or all) columns as a DataFrame."""
+        columns = self.columns if columns is None else list(columns)
+        return pd.DataFrame({c: self[c] for c in columns}, index=self.fact.index)
+
+
+def add_join_keys(fact, timestamp_column='CallDateAndTimeStart', parser=None):
+    """
+    Add 'day_key', 'month_key' and 'quarter_key' to the call rows in place.
+
+    Keys that are already present are left untouched.
+    """
+    if all(k in fact.columns for k in KEY_COLUMNS):
+        return fact
+    timestamps = (parser or TimestampParser()).parse(fact[timestamp_column])
+    for column, keys in join_keys(timestamps).items():
+        if column not in fact.columns:
+            fact[column] = keys
+    return fact
+
+
+def unemployment_dimension(path):
+    """Monthly Alberta unemployment rate from the cleaned CSV (Date, Value)."""
+    df = pd.read_csv(path)
+    keys = month_key(pd.to_datetime(df['Date'], format='%Y-%m', errors='coerce'))
+    return Dimension('unemployment', 'month_key', keys,
+                     df[['Value']].rename(columns={'Value': 'AlbertaUnemploymentRate'}))
+
+
+def weather_dimension(path, location=None):
+    """
+    Daily weather (Parquet, Arrow IPC or CSV); keyed by the UTC date.
+
+    Multi-location files are filtered to `location` when it is given.
+    """
+    df = read_weather(path)
+    if 'location' in df.columns:
+        if location is not None:
+            df = df[df['location'] == location]
+        df = df.drop(columns=['location'])
+    keys = day_key(pd.to_datetime(df['date'], utc=True))
+    return Dimension('weather', 'day_key', keys, df.drop(columns=['date']))
+
+
+def ems_dimension(path, column='QuarterlyOpioidEMSResponsesAB'):
+    """Quarterly opioid EMS responses (Year_Quarter, Value)."""
+    df = pd.read_csv(path)
+    keys = quarter_keys_from_labels(df['Year_Quarter'])
+    return Dimension('ems', 'quarter_key', keys, df[['Value']].rename(columns={'Value': column}))
+
+
+def exogenous_joiner(unemployment_csv=None, weather_csv=None, ems_csv=None):
+    """Build a DimensionJoiner with whichever exogenous tables are given."""
+    joiner = DimensionJoiner()
+    if unemployment_csv:
+        joiner.register(unemployment_dimension(unemployment_csv))
+    if weather_csv:
+        joiner.register(weather_dimension(weather_csv))
+    if ems_csv:
+        joiner.register(ems_dimension(ems_csv))
+    return joiner
@@ -0,0 +1,288 @@
+"""
+Mental Health Datathon - Single-Pass Call Distribution Kernel
+=============================================================
+
+Computes every time distribution used by time_based_distributions.py (year,
+month, day of month, hour, day of week) plus the Hour x DayOfWeek and
+Month x Year cross-tabs from one pass over the data.
+
+Each call is reduced to integer codes (year offset, month, day, hour, day of
+week) which are combined into one joint code; a single np.bincount over the
+joint codes yields the full (year, month, day, hour, weekday) count array,
+and every histogram or cross-tab is a sum over some of its axes. Counts from
+different chunks or partitions are merged by adding the arrays, so the
+kernel works the same for in-memory, streamed and partitioned data.
+
+A row missing some components (e.g. Hour is blank but DayOfWeek is not) is
+left out of the joint array but still counted in the one-dimensional
+histograms of the components it has, as value_counts() on each column would.
+Cross-tabs count only rows with every component.
+
+Usage:
+------
+    counts = DistributionCounts.from_frame(df)
+    counts.hour()                   # pd.Series indexed 0..23
+    counts.hour_by_day_of_week()    # pd.DataFrame 24 x 7
+
+    total = DistributionCounts.empty()
+    for chunk in chunks:
+        total += DistributionCounts.from_frame(chunk)
+
+Author: [Mike Baran]
+"""
+
+import numpy as np
+import pandas as pd
+
+from schema import DAY_ORDER, MONTH_ORDER
+
+# Axis sizes after the year axis: month, day of month, hour, day of week
+SHAPE = (12, 31, 24, 7)
+DIMENSIONS = ('Year', 'Month', 'Day', 'Hour', 'DayOfWeek')
+AXIS_SIZES = dict(zip(DIMENSIONS[1:], SHAPE))
+
+
+class DistributionCounts:
+    """
+    Joint call counts over (year, month, day, hour, day of week).
+
+    Parameters:
+    -----------
+    base_year : int
+        Calendar year of index 0 on the year axis
+    counts : np.ndarray
+        int64 array of shape (n_years, 12, 31, 24, 7)
+    missing : int
+        Rows excluded from the joint array because a date/time component was missing
+    available : iterable of str
+        Dimensions present in the source data; others were coded as 0
+    partial : dict, optional
+        Per-dimension counts of the excluded rows that do have that component:
+        {year: count} for 'Year', arrays of AXIS_SIZES for the others
+    """
+
+    def __init__(self, base_year, counts, missing=0, available=DIMENSIONS, partial=None):
+        self.base_year = int(base_year)
+        self.counts = counts
+        self.missing = int(missing)
+        self.available = frozenset(available)
+        self.partial = partial if partial is not None else _empty_partial()
+
+    @classmethod
+    def empty(cls):
+        return cls(0, np.zeros((0,) + SHAPE, dtype=np.int64))
+
+    @classmethod
+    def from_codes(cls, year, month, day, hour, day_of_week, available=DIMENSIONS):
+        """
+        Count integer-coded rows in one pass.
+
+        Parameters:
+        -----------
+        year : array of int
+            Calendar year
+        month, day : array of int
+            1-based month (1-12) and day of month (1-31)
+        hour : array of int
+            Hour of day (0-23)
+        day_of_week : array of int
+            0 = Monday ... 6 = Sunday
+        Rows where any code is negative or out of range are counted as missing;
+        their in-range codes still go to the per-dimension histograms.
+        """
+        year = np.asarray(year, dtype=np.int64)
+        codes = {'Month': np.asarray(month, dtype=np.int64) - 1,
+                 'Day': np.asarray(day, dtype=np.int64) - 1,
+                 'Hour': np.asarray(hour, dtype=np.int64),
+                 'DayOfWeek': np.asarray(day_of_week, dtype=np.int64)}
+        in_range = {name: (values >= 0) & (values < AXIS_SIZES[name])
+                    for name, values in codes.items()}
+        in_range['Year'] = year > 0
+        valid = np.logical_and.reduce(list(in_range.values()))
+
+        partial = _empty_partial()
+        if not valid.all():
+            excluded = ~valid
+            years, year_counts = np.unique(year[excluded & in_range['Year']], return_counts=True)
+            partial['Year'] = dict(zip(years.tolist(), year_counts.tolist()))
+            for name, values in codes.items():
+                partial[name] = np.bincount(values[excluded & in_range[name]],
+                                            minlength=AXIS_SIZES[name])
+        month, day, hour, day_of_week = (codes[n] for n in DIMENSIONS[1:])
+
+        if not valid.any():
+            result = cls.empty()
+            result.missing = len(valid)
+            result.available = frozenset(available)
+            result.partial = partial
+            return result
+
+        base_year = int(year[valid].min())
+        n_years = int(year[valid].max()) - base_year + 1
+        joint = (((((year[valid] - base_year) * 12 + month[valid]) * 31 + day[valid]) * 24
+                  + hour[valid]) * 7 + day_of_week[valid])
+        counts = np.bincount(joint, minlength=n_years * int(np.prod(SHAPE)))
+        return cls(base_year, counts.reshape((n_years,) + SHAPE).astype(np.int64),
+                   missing=int((~valid).sum()), available=available, partial=partial)
+
+    @classmethod
+    def from_timestamps(cls, timestamps):
+        """Count a datetime column, deriving the codes with datetime64 arithmetic."""
+        values = pd.Series(timestamps).to_numpy(dtype='datetime64[ns]')
+        valid = ~np.isnat(values)
+        values = values[valid]
+        days = values.astype('datetime64[D]')
+        months = values.astype('datetime64[M]')
+        year = values.astype('datetime64[Y]').astype(np.int64) + 1970
+        month = months.astype(np.int64) % 12 + 1
+        day = (days - months.astype('datetime64[D]')).astype(np.int64) + 1
+        hour = (values - days).astype('timedelta64[h]').astype(np.int64)
+        # 1970-01-01 was a Thursday (Monday = 0)
+        day_of_week = (days.astype(np.int64) + 3) % 7
+        result = cls.from_codes(year, month, day, hour, day_of_week)
+        result.missing += int((~valid).sum())
+        return result
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Count a call report frame.
+
+        Uses 'CallDateAndTimeStart' when it is a datetime column, otherwise the
+        derived Year/Month/Day/Hour/DayOfWeek columns. Derived columns that are
+        absent are coded as 0 and marked unavailable.
+        """
+        if 'CallDateAndTimeStart' in df.columns and \
+                pd.api.types.is_datetime64_any_dtype(df['CallDateAndTimeStart']):
+            return cls.from_timestamps(df['CallDateAndTimeStart'])
+
+        n = len(df)
+        available = [d for d in DIMENSIONS if d in df.columns]
+        if 'Month' not in available and 'MonthName' in df.columns:
+            available.append('Month')
+
+        def numeric(column, default):
+            if column not in df.columns:
+                return np.full(n, default, dtype=np.int64)
+            return pd.to_numeric(df[column], errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+
+        if 'Month' in df.columns:
+            month = numeric('Month', 1)
+        elif 'MonthName' in df.columns:
+            month = pd.Categorical(df['MonthName'], categories=MONTH_ORDER).codes.astype(np.int64) + 1
+            month[month == 0] = -1
+        else:
+            month = np.full(n, 1, dtype=np.int64)
+        day_of_week = pd.Categorical(df['DayOfWeek'], categories=DAY_ORDER).codes \
+            .astype(np.int64) if 'DayOfWeek' in df.columns else np.zeros(n, dtype=np.int64)
+
+        return cls.from_codes(numeric('Year', 1970), month, numeric('Day', 1),
+                              numeric('Hour', 0), day_of_week, available=available)
+
+    # ------------------------------------------------------------------
+    # Merging
+    # ------------------------------------------------------------------
+
+    def merge(self, other):
+        """Return the sum of two partial results (year ranges are aligned)."""
+        partial = _merge_partial(self.partial, other.partial)
+        if len(self.counts) == 0:
+            return DistributionCounts(other.base_year, other.counts.copy(),
+                                      self.missing + other.missing, other.available, partial)
+        if len(other.counts) == 0:
+            return DistributionCounts(self.base_year, self.counts.copy(),
+                                      self.missing + other.missing, self.available, partial)
+
+        base_year = min(self.base_year, other.base_year)
+        last_year = max(self.base_year + len(self.counts), other.base_year + len(other.counts))
+        counts = np.zeros((last_year - base_year,) + SHAPE, dtype=np.int64)
+        for part in (self, other):
+            start = part.base_year - base_year
+            counts[start:start + len(part.counts)] += part.counts
+        return DistributionCounts(base_year, counts, self.missing + other.missing,
+                                  self.available & other.available, partial)
+
+    def __add__(self, other):
+        return self.merge(other)
+
+    # ------------------------------------------------------------------
+    # Histograms and cross-tabs
+    # ------------------------------------------------------------------
+
+    @property
+    def total(self):
+        """Rows with every component (the rows in the joint array)."""
+        return int(self.counts.sum())
+
+    def _require(self, *dimensions):
+        missing = [d for d in dimensions if d not in self.available]
+        if missing:
+            raise KeyError(f"Dimensions not present in the source data: {missing}")
+
+    def _years(self):
+        return np.arange(self.base_year, self.base_year + len(self.counts))
+
+    def year(self):
+        """Calls per year (years without calls omitted)."""
+        self._require('Year')
+        totals = pd.Series(self.counts.sum(axis=(1, 2, 3, 4)), index=self._years())
+        extra = pd.Series(self.partial['Year'], dtype=np.int64)
+        totals = totals.add(extra, fill_value=0).astype(np.int64).sort_index()
+        series = totals.rename('count').rename_axis('Year')
+        return series[series > 0]
+
+    def month(self):
+        """Calls per month number 1-12."""
+        self._require('Month')
+        return pd.Series(self.counts.sum(axis=(0, 2, 3, 4)) + self.partial['Month'],
+                         index=pd.Index(range(1, 13), name='Month'), name='count')
+
+    def month_name(self):
+        """Calls per month name, January to December."""
+        return self.month().set_axis(pd.Index(MONTH_ORDER, name='MonthName'))
+
+    def day(self):
+        """Calls per day of month 1-31."""
+        self._require('Day')
+        return pd.Series(self.counts.sum(axis=(0, 1, 3, 4)) + self.partial['Day'],
+                         index=pd.Index(range(1, 32), name='Day'), name='count')
+
+    def hour(self):
+        """Calls per hour of day 0-23."""
+        self._require('Hour')
+        return pd.Series(self.counts.sum(axis=(0, 1, 2, 4)) + self.partial['Hour'],
+                         index=pd.Index(range(24), name='Hour'), name='count')
+
+    def day_of_week(self):
+        """Calls per day of week, Monday to Sunday."""
+        self._require('DayOfWeek')
+        return pd.Series(self.counts.sum(axis=(0, 1, 2, 3)) + self.partial['DayOfWeek'],
+                         index=pd.Index(DAY_ORDER, name='DayOfWeek'), name='count')
+
+    def hour_by_day_of_week(self):
+        """Cross-tab of calls: rows are hours 0-23, columns Monday to Sunday."""
+        self._require('Hour', 'DayOfWeek')
+        return pd.DataFrame(self.counts.sum(axis=(0, 1, 2)),
+                            index=pd.Index(range(24), name='Hour'),
+                            columns=pd.Index(DAY_ORDER, name='DayOfWeek'))
+
+    def month_by_year(self):
+        """Cross-tab of calls: rows are month names, columns are years."""
+        self._require('Year', 'Month')
+        return pd.DataFrame(self.counts.sum(axis=(2, 3, 4)).T,
+                            index=pd.Index(MONTH_ORDER, name='MonthName'),
+                            columns=pd.Index(self._years(), name='Year'))
+
+
+def _empty_partial():
+    partial = {name: np.zeros(size, dtype=np.int64) for name, size in AXIS_SIZES.items()}
+    partial['Year'] = {}
+    return partial
+
+
+def _merge_partial(a, b):
+    merged = {name: a[name] + b[name] for name in AXIS_SIZES}
+    merged['Year'] = dict(a['Year'])
+    for year, count in b['Year'].items():
+        merged['Year'][year] = merged['Year'].get(year, 0) + count
+    return merged
@@ -0,0 +1,244 @@
+"""
+Mental Health Datathon - Incremental Call Batch Ingestion
+=========================================================
+
+Appends a new batch of raw call reports (e.g. one month, in the
+Primary_CallReports_v1.2.csv layout) to the partitioned call store without
+touching the archive:
+
+1. the batch is read once (malformed lines are quarantined, see ingest.py)
+2. rows whose CallReportNum is already in the store are dropped; only the
+   store partitions of the months the batch touches are read, and only their
+   CallReportNum column. While the call history is still only a CSV (e.g.
+   Primary_CallReports_v1.7.csv next to the store path), the store is first
+   converted from it, so archived rows are never appended again
+3. the datetime features, 'Year&Month', 'Quarter' and the unemployment,
+   weather and EMS values are derived for the new rows alone
+4. the rows are folded into the call volume cube, whose monthly and
+   quarterly totals are updated in place, and then written as new files in
+   their month partitions
+
+Re-running the same batch is a no-op, so a failed or repeated nightly run
+can simply be retried. The cube records a key per batch (a hash of its
+CallReportNum values) and is saved before the partitions are written: a run
+interrupted after the cube update skips the cube on retry and writes the
+rows the store still lacks, which the cube already counts. The cost is
+proportional to the batch, not to the archive.
+
+Usage:
+------
+    python incremental_ingest.py new_calls_2024_01.csv \\
+        --store Primary_CallReports_v1.7.parquet --data-dir "<data folder>"
+
+Author: [Mike Baran]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+
+import pandas as pd
+
+from call_cube import CallCube, cube_path_for, write_cube_meta
+from call_store import (PARTITION_COLUMN, convert_csv_to_store, read_call_store,
+                        store_path_for, write_partitions)
+from datetime_parsing import month_labels
+from dimension_join import KEY_COLUMNS, add_join_keys, exogenous_joiner
+from ingest import read_call_reports
+from instrumentation import stage
+from period_keys import format_quarters
+from weather_decode import find_weather
+
+logger = logging.getLogger(__name__)
+
+ID_COLUMN = 'CallReportNum'
+UNEMPLOYMENT_FILE = 'Unemployment_Rate_Alberta_Cleaned.csv'
+EMS_FILE = 'OpiodEMSResponsesAlberta.csv'
+
+
+def exogenous_tables(data_dir):
+    """
+    ingest_batch() keyword arguments for the exogenous tables found in data_dir.
+
+    Tables that are missing are passed as None (their columns are left out)
+    and logged.
+    """
+    def optional(path):
+        if not os.path.exists(path):
+            logger.warning(f"{path} not found; its columns are left out")
+            return None
+        return path
+
+    return dict(unemployment_csv=optional(os.path.join(data_dir, UNEMPLOYMENT_FILE)),
+                weather_path=optional(find_weather(data_dir)),
+                ems_csv=optional(os.path.join(data_dir, EMS_FILE)))
+
+
+def source_csv_for(root):
+    """Call report CSV a store folder is converted from (see store_path_for)."""
+    return os.path.splitext(root.rstrip(os.sep))[0] + '.csv'
+
+
+def ensure_source_store(root, source=None):
+    """
+    Convert the source CSV to the store at root if the store does not exist yet.
+
+    Parameters:
+    -----------
+    root : str
+        Partitioned call store folder
+    source : str, optional
+        Call report CSV holding the archive, defaults to source_csv_for(root);
+        nothing is converted when it does not exist either
+    """
+    if os.path.isdir(root):
+        return
+    source = source or source_csv_for(root)
+    if not os.path.exists(source):
+        return
+    if os.path.abspath(store_path_for(source)) != os.path.abspath(root):
+        raise ValueError(f"The store of {source} is {store_path_for(source)}, not {root}")
+    logger.info(f"Converting {source} to the store {root} before appending to it")
+    with stage('ingest.convert_source'):
+        convert_csv_to_store(source, root)
+
+
+def existing_ids(root, months):
+    """CallReportNum values already stored in the given month partitions."""
+    if not os.path.isdir(root) or not months:
+        return pd.Index([])
+    stored = read_call_store(root, columns=[ID_COLUMN], months=months)
+    return pd.Index(stored[ID_COLUMN].dropna().unique())
+
+
+def batch_key(batch):
+    """Key of a batch for the cube: a hash of its sorted CallReportNum values."""
+    ids = sorted(batch[ID_COLUMN].dropna().astype(str).unique())
+    return hashlib.sha256('\n'.join(ids).encode('utf-8')).hexdigest()[:16]
+
+
+def batch_months(batch):
+    """
+    The 'Year&Month' partitions a batch touches, as write_partitions() names them.
+
+    Rows without a month (unparseable timestamps) are listed as None, which
+    read_call_store() maps to the null partition.
+    """
+    months = batch[PARTITION_COLUMN]
+    labels = sorted(months.dropna().astype(str).unique())
+    return labels + ([None] if months.isna().any() else [])
+
+
+def prepare_batch(batch, unemployment_csv=None, weather_path=None, ems_csv=None):
+    """
+    Derive every pipeline column (v1.2 -> v1.7) for a batch of raw call rows.
+
+    Runs the same steps as the pipeline stages, on the batch only.
+    """
+    # Imported on use, so importing this module stays light
+    from process_data import add_datetime_features
+
+    add_datetime_features(batch)
+    add_join_keys(batch)
+    batch['Year&Month'] = month_labels(batch['month_key'])
+    batch['Quarter'] = format_quarters(batch['quarter_key'])
+    exogenous_joiner(unemployment_csv=unemployment_csv, weather_csv=weather_path,
+                     ems_csv=ems_csv).attach(batch)
+    return batch.drop(columns=list(KEY_COLUMNS))
+
+
+def ingest_batch(batch_csv, root, unemployment_csv=None, weather_path=None, ems_csv=None,
+                 cube_path=None, source=None):
+    """
+    Append the new rows of a call batch to the store and update the cube.
+
+    Parameters:
+    -----------
+    batch_csv : str
+        Raw call reports to add
+    root : str
+        Partitioned call store folder; created from source if missing
+    unemployment_csv, weather_path, ems_csv : str, optional
+        Exogenous tables; columns whose table is not given are left out
+    cube_path : str, optional
+        Cube folder, defaults to cube_path_for(root); updated only if it exists
+    source : str, optional
+        Call report CSV of the archive, defaults to source_csv_for(root)
+
+    Returns:
+    --------
+    dict
+        'read', 'duplicates' and 'appended' row counts and the 'months' touched
+    """
+    with stage('ingest.read_batch') as metrics:
+        batch = read_call_reports(batch_csv)
+        metrics.rows = len(batch)
+    read = len(batch)
+
+    # Idempotence: drop ids repeated inside the batch and ids already stored
+    ensure_source_store(root, source)
+    batch = batch.drop_duplicates(ID_COLUMN, keep='first').reset_index(drop=True)
+    # Keyed before the store is consulted, so a retry of a half-written batch
+    # has the same key
+    key = batch_key(batch)
+    with stage('ingest.prepare_batch', rows=len(batch)):
+        batch = prepare_batch(batch, unemployment_csv, weather_path, ems_csv)
+    with stage('ingest.deduplicate', rows=len(batch)):
+        batch = batch[~batch[ID_COLUMN].isin(existing_ids(root, batch_months(batch)))]
+    summary = {'read': read, 'duplicates': read - len(batch), 'appended': len(batch),
+               'months': batch_months(batch)}
+
+    if batch.empty:
+        logger.info(f"No new calls in {batch_csv} ({read} rows already stored)")
+        return summary
+
+    cube_path = cube_path or cube_path_for(root)
+    meta_path = os.path.join(cube_path, 'meta.json')
+    update_cube = os.path.exists(meta_path)
+    if update_cube:
+        with stage('ingest.update_cube', rows=len(batch)):
+            CallCube.load(cube_path).update(batch, batch=key).save(cube_path)
+
+    with stage('ingest.write_partitions', rows=len(batch)):
+        write_partitions(batch, root)
+
+    if update_cube:
+        # The cube now covers the appended rows; keep it marked current
+        with open(meta_path) as f:
+            source = json.load(f).get('source') or root
+        write_cube_meta(source if os.path.exists(source) else root, cube_path)
+
+    logger.info(f"Appended {summary['appended']} calls to {root} "
+                f"({summary['duplicates']} duplicates skipped), months {summary['months']}")
+    return summary
+
+
+def main():
+    """
+    Append one or more call batches to the store.
+    """
+    parser = argparse.ArgumentParser(description='Append new call batches to the call store')
+    parser.add_argument('batches', nargs='+', help='raw call report CSV batches')
+    parser.add_argument('--store', default='Primary_CallReports_v1.7.parquet')
+    parser.add_argument('--data-dir', default=os.getcwd(),
+                        help='folder holding the exogenous tables')
+    parser.add_argument('--cube', help='cube folder (default: next to the store)')
+    parser.add_argument('--source',
+                        help='call report CSV the store is converted from while it does not '
+                             'exist yet (default: the store path with a .csv extension)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    tables = exogenous_tables(args.data_dir)
+    for batch_csv in args.batches:
+        summary = ingest_batch(batch_csv, args.store, cube_path=args.cube,
+                               source=args.source, **tables)
+        print(f"{batch_csv}: {summary['appended']} appended, "
+              f"{summary['duplicates']} duplicates skipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Mental Health Datathon - Call Report CSV Ingestion
+==================================================
+
+One shared reader for the call report CSV files. The dialect (delimiter and
+quote character) and the header are sniffed once from the start of the file,
+and the file is parsed once with a fast engine (pyarrow when installed,
+otherwise pandas' C engine) using an explicit type map for the known call
+report columns.
+
+Malformed lines do not abort the load and are not silently dropped: they are
+written to a quarantine CSV (line number, reason, raw text) next to the input
+and counted in the log. A line is malformed when it has the wrong number of
+fields or a value of a numeric column that is not a number (e.g. 'n/a?' as a
+rate or '20x3' as a Year), or not a whole number in range for an integer column.
+
+Usage:
+------
+    from ingest import read_call_reports
+    df = read_call_reports('processed_call_reports.csv')
+
+Author: [Mike Baran]
+"""
+
+import csv
+import logging
+import os
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from schema import CALL_REPORT_SCHEMA, TIMESTAMP_COLUMN, apply_schema, columns_of_type
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pragma: no cover - pyarrow is optional here
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+SNIFF_BYTES = 64 * 1024
+
+# Types applied while parsing (from schema.CALL_REPORT_SCHEMA); integers,
+# floats and timestamps are converted after the read so that a stray '2020.0',
+# a non-numeric value or an odd timestamp cannot fail the load
+STRING_COLUMNS = columns_of_type('string')
+CATEGORY_COLUMNS = columns_of_type('category')
+INTEGER_COLUMNS = columns_of_type('integer')
+FLOAT_COLUMNS = columns_of_type('float')
+NUMERIC_COLUMNS = INTEGER_COLUMNS + FLOAT_COLUMNS
+
+_SKIP_WARNING = re.compile(r'Skipping line (\d+): (.*)')
+
+
+class Dialect:
+    """Delimiter, quote character and header of a CSV file."""
+
+    def __init__(self, delimiter, quotechar, columns):
+        self.delimiter = delimiter
+        self.quotechar = quotechar
+        self.columns = columns
+
+
+def sniff_dialect(path):
+    """
+    Detect the delimiter, quote character and header from the start of a file.
+
+    Falls back to a comma-separated, double-quoted layout when the sample is
+    not conclusive.
+    """
+    with open(path, newline='', encoding='utf-8-sig', errors='replace') as f:
+        sample = f.read(SNIFF_BYTES)
+    try:
+        sniffed = csv.Sniffer().sniff(sample, delimiters=',;\t|')
+        delimiter, quotechar = sniffed.delimiter, sniffed.quotechar or '"'
+    except csv.Error:
+        delimiter, quotechar = ',', '"'
+    header = next(csv.reader(sample.splitlines()[:1], delimiter=delimiter, quotechar=quotechar), [])
+    return Dialect(delimiter, quotechar, [c.strip() for c in header])
+
+
+def quarantine_path_for(path):
+    """Default quarantine file for an input CSV."""
+    return os.path.splitext(path)[0] + '.quarantine.csv'
+
+
+def _read_c(path, dialect, usecols):
+    """Parse with pandas' C engine, collecting the lines it skips."""
+    dtype = {c: 'string' for c in STRING_COLUMNS if c in dialect.columns}
+    dtype.update({c: 'category' for c in CATEGORY_COLUMNS if c in dialect.columns})
+    dtype.update({c: 'string' for c in NUMERIC_COLUMNS if c in dialect.columns})
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', pd.errors.ParserWarning)
+        df = pd.read_csv(path, sep=dialect.delimiter, quotechar=dialect.quotechar,
+                         usecols=usecols, dtype=dtype, engine='c', low_memory=False,
+                         on_bad_lines='warn')
+
+    bad = []
+    for warning in caught:
+        for number, reason in _SKIP_WARNING.findall(str(warning.message)):
+            bad.append({'line_number': int(number), 'reason': reason.strip(), 'text': None})
+    return df, bad
+
+
+def _read_pyarrow(path, dialect, usecols):
+    """Parse with pyarrow's multithreaded reader, collecting invalid rows."""
+    bad = []
+
+    def handler(row):
+        bad.append({'line_number': row.number,
+                    'reason': f"expected {row.expected_columns} fields, saw {row.actual_columns}",
+                    'text': row.text})
+        return 'skip'
+
+    types = {c: pa.string() for c in STRING_COLUMNS + [TIMESTAMP_COLUMN]}
+    types.update({c: pa.dictionary(pa.int32(), pa.string()) for c in CATEGORY_COLUMNS})
+    types.update({c: pa.string() for c in NUMERIC_COLUMNS})
+    types = {c: t for c, t in types.items() if c in dialect.columns}
+
+    table = pa_csv.read_csv(
+        path,
+        read_options=pa_csv.ReadOptions(use_threads=True),
+        parse_options=pa_csv.ParseOptions(delimiter=dialect.delimiter,
+                                          quote_char=dialect.quotechar,
+                                          invalid_row_handler=handler),
+        convert_options=pa_csv.ConvertOptions(column_types=types, include_columns=usecols,
+                                              strings_can_be_null=True))
+    return table.to_pandas(), bad
+
+
+def _invalid_numbers(df):
+    """
+    Convert the numeric columns read as text to their schema dtypes, in place.
+
+    Values that do not convert become missing; integer columns also reject
+    fractions and values outside the range of their dtype.
+
+    Returns:
+    --------
+    pd.Series
+        Reason per row position for rows with an invalid value (others omitted)
+    """
+    reasons = pd.Series('', index=range(len(df)))
+    for column in NUMERIC_COLUMNS:
+        if column not in df.columns:
+            continue
+        dtype = CALL_REPORT_SCHEMA[column]
+        text = df[column].astype('string')
+        values = pd.to_numeric(text, errors='coerce').astype('float64')
+        failed = values.isna()
+        if column in INTEGER_COLUMNS:
+            limits = np.iinfo(dtype.lower())
+            failed |= (values % 1 != 0) | (values < limits.min) | (values > limits.max)
+        failed &= text.str.strip().fillna('') != ''
+        for position in failed.to_numpy().nonzero()[0]:
+            reasons.iloc[position] += f"; invalid {column} value {text.iloc[position]!r}"
+        df[column] = values.mask(failed).astype(dtype)
+    return reasons[reasons != ''].str.slice(2)
+
+
+def _locate_rows(path, dialect, bad, positions):
+    """
+    Line number and raw text of parsed rows, by their position in the frame.
+
+    Replays the parse with the csv module: blank lines and the lines the
+    engine skipped (listed in bad) do not produce a row.
+    """
+    bad_numbers = {b['line_number'] for b in bad if b['line_number'] is not None}
+    bad_texts = {b['text'] for b in bad if b['line_number'] is None}
+    wanted = set(positions)
+    buffer, found = [], {}
+
+    def lines():
+        with open(path, newline='', encoding='utf-8-sig', errors='replace') as f:
+            for line in f:
+                buffer.append(line.rstrip('\r\n'))
+                yield line
+
+    reader = csv.reader(lines(), delimiter=dialect.delimiter, quotechar=dialect.quotechar)
+    next(reader, None)
+    position, end = 0, reader.line_num
+    for record in reader:
+        start, end = end + 1, reader.line_num
+        text = '\n'.join(buffer)
+        buffer.clear()
+        if not record or start in bad_numbers or text in bad_texts:
+            continue
+        if position in wanted:
+            found[position] = (start, text)
+            if len(found) == len(wanted):
+                break
+        position += 1
+    return found
+
+
+def _complete_bad_lines(path, bad):
+    """Fill in missing line numbers or raw text with one scan of the file."""
+    wanted_numbers = {b['line_number'] for b in bad if b['text'] is None}
+    wanted_texts = {b['text'] for b in bad if b['line_number'] is None}
+    if not wanted_numbers and not wanted_texts:
+        return bad
+
+    text_by_number, number_by_text = {}, {}
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for number, line in enumerate(f, start=1):
+            line = line.rstrip('\r\n')
+            if number in wanted_numbers:
+                text_by_number[number] = line
+            if line in wanted_texts and line not in number_by_text:
+                number_by_text[line] = number
+
+    for b in bad:
+        if b['text'] is None:
+            b['text'] = text_by_number.get(b['line_number'])
+        if b['line_number'] is None:
+            b['line_number'] = number_by_text.get(b['text'])
+    return bad
+
+
+def read_call_reports(path, usecols=None, engine=None, quarantine_path=None):
+    """
+    Read a call report CSV in a single parse.
+
+    Parameters:
+    -----------
+    path : str
+        CSV file to read
+    usecols : list of str, optional
+        Columns to load
+    engine : str, optional
+        'pyarrow' or 'c'; defaults to pyarrow when it is installed
+    quarantine_path : str, optional
+        Where malformed lines are written (default: <input>.quarantine.csv)
+
+    Returns:
+    --------
+    pd.DataFrame
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Input file not found: {path}")
+
+    dialect = sniff_dialect(path)
+    engine = engine or ('pyarrow' if pa is not None else 'c')
+    logger.info(f"Reading {path} with the {engine} engine "
+                f"(delimiter {dialect.delimiter!r}, {len(dialect.columns)} columns)")
+
+    if engine == 'pyarrow':
+        df, bad = _read_pyarrow(path, dialect, usecols)
+    elif engine == 'c':
+        df, bad = _read_c(path, dialect, usecols)
+    else:
+        raise ValueError(f"engine must be 'pyarrow' or 'c', got '{engine}'")
+
+    invalid = _invalid_numbers(df)
+    if not invalid.empty:
+        located = _locate_rows(path, dialect, bad, invalid.index)
+        for position, reason in invalid.items():
+            line_number, text = located.get(position, (None, None))
+            bad.append({'line_number': line_number, 'reason': reason, 'text': text})
+        df = df.drop(index=df.index[invalid.index]).reset_index(drop=True)
+
+    if bad:
+        bad = _complete_bad_lines(path, bad)
+        quarantine_path = quarantine_path or quarantine_path_for(path)
+        pd.DataFrame(bad, columns=['line_number', 'reason', 'text']) \
+            .sort_values('line_number', na_position='last') \
+            .to_csv(quarantine_path, index=False)
+        logger.warning(f"{len(bad)} malformed lines quarantined to {quarantine_path}")
+
+    return apply_schema(df)
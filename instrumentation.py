@@ -0,0 +1,220 @@
+"""
+Mental Health Datathon - Stage Timing and Profiling Instrumentation
+===================================================================
+
+One context manager shared by the processing scripts and the pipeline. For
+each stage it records wall time, CPU time (including worker processes that
+finished inside the stage), rows per second, the process memory high-water
+mark and the bytes read and written, then appends the record as one JSON line
+to 'data_processing.metrics.jsonl' next to 'data_processing.log' and logs a
+one-line summary.
+
+Profiling is switched on per run with environment variables, without code
+edits:
+
+DATATHON_PROFILE         'cprofile' (a .prof file per stage, open with
+                         snakeviz or pstats) or 'sample' (pyinstrument
+                         sampling profiler, an .html file per stage)
+DATATHON_PROFILE_STAGES  comma-separated stage names to profile (default: all)
+DATATHON_PROFILE_DIR     output folder for the profiles (default: 'profiles')
+DATATHON_METRICS_FILE    override the JSON lines file
+DATATHON_RUN_ID          tag shared by every line of one run (default: random)
+
+Usage:
+------
+    from instrumentation import stage
+    with stage('read_csv') as metrics:
+        df = pd.read_csv(path)
+        metrics.rows = len(df)
+
+Author: [Mike Baran]
+"""
+
+import contextlib
+import cProfile
+import datetime
+import json
+import logging
+import os
+import resource
+import sys
+import time
+import uuid
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - psutil is optional
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+LOG_FILE = 'data_processing.log'
+METRICS_FILE = 'data_processing.metrics.jsonl'
+RUN_ID = os.environ.get('DATATHON_RUN_ID') or uuid.uuid4().hex[:12]
+
+
+class StageMetrics:
+    """Measurements of one stage; set `rows` inside the block for throughput."""
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.record = None
+
+
+def metrics_path():
+    """JSON lines file next to the 'data_processing.log' handler, if one is set up."""
+    if os.environ.get('DATATHON_METRICS_FILE'):
+        return os.environ['DATATHON_METRICS_FILE']
+    for handler in logging.getLogger().handlers:
+        filename = getattr(handler, 'baseFilename', None)
+        if filename and os.path.basename(filename) == LOG_FILE:
+            return os.path.join(os.path.dirname(filename), METRICS_FILE)
+    return METRICS_FILE
+
+
+def _peak_rss_mb():
+    """Memory high-water mark of this process so far, in MB."""
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+
+def _io_bytes():
+    """(read, written) bytes of this process, or (None, None) when unavailable."""
+    if psutil is not None:
+        try:
+            counters = psutil.Process().io_counters()
+            return counters.read_bytes, counters.write_bytes
+        except (AttributeError, psutil.Error):
+            pass
+    try:
+        with open('/proc/self/io') as f:
+            fields = dict(line.split(': ') for line in f.read().splitlines())
+        # rchar/wchar count page-cache hits too, which is what a re-read costs here
+        return int(fields['rchar']), int(fields['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _cpu_seconds():
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _profile_requested(name):
+    mode = os.environ.get('DATATHON_PROFILE', '').lower()
+    if not mode:
+        return None
+    stages = os.environ.get('DATATHON_PROFILE_STAGES')
+    if stages and name not in [s.strip() for s in stages.split(',')]:
+        return None
+    return mode
+
+
+@contextlib.contextmanager
+def _profiler(name, mode):
+    """Profile the block with cProfile or pyinstrument and write the result."""
+    folder = os.environ.get('DATATHON_PROFILE_DIR', 'profiles')
+    os.makedirs(folder, exist_ok=True)
+    stem = os.path.join(folder, f"{name}-{RUN_ID}")
+
+    if mode == 'sample':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("DATATHON_PROFILE=sample needs pyinstrument; using cProfile")
+            mode = 'cprofile'
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(stem + '.html', 'w') as f:
+                    f.write(profiler.output_html())
+                logger.info(f"[{name}] sampling profile written to {stem}.html")
+            return
+
+    if mode != 'cprofile':
+        logger.warning(f"Unknown DATATHON_PROFILE '{mode}'; using cProfile")
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(stem + '.prof')
+        logger.info(f"[{name}] cProfile stats written to {stem}.prof")
+
+
+def write_record(record, path=None):
+    """Append one metrics record as a JSON line."""
+    with open(path or metrics_path(), 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+@contextlib.contextmanager
+def stage(name, rows=None, path=None):
+    """
+    Measure a block of code as one named stage.
+
+    Parameters:
+    -----------
+    name : str
+        Stage name recorded in the metrics line
+    rows : int, optional
+        Rows handled; can also be set on the yielded StageMetrics
+    path : str, optional
+        JSON lines file (default: metrics_path())
+
+    Yields:
+    -------
+    StageMetrics
+        record is filled in when the block exits, also when it raises
+    """
+    metrics = StageMetrics(name, rows)
+    mode = _profile_requested(name)
+    read_before, written_before = _io_bytes()
+    peak_before = _peak_rss_mb()
+    cpu_before = _cpu_seconds()
+    started = time.perf_counter()
+    status = 'ok'
+
+    try:
+        with _profiler(name, mode) if mode else contextlib.nullcontext():
+            yield metrics
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        wall = time.perf_counter() - started
+        read_after, written_after = _io_bytes()
+        peak_after = _peak_rss_mb()
+        metrics.record = {
+            'timestamp': datetime.datetime.now().isoformat(timespec='milliseconds'),
+            'run_id': RUN_ID,
+            'pid': os.getpid(),
+            'stage': name,
+            'status': status,
+            'wall_seconds': round(wall, 4),
+            'cpu_seconds': round(_cpu_seconds() - cpu_before, 4),
+            'rows': metrics.rows,
+            'rows_per_second': round(metrics.rows / wall, 1)
+            if metrics.rows is not None and wall > 0 else None,
+            'peak_rss_mb': round(peak_after, 1),
+            # Non-zero only when the stage raised the process high-water mark
+            'peak_rss_growth_mb': round(peak_after - peak_before, 1),
+            'read_bytes': None if read_before is None else read_after - read_before,
+            'write_bytes': None if written_before is None else written_after - written_before,
+        }
+        try:
+            write_record(metrics.record, path)
+        except OSError as e:
+            logger.warning(f"Could not write stage metrics: {e}")
+        rate = f", {metrics.record['rows_per_second']:,.0f} rows/s" \
+            if metrics.record['rows_per_second'] else ''
+        logger.info(f"[{name}] {status} in {wall:.2f}s (cpu {metrics.record['cpu_seconds']:.2f}s"
+                    f"{rate}, peak {peak_after:.0f} MB)")
+
@@ -0,0 +1,355 @@
+"""
+Mental Health Datathon - Multi-Core, Out-of-Core Execution Backend
+==================================================================
+
+Runs the existing analysis steps across cores on partitioned data, so the
+full call history never has to fit in memory at once:
+
+- the call report CSV is spilled to disk as the 'Year&Month'-partitioned
+  Parquet store (call_store.py) when no store exists yet
+- cube and distribution builds map over the store one month at a time in a
+  process pool; each worker reads only its own partition and returns a small
+  partial result, which the main process reduces (counts are added)
+- the datetime feature step reads the CSV in chunks, derives the features in
+  worker processes and spills each finished chunk to a temporary file; the
+  chunks are appended to the output in input order while at most a few are
+  in flight
+
+Every parallel result is the same as the single-process pandas code it
+replaces; `--verify` runs both and compares them.
+
+Usage:
+------
+    python parallel_backend.py cube Primary_CallReports_v1.7.csv --workers 32
+    python parallel_backend.py features Primary_CallReports_v1.2.csv \\
+        --output processed_call_reports.csv --verify
+
+Author: [Mike Baran]
+"""
+
+import argparse
+import collections
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from call_cube import (CUBE_KEYS, DAILY_EXOGENOUS, MONTHLY_EXOGENOUS, QUARTERLY_EXOGENOUS,
+                       CallCube, aggregate_calls, cube_path_for, write_cube_meta)
+from call_store import (PARTITION_COLUMN, call_report_columns, convert_csv_to_store,
+                        load_call_reports, partition_value, read_call_store, store_path_for)
+from datetime_parsing import TimestampParser, detect_format
+from distributions import DistributionCounts
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNKSIZE = 500_000
+CUBE_COLUMNS = ['CallDateAndTimeStart', 'Year&Month', 'Quarter'] + \
+    MONTHLY_EXOGENOUS + QUARTERLY_EXOGENOUS + DAILY_EXOGENOUS
+
+
+# ----------------------------------------------------------------------
+# Partitions
+# ----------------------------------------------------------------------
+
+def ensure_store(source, chunksize=1_000_000):
+    """
+    Return the partitioned store folder for source, spilling a CSV to disk first.
+
+    The CSV is converted chunk by chunk, so this works for files larger than RAM.
+    """
+    if os.path.isdir(source):
+        return source
+    root = store_path_for(source)
+    if not os.path.isdir(root):
+        logger.info(f"Spilling {source} to the partitioned store {root}")
+        convert_csv_to_store(source, root, chunksize)
+    return root
+
+
+def store_months(root):
+    """
+    'Year&Month' values of the store, read from the hive folder names.
+
+    The partition of rows without a month is listed last, as None.
+    """
+    months, has_null = [], False
+    for name in os.listdir(root):
+        key, sep, _ = name.partition('=')
+        if not sep or urllib.parse.unquote(key) != PARTITION_COLUMN or \
+                not os.path.isdir(os.path.join(root, name)):
+            continue
+        month = partition_value(name)
+        if month is None:
+            has_null = True
+        else:
+            months.append(month)
+    return sorted(months) + ([None] if has_null else [])
+
+
+def map_partitions(func, root, columns=None, max_workers=None):
+    """
+    Apply func to every month of the store in a process pool.
+
+    Parameters:
+    -----------
+    func : callable
+        Module-level function taking a pd.DataFrame (one month of rows)
+    root : str
+        Store folder
+    columns : list of str, optional
+        Columns each worker reads
+    max_workers : int, optional
+        Process pool size (default: number of cores)
+
+    Returns:
+    --------
+    list
+        func's results in month order
+    """
+    months = store_months(root)
+    logger.info(f"Mapping {func.__name__} over {len(months)} partitions of {root}")
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_run_partition, [func] * len(months), [root] * len(months),
+                             [columns] * len(months), months))
+
+
+def _run_partition(func, root, columns, month):
+    return func(read_call_store(root, columns=columns, months=[month]))
+
+
+# ----------------------------------------------------------------------
+# Cube and distributions
+# ----------------------------------------------------------------------
+
+def reduce_cube(parts):
+    """Combine per-partition (counts, exogenous) results into one CallCube."""
+    counts = pd.concat([c for c, _ in parts], ignore_index=True)
+    counts = counts.groupby(CUBE_KEYS, dropna=False)['Calls'].sum().reset_index()
+
+    exogenous = {}
+    for level in ('monthly', 'quarterly', 'daily'):
+        tables = [e[level] for _, e in parts if not e[level].empty]
+        # Quarters span several monthly partitions; keep the first value per key
+        exogenous[level] = pd.concat(tables).groupby(level=0).first() if tables \
+            else pd.DataFrame()
+    return CallCube(counts, exogenous)
+
+
+def build_cube(source, max_workers=None):
+    """Build the call volume cube with one worker per store partition."""
+    root = ensure_store(source)
+    columns = [c for c in CUBE_COLUMNS if c in call_report_columns(root)]
+    return reduce_cube(map_partitions(aggregate_calls, root, columns, max_workers))
+
+
+def build_distributions(source, max_workers=None):
+    """Compute the DistributionCounts of a source with one worker per partition."""
+    root = ensure_store(source)
+    total = DistributionCounts.empty()
+    for part in map_partitions(DistributionCounts.from_frame, root,
+                               ['CallDateAndTimeStart'], max_workers):
+        total += part
+    return total
+
+
+# ----------------------------------------------------------------------
+# Datetime features
+# ----------------------------------------------------------------------
+
+def _features_chunk(chunk, fmt, path, header):
+    """Derive the datetime features of one chunk and spill it to path."""
+    from process_data import OUTPUT_DATE_FORMAT, SAMPLE_COLUMNS, add_datetime_features
+
+    nat_count = add_datetime_features(chunk, TimestampParser(fmt))
+    chunk.to_csv(path, index=False, date_format=OUTPUT_DATE_FORMAT, header=header)
+    return {'rows': len(chunk), 'nat_count': nat_count,
+            'sample': chunk[SAMPLE_COLUMNS].head() if header else None,
+            'distribution': DistributionCounts.from_timestamps(chunk['CallDateAndTimeStart'])}
+
+
+def parallel_datetime_features(input_file, output_file, chunksize=DEFAULT_CHUNKSIZE,
+                               max_workers=None):
+    """
+    Multi-core variant of process_data.stream_datetime_features.
+
+    The column dtypes (process_data.scan_csv_dtypes) and the timestamp format
+    are determined once and shared by all workers, so every chunk is written
+    as the in-memory path would write it. At most two chunks per worker are held (in memory or spilled)
+    at any time; finished chunks are appended to output_file in input order.
+
+    Returns:
+    --------
+    dict
+        Same structure as stream_datetime_features()
+    """
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"Input file not found: {input_file}")
+
+    from process_data import scan_csv_dtypes
+
+    max_workers = max_workers or os.cpu_count()
+    dtypes = scan_csv_dtypes(input_file, chunksize)
+    spill_dir = tempfile.mkdtemp(prefix='features-',
+                                 dir=os.path.dirname(os.path.abspath(output_file)))
+    rows, nat_count, sample = 0, 0, None
+    distribution = DistributionCounts.empty()
+    pending = collections.deque()
+
+    def collect(out):
+        nonlocal rows, nat_count, sample, distribution
+        future, path = pending.popleft()
+        result = future.result()
+        with open(path, 'rb') as src:
+            shutil.copyfileobj(src, out)
+        os.remove(path)
+        rows += result['rows']
+        nat_count += result['nat_count']
+        sample = result['sample'] if sample is None else sample
+        distribution += result['distribution']
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool, \
+                open(output_file, 'wb') as out, \
+                pd.read_csv(input_file, chunksize=chunksize, dtype=dtypes) as reader:
+            fmt = None
+            for number, chunk in enumerate(reader):
+                if 'CallDateAndTimeStart' not in chunk.columns:
+                    raise KeyError("Required column 'CallDateAndTimeStart' not found in the dataset")
+                if fmt is None:
+                    fmt = detect_format(chunk['CallDateAndTimeStart'].dropna().astype(str).unique())
+                    logger.info(f"Detected timestamp format: {fmt}")
+                path = os.path.join(spill_dir, f'chunk-{number:06d}.csv')
+                pending.append((pool.submit(_features_chunk, chunk, fmt, path, number == 0), path))
+                if len(pending) >= 2 * max_workers:
+                    collect(out)
+            while pending:
+                collect(out)
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    if nat_count > 0:
+        logger.warning(f"Found {nat_count} invalid date values that were converted to NaT")
+    logger.info(f"Processed {rows} rows into {output_file} with {max_workers} workers")
+    day_of_week_counts = distribution.day_of_week()
+    hour_counts = distribution.hour()
+    return {
+        'rows': rows,
+        'sample': sample,
+        'day_of_week_counts': day_of_week_counts[day_of_week_counts > 0].sort_values(
+            ascending=False, kind='stable'),
+        'hour_counts': hour_counts[hour_counts > 0],
+    }
+
+
+# ----------------------------------------------------------------------
+# Verification against the single-process code
+# ----------------------------------------------------------------------
+
+def _compare_frames(what, actual, expected, **kwargs):
+    """Compare two frames, raising RuntimeError with the pandas report on a mismatch."""
+    try:
+        pd.testing.assert_frame_equal(actual, expected, **kwargs)
+    except AssertionError as e:
+        raise RuntimeError(f"Parallel {what} differ from the pandas results:\n{e}") from None
+
+
+def verify_cube(source, cube):
+    """Compare a parallel cube with CallCube.from_calls on the full frame."""
+    columns = [c for c in CUBE_COLUMNS if c in call_report_columns(source)]
+    expected = CallCube.from_calls(load_call_reports(source, columns=columns))
+
+    def ordered(counts):
+        return counts.sort_values(CUBE_KEYS, na_position='last').reset_index(drop=True)
+
+    _compare_frames('cube counts', ordered(cube.counts), ordered(expected.counts))
+    for level, table in expected.exogenous.items():
+        if table.empty:
+            if not cube.exogenous[level].empty:
+                raise RuntimeError(f"Parallel cube has unexpected {level} exogenous values")
+            continue
+        _compare_frames(f"{level} exogenous values", cube.exogenous[level].sort_index(),
+                        table.sort_index(), check_names=False)
+
+
+def verify_distributions(source, distribution):
+    """Compare parallel distribution counts with a single in-memory pass."""
+    frame = load_call_reports(source, columns=['CallDateAndTimeStart'])
+    frame['CallDateAndTimeStart'] = TimestampParser().parse(frame['CallDateAndTimeStart'])
+    expected = DistributionCounts.from_frame(frame)
+    for name in ('total', 'missing'):
+        if getattr(distribution, name) != getattr(expected, name):
+            raise RuntimeError(f"Parallel distribution {name} is {getattr(distribution, name)}, "
+                               f"expected {getattr(expected, name)}")
+    _compare_frames('month by year counts', distribution.month_by_year(),
+                    expected.month_by_year())
+    _compare_frames('hour by day of week counts', distribution.hour_by_day_of_week(),
+                    expected.hour_by_day_of_week())
+
+
+def verify_features(input_file, output_file):
+    """Compare a parallel features file with create_datetime_features output."""
+    from process_data import create_datetime_features
+
+    fd, reference = tempfile.mkstemp(suffix='.csv',
+                                     dir=os.path.dirname(os.path.abspath(output_file)))
+    os.close(fd)
+    try:
+        if create_datetime_features(input_file, reference) is None:
+            raise RuntimeError(f"create_datetime_features failed on {input_file}")
+        with open(reference, 'rb') as a, open(output_file, 'rb') as b:
+            for number, (expected, actual) in enumerate(itertools.zip_longest(a, b), start=1):
+                if expected != actual:
+                    raise RuntimeError(f"{output_file} differs from the pandas output at line "
+                                       f"{number}: {actual!r} != {expected!r}")
+    finally:
+        os.remove(reference)
+
+
+def main():
+    """
+    Run one step with the parallel backend, optionally verifying it.
+    """
+    parser = argparse.ArgumentParser(description='Run call report steps across cores')
+    parser.add_argument('task', choices=['cube', 'distributions', 'features'])
+    parser.add_argument('source', help='call report CSV or store folder')
+    parser.add_argument('--output', help="features CSV (task 'features')")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--verify', action='store_true',
+                        help='also run the single-process pandas code and compare')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.task == 'cube':
+        cube = build_cube(args.source, args.workers)
+        if args.verify:
+            verify_cube(args.source, cube)
+        cube.save(cube_path_for(args.source))
+        # Mark the cube current, or load_or_build_cube would rebuild it serially
+        write_cube_meta(args.source, cube_path_for(args.source))
+        print(f"Cube with {len(cube.counts)} cells written to {cube_path_for(args.source)}")
+    elif args.task == 'distributions':
+        distribution = build_distributions(args.source, args.workers)
+        if args.verify:
+            verify_distributions(args.source, distribution)
+        print(distribution.hour_by_day_of_week())
+    else:
+        output = args.output or 'processed_call_reports.csv'
+        summary = parallel_datetime_features(args.source, output, args.chunksize, args.workers)
+        if args.verify:
+            verify_features(args.source, output)
+        print(f"{summary['rows']} rows written to {output}")
+
+    if args.verify:
+        print("Verified: parallel results match the single-process pandas results")
+
+
+if __name__ == "__main__":
+    main()
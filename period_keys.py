@@ -0,0 +1,187 @@
+"""
+Mental Health Datathon - Period Keys
+====================================
+
+Month, quarter and ISO-week keys as integer ordinals, with a separate
+formatting layer for display:
+
+- month key:    months since 1970-01          (datetime_parsing.month_key)
+- quarter key:  quarters since 1970 Q1        (month key // 3, quarter_keys_from_months)
+- ISO week key: weeks since Monday 1969-12-29 (the ISO week holding 1970-01-01)
+
+Missing values get MISSING_KEY (-1). Filters and joins compare the integers
+('2022 Q1' onwards is `keys >= parse_quarter('2022 Q1')`), so no per-row
+strings are built or compared. Labels and other per-value work happen once
+per distinct value and are broadcast back to the rows through factorized
+codes. Every quarter key, from timestamps, months or labels, comes from
+quarter_keys_from_months or parse_quarter here.
+
+Usage:
+------
+    months = month_keys(df['Year&Month'])            # 'YYYY-MM' or 'YY-Mon' labels
+    df['Quarter'] = format_quarters(quarter_keys_from_months(months))
+    recent = df[quarter_keys(df['Quarter']) >= parse_quarter('2022 Q1')]
+
+Author: [Mike Baran]
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from datetime_parsing import MISSING_KEY, day_key, month_key, month_labels, parse_year_month
+
+# Monday 1969-12-29 is day -3 relative to 1970-01-01
+_ISO_WEEK_OFFSET = 3
+_QUARTER_LABEL = re.compile(r'\s*(\d{4})\s*Q([1-4])\s*')
+
+
+def broadcast(values, func, missing=MISSING_KEY):
+    """
+    Apply func to the distinct values only and map the results back to rows.
+
+    Parameters:
+    -----------
+    values : array-like
+        Column with repeated values
+    func : callable
+        Takes the distinct (non-missing) values, returns an array of results
+    missing : scalar
+        Result for missing values
+
+    Returns:
+    --------
+    np.ndarray
+    """
+    codes, uniques = pd.factorize(pd.Series(values))
+    results = np.asarray(func(uniques))
+    out = np.empty(len(codes), dtype=np.result_type(results.dtype, np.asarray(missing).dtype))
+    valid = codes >= 0
+    out[valid] = results[codes[valid]]
+    out[~valid] = missing
+    return out
+
+
+# ----------------------------------------------------------------------
+# Keys
+# ----------------------------------------------------------------------
+
+def month_keys(values):
+    """Month keys of a datetime column or of 'Year&Month' labels."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return month_key(values)
+    return broadcast(values, lambda labels: month_key(parse_year_month(labels))) \
+        .astype(np.int32)
+
+
+def quarter_keys_from_months(keys):
+    """Quarter keys for month keys."""
+    keys = np.asarray(keys)
+    return np.where(keys == MISSING_KEY, MISSING_KEY, keys // 3).astype(np.int32)
+
+
+def quarter_keys_from_labels(labels):
+    """Quarter keys for 'YYYY Q#' labels; other labels become MISSING_KEY."""
+    def parse(uniques):
+        keys = []
+        for label in uniques:
+            try:
+                keys.append(parse_quarter(label))
+            except ValueError:
+                keys.append(MISSING_KEY)
+        return np.array(keys, dtype=np.int32)
+    return broadcast(labels, parse).astype(np.int32)
+
+
+def quarter_keys(values):
+    """Quarter keys of a datetime column, 'YYYY Q#' labels or 'Year&Month' labels."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return quarter_keys_from_months(month_keys(values))
+    sample = pd.Series(values).dropna().astype(str).head(100)
+    if len(sample) and sample.str.fullmatch(_QUARTER_LABEL).all():
+        return quarter_keys_from_labels(values)
+    return quarter_keys_from_months(month_keys(values))
+
+
+def join_keys(timestamps):
+    """
+    Integer day, month and quarter keys for a datetime column.
+
+    Returns:
+    --------
+    pd.DataFrame
+        'day_key', 'month_key' and 'quarter_key' columns (int32)
+    """
+    timestamps = pd.Series(timestamps)
+    months = month_key(timestamps)
+    return pd.DataFrame({
+        'day_key': day_key(timestamps),
+        'month_key': months,
+        'quarter_key': quarter_keys_from_months(months),
+    }, index=timestamps.index)
+
+
+def iso_week_keys(timestamps):
+    """ISO week keys of a datetime column (weeks start on Monday)."""
+    days = day_key(timestamps).astype(np.int64)
+    return np.where(days == MISSING_KEY, MISSING_KEY,
+                    (days + _ISO_WEEK_OFFSET) // 7).astype(np.int32)
+
+
+def parse_quarter(label):
+    """Quarter key of one 'YYYY Q#' label, e.g. for filters."""
+    match = _QUARTER_LABEL.fullmatch(str(label))
+    if not match:
+        raise ValueError(f"Expected a 'YYYY Q#' label, got '{label}'")
+    return (int(match.group(1)) - 1970) * 4 + int(match.group(2)) - 1
+
+
+def parse_month(label):
+    """Month key of one 'YYYY-MM' (or 'YY-Mon') label."""
+    key = int(month_keys([label])[0])
+    if key == MISSING_KEY:
+        raise ValueError(f"Expected a 'YYYY-MM' label, got '{label}'")
+    return key
+
+
+# ----------------------------------------------------------------------
+# Formatting
+# ----------------------------------------------------------------------
+
+def _format_each(keys, format_key):
+    keys = np.asarray(keys)
+    uniques, inverse = np.unique(keys, return_inverse=True)
+    labels = np.array([format_key(int(k)) if k != MISSING_KEY else np.nan for k in uniques],
+                      dtype=object)
+    return labels[inverse.reshape(keys.shape)]
+
+
+def format_months(keys):
+    """'YYYY-MM' labels for month keys (NaN for missing)."""
+    return month_labels(keys)
+
+
+def format_quarters(keys):
+    """'YYYY Q#' labels for quarter keys (NaN for missing)."""
+    return _format_each(keys, lambda k: f"{1970 + k // 4} Q{k % 4 + 1}")
+
+
+def format_iso_weeks(keys):
+    """'YYYY-Www' ISO week labels for ISO week keys (NaN for missing)."""
+    def label(k):
+        year, week, _ = pd.Timestamp(np.datetime64(7 * k - _ISO_WEEK_OFFSET, 'D')).isocalendar()
+        return f"{year}-W{week:02d}"
+    return _format_each(keys, label)
+
+
+def as_category(keys, formatter):
+    """
+    Ordered categorical of labels for integer keys, formatting each key once.
+
+    Categories are in key (chronological) order; missing keys become NaN.
+    """
+    keys = np.asarray(keys)
+    present = np.unique(keys[keys != MISSING_KEY])
+    codes = np.where(keys == MISSING_KEY, -1, np.searchsorted(present, keys))
+    return pd.Categorical.from_codes(codes, categories=list(formatter(present)), ordered=True)
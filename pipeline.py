@@ -0,0 +1,351 @@
+"""
+Mental Health Datathon - Incremental Processing Pipeline
+========================================================
+
+This script replaces the manual chain of scripts that carries the call report
+dataset from 'Primary_CallReports_v1.2.csv' to 'Primary_CallReports_v1.7.csv'.
+Each step is declared as a stage with explicit input and output files. Before a
+stage runs, the pipeline hashes its input files together with the stage code
+and compares the result to the hash recorded on the previous run; stages whose
+inputs and code are unchanged (and whose outputs still exist) are skipped.
+
+Usage:
+------
+1. Place the source CSV files in a data folder
+2. Run: python pipeline.py --data-dir "<data folder>"
+3. Use --force to rebuild every stage, --dry-run to only list what would run
+
+Author: [Mike Baran]
+"""
+
+import argparse
+import ast
+import hashlib
+import inspect
+import json
+import logging
+import os
+
+import pandas as pd
+
+from datetime_parsing import month_labels
+from dimension_join import KEY_COLUMNS, add_join_keys, exogenous_joiner
+from instrumentation import stage as measure_stage
+from period_keys import (format_quarters, month_keys, quarter_keys_from_labels,
+                         quarter_keys_from_months)
+from weather_decode import WEATHER_FILES
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = '.pipeline_state.json'
+HASH_BLOCK_SIZE = 1 << 20
+
+
+class Stage:
+    """
+    A single pipeline step with declared inputs, outputs and code.
+
+    Parameters:
+    -----------
+    name : str
+        Unique stage name used in logs and in the state file
+    func : callable
+        Function called as func(inputs, outputs) with absolute paths
+    inputs : list of str
+        Input file names, relative to the data folder; a tuple of names stands
+        for alternatives, of which the first existing one is used
+    outputs : list of str
+        Output file names, relative to the data folder
+    code_files : list of str, optional
+        Helper modules the stage calls into; their contents, and those of the
+        repository modules they import (transitively), are part of the stage
+        code hash
+    """
+
+    def __init__(self, name, func, inputs, outputs, code_files=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.code_files = list(code_files)
+
+    def code_hash(self):
+        """Hash the stage function source plus its helper modules and their imports."""
+        digest = hashlib.sha256(inspect.getsource(self.func).encode('utf-8'))
+        here = os.path.dirname(os.path.abspath(__file__))
+        for code_file in _code_closure(self.code_files, here):
+            digest.update(code_file.encode('utf-8'))
+            digest.update(_file_hash(os.path.join(here, code_file)).encode())
+        return digest.hexdigest()
+
+    def resolve_inputs(self, data_dir):
+        """Input file names with each tuple of alternatives replaced by its first existing name."""
+        return [name if isinstance(name, str) else
+                next((n for n in name if os.path.exists(os.path.join(data_dir, n))), name[0])
+                for name in self.inputs]
+
+    def signature(self, data_dir):
+        """Hash of the stage code and the contents of every input file."""
+        digest = hashlib.sha256(self.code_hash().encode())
+        for name in self.resolve_inputs(data_dir):
+            digest.update(name.encode('utf-8'))
+            digest.update(_file_hash(os.path.join(data_dir, name)).encode())
+        return digest.hexdigest()
+
+
+def _file_hash(path):
+    """Stream a file through SHA-256 without loading it into memory."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _local_imports(code_file, here):
+    """Repository modules imported anywhere in a source file (including lazy imports)."""
+    with open(os.path.join(here, code_file), encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=code_file)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            names.add(node.module.split('.')[0])
+    return [f"{name}.py" for name in names if os.path.exists(os.path.join(here, f"{name}.py"))]
+
+
+def _code_closure(code_files, here):
+    """Declared code files plus every repository module they import, sorted."""
+    seen, pending = set(), list(code_files)
+    while pending:
+        code_file = pending.pop()
+        if code_file not in seen:
+            seen.add(code_file)
+            pending.extend(_local_imports(code_file, here))
+    return sorted(seen)
+
+
+# ---------------------------------------------------------------------------
+# Stage implementations (one per original script)
+# ---------------------------------------------------------------------------
+
+def _write_calls(calls_df, path):
+    """Write the call rows without the integer join keys (no frame copy)."""
+    columns = [c for c in calls_df.columns if c not in KEY_COLUMNS]
+    calls_df.to_csv(path, index=False, columns=columns)
+
+
+def datetime_features_stage(inputs, outputs):
+    """process_data.py: derive Year/Month/Day/Hour/DayOfWeek columns."""
+    # Imported on use, so importing this module stays light
+    from process_data import stream_datetime_features
+
+    if stream_datetime_features(inputs[0], outputs[0]) is None:
+        raise RuntimeError(f"stream_datetime_features failed for {inputs[0]}")
+
+
+def clean_unemployment_stage(inputs, outputs):
+    """Transform Unemployment Rate Dataset.py: drop labels, trim Date."""
+    df = pd.read_csv(inputs[0], dtype={"Date": str})
+    df.drop(columns=["labels"], inplace=True)
+    df["Date"] = df["Date"].str[:7]
+    df.to_csv(outputs[0], index=False)
+
+
+def merge_unemployment_stage(inputs, outputs):
+    """Merge Primary and Unemployment Datasets.py: attach monthly rate."""
+    calls_df = add_join_keys(pd.read_csv(inputs[0]))
+    calls_df["Year&Month"] = month_labels(calls_df["month_key"])
+    exogenous_joiner(unemployment_csv=inputs[1]).attach(calls_df)
+    _write_calls(calls_df, outputs[0])
+
+
+def merge_weather_stage(inputs, outputs):
+    """Merge Weather Data with Main Dataset.py: attach daily weather."""
+    calls_df = add_join_keys(pd.read_csv(inputs[0]))
+    exogenous_joiner(weather_csv=inputs[1]).attach(calls_df)
+    _write_calls(calls_df, outputs[0])
+
+
+def quarter_stage(inputs, outputs):
+    """Convert Monthly Dates to Quarterly.py: add the 'YYYY Q#' column."""
+    df = pd.read_csv(inputs[0])
+    df['Quarter'] = format_quarters(quarter_keys_from_months(month_keys(df['Year&Month'])))
+    df.to_csv(outputs[0], index=False)
+
+
+def merge_ems_stage(inputs, outputs):
+    """Merge EMS Responses with Primary Dataset.py: attach quarterly EMS."""
+    primary_df = pd.read_csv(inputs[0])
+    primary_df['quarter_key'] = quarter_keys_from_labels(primary_df['Quarter'])
+    exogenous_joiner(ems_csv=inputs[1]).attach(primary_df)
+    _write_calls(primary_df, outputs[0])
+
+
+STAGES = [
+    Stage('datetime_features', datetime_features_stage,
+          inputs=['Primary_CallReports_v1.2.csv'],
+          outputs=['Primary_CallReports_v1.3.csv'],
+          code_files=['process_data.py']),
+    Stage('clean_unemployment', clean_unemployment_stage,
+          inputs=['Unemployment Rate Alberta.csv'],
+          outputs=['Unemployment_Rate_Alberta_Cleaned.csv']),
+    Stage('merge_unemployment', merge_unemployment_stage,
+          inputs=['Primary_CallReports_v1.3.csv', 'Unemployment_Rate_Alberta_Cleaned.csv'],
+          outputs=['Primary_CallReports_v1.4.csv'],
+          code_files=['dimension_join.py', 'datetime_parsing.py']),
+    Stage('merge_weather', merge_weather_stage,
+          inputs=['Primary_CallReports_v1.4.csv', WEATHER_FILES],
+          outputs=['Primary_CallReports_v1.5.csv'],
+          code_files=['dimension_join.py']),
+    Stage('quarter', quarter_stage,
+          inputs=['Primary_CallReports_v1.5.csv'],
+          outputs=['Primary_CallReports_v1.6.csv'],
+          code_files=['period_keys.py']),
+    Stage('merge_ems', merge_ems_stage,
+          inputs=['Primary_CallReports_v1.6.csv', 'OpiodEMSResponsesAlberta.csv'],
+          outputs=['Primary_CallReports_v1.7.csv'],
+          code_files=['dimension_join.py', 'datetime_parsing.py']),
+]
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def order_stages(stages):
+    """
+    Sort stages so that every stage runs after the stages producing its inputs.
+
+    Raises:
+    -------
+    ValueError
+        If two stages produce the same file or the stages form a cycle
+    """
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            if output in producers:
+                raise ValueError(
+                    f"'{output}' is produced by both '{producers[output].name}' and '{stage.name}'")
+            producers[output] = stage
+
+    ordered, visiting, done = [], set(), set()
+
+    def visit(stage):
+        if stage.name in done:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"Pipeline cycle detected at stage '{stage.name}'")
+        visiting.add(stage.name)
+        for name in stage.inputs:
+            for alternative in ([name] if isinstance(name, str) else name):
+                if alternative in producers:
+                    visit(producers[alternative])
+        visiting.discard(stage.name)
+        done.add(stage.name)
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return ordered
+
+
+def load_state(data_dir):
+    path = os.path.join(data_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(data_dir, state):
+    path = os.path.join(data_dir, STATE_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def run_pipeline(data_dir, stages=None, force=False, dry_run=False):
+    """
+    Run every stage whose inputs or code changed since the last run.
+
+    Because a stage's outputs are hashed as the next stage's inputs, a
+    re-run that reproduces byte-identical output does not cascade downstream.
+
+    Parameters:
+    -----------
+    data_dir : str
+        Folder holding the input and output CSV files
+    stages : list of Stage, optional
+        Stages to run, defaults to STAGES
+    force : bool
+        Re-run every stage regardless of recorded hashes
+    dry_run : bool
+        Only report which stages would run
+
+    Returns:
+    --------
+    list of str
+        Names of the stages that ran (or would run, for a dry run)
+    """
+    stages = order_stages(STAGES if stages is None else stages)
+    state = load_state(data_dir)
+    executed = []
+
+    for stage in stages:
+        inputs = stage.resolve_inputs(data_dir)
+        missing = [name for name in inputs if not os.path.exists(os.path.join(data_dir, name))]
+        if missing:
+            if dry_run:
+                logger.info(f"[{stage.name}] would run once inputs exist: {missing}")
+                executed.append(stage.name)
+                continue
+            raise FileNotFoundError(f"Stage '{stage.name}' is missing inputs: {missing}")
+
+        signature = stage.signature(data_dir)
+        outputs_exist = all(os.path.exists(os.path.join(data_dir, name))
+                            for name in stage.outputs)
+        if not force and outputs_exist and state.get(stage.name) == signature:
+            logger.info(f"[{stage.name}] up to date, skipping")
+            continue
+
+        executed.append(stage.name)
+        if dry_run:
+            logger.info(f"[{stage.name}] would run")
+            continue
+
+        logger.info(f"[{stage.name}] running")
+        with measure_stage(f"pipeline.{stage.name}"):
+            stage.func([os.path.join(data_dir, name) for name in inputs],
+                       [os.path.join(data_dir, name) for name in stage.outputs])
+        state[stage.name] = signature
+        save_state(data_dir, state)
+
+    return executed
+
+
+def main():
+    """
+    Command line entry point for the incremental pipeline.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--data-dir', default=os.getcwd(),
+                        help='folder holding the call report CSV files')
+    parser.add_argument('--force', action='store_true',
+                        help='re-run every stage')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='list the stages that would run')
+    args = parser.parse_args()
+
+    executed = run_pipeline(args.data_dir, force=args.force, dry_run=args.dry_run)
+    if executed:
+        print(f"Stages {'to run' if args.dry_run else 'run'}: {', '.join(executed)}")
+    else:
+        print("All stages up to date.")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,22 +17,112 @@ Author: [Mike Baran]
 Date: April 6, 2025
 """
 
+import argparse
 import os
 import pandas as pd
 from datetime import datetime
 import logging
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('data_processing.log'),
-        logging.StreamHandler()
-    ]
-)
+from datetime_parsing import TimestampParser
+from distributions import DistributionCounts
+from instrumentation import stage
+from schema import CALL_REPORT_SCHEMA, bytes_per_row
+
 logger = logging.getLogger()
 
+SAMPLE_COLUMNS = ['CallDateAndTimeStart', 'Year',
+                  'Month', 'MonthName', 'Day', 'Hour', 'DayOfWeek']
+
+# Fixed timestamp layout for the output CSV, so every chunk of a streamed run
+# is written exactly as the in-memory path would write it
+OUTPUT_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+DEFAULT_CHUNKSIZE = 500_000
+
+
+def _combined_dtype(kinds):
+    """Dtype a whole-file read infers for a column, from the dtype kinds of its chunks."""
+    if kinds <= {'i'}:
+        return 'int64'
+    if kinds <= {'i', 'f'}:
+        # A blank anywhere turns the integer column into floats for every row
+        return 'float64'
+    if kinds == {'b'}:
+        return 'bool'
+    return object
+
+
+def scan_csv_dtypes(input_file, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Dtypes pd.read_csv infers for each column when it reads the whole file.
+
+    Chunked reads infer dtypes for every chunk on its own: an integer column
+    with a blank in one chunk is float64 there and int64 elsewhere, and would
+    be written as '30.0' and '30' in the same file. One extra pass over the
+    chunks (one chunk in memory at a time) combines their dtypes, so every
+    chunk can then be read with the dtypes of the in-memory path.
+
+    Returns:
+    --------
+    dict
+        Column name -> dtype, for pd.read_csv(dtype=...)
+    """
+    kinds = {}
+    with pd.read_csv(input_file, chunksize=chunksize) as reader:
+        for chunk in reader:
+            for column, dtype in chunk.dtypes.items():
+                kinds.setdefault(column, set()).add(dtype.kind)
+    return {column: _combined_dtype(k) for column, k in kinds.items()}
+
+
+def add_datetime_features(df, parser=None):
+    """
+    Convert 'CallDateAndTimeStart' and add the derived date/time columns.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Call report rows containing a 'CallDateAndTimeStart' column
+    parser : TimestampParser, optional
+        Parser to reuse across chunks (keeps the detected format and cache)
+
+    Returns:
+    --------
+    int
+        Number of values that could not be parsed and were set to NaT
+    """
+    # Invalid values are converted to NaT
+    parser = parser or TimestampParser()
+    df['CallDateAndTimeStart'] = parser.parse(df['CallDateAndTimeStart'])
+    timestamps = df['CallDateAndTimeStart'].dt
+
+    # Compact schema dtypes; nullable integers keep e.g. 2020 instead of
+    # 2020.0 when NaT is present
+    df['Year'] = timestamps.year.astype(CALL_REPORT_SCHEMA['Year'])
+    df['Month'] = timestamps.month.astype(CALL_REPORT_SCHEMA['Month'])
+    df['MonthName'] = timestamps.month_name().astype(CALL_REPORT_SCHEMA['MonthName'])
+    df['Day'] = timestamps.day.astype(CALL_REPORT_SCHEMA['Day'])
+    df['Hour'] = timestamps.hour.astype(CALL_REPORT_SCHEMA['Hour'])
+    df['DayOfWeek'] = timestamps.day_name().astype(CALL_REPORT_SCHEMA['DayOfWeek'])
+    return int(df['CallDateAndTimeStart'].isna().sum())
+
+
+def summarize_datetime_features(df):
+    """
+    Build the summary printed by main() from a processed DataFrame.
+
+    Returns:
+    --------
+    dict
+        'rows', 'sample', 'day_of_week_counts' and 'hour_counts'
+    """
+    day_of_week_counts = df['DayOfWeek'].value_counts()
+    return {
+        'rows': len(df),
+        'sample': df[SAMPLE_COLUMNS].head(),
+        'day_of_week_counts': day_of_week_counts[day_of_week_counts > 0],
+        'hour_counts': df['Hour'].value_counts().sort_index(),
+    }
+
 
 def create_datetime_features(input_file, output_file):
     """
@@ -58,7 +148,9 @@ def create_datetime_features(input_file, output_file):
 
         # Read the data
         logger.info(f"Reading data from {input_file}")
-        df = pd.read_csv(input_file)
+        with stage('read_csv') as metrics:
+            df = pd.read_csv(input_file)
+            metrics.rows = len(df)
 
         # Check if the required column exists
         if 'CallDateAndTimeStart' not in df.columns:
@@ -68,32 +160,25 @@ def create_datetime_features(input_file, output_file):
 
         # Display initial data info
         logger.info(f"Initial data shape: {df.shape}")
+        initial_bytes = bytes_per_row(df)
 
-        # Convert to datetime format
+        # Convert to datetime format and extract date components
         logger.info("Converting 'CallDateAndTimeStart' to datetime")
-        df['CallDateAndTimeStart'] = pd.to_datetime(
-            df['CallDateAndTimeStart'],
-            errors='coerce'  # Convert invalid values to NaT
-        )
+        logger.info("Extracting date and time components")
+        with stage('datetime_features', rows=len(df)):
+            nat_count = add_datetime_features(df)
+        logger.info(f"Memory: {initial_bytes:.1f} bytes/row as read, "
+                    f"{bytes_per_row(df):.1f} bytes/row with derived columns")
 
         # Log missing values after conversion
-        nat_count = df['CallDateAndTimeStart'].isna().sum()
         if nat_count > 0:
             logger.warning(
                 f"Found {nat_count} invalid date values that were converted to NaT")
 
-        # Extract date components
-        logger.info("Extracting date and time components")
-        df['Year'] = df['CallDateAndTimeStart'].dt.year
-        df['Month'] = df['CallDateAndTimeStart'].dt.month
-        df['MonthName'] = df['CallDateAndTimeStart'].dt.month_name()
-        df['Day'] = df['CallDateAndTimeStart'].dt.day
-        df['Hour'] = df['CallDateAndTimeStart'].dt.hour
-        df['DayOfWeek'] = df['CallDateAndTimeStart'].dt.day_name()
-
         # Save processed data
         logger.info(f"Saving processed data to {output_file}")
-        df.to_csv(output_file, index=False)
+        with stage('write_csv', rows=len(df)):
+            df.to_csv(output_file, index=False, date_format=OUTPUT_DATE_FORMAT)
 
         # Return summary statistics
         logger.info("Processing completed successfully")
@@ -104,31 +189,132 @@ def create_datetime_features(input_file, output_file):
         return None
 
 
+def stream_datetime_features(input_file, output_file, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Streaming variant of create_datetime_features with bounded memory.
+
+    The input is read in chunks of `chunksize` rows; each chunk gets the same
+    derived columns and is appended to the output, so only one chunk is held
+    in memory. The column dtypes (scan_csv_dtypes) and the timestamp format are
+    determined once and shared by all chunks, so the written file is identical
+    to the create_datetime_features output. The day-of-week and hour
+    distributions are accumulated while streaming.
+
+    Parameters:
+    -----------
+    input_file : str
+        Path to the input CSV file containing call report data
+    output_file : str
+        Path where the processed CSV file will be saved
+    chunksize : int
+        Number of rows processed at a time
+
+    Returns:
+    --------
+    dict
+        Same structure as summarize_datetime_features(), or None on error
+    """
+    try:
+        if not os.path.exists(input_file):
+            logger.error(f"Input file not found: {input_file}")
+            return None
+
+        logger.info(f"Streaming data from {input_file} in chunks of {chunksize} rows")
+        rows, nat_count, sample = 0, 0, None
+        parser = TimestampParser()
+        distribution = DistributionCounts.empty()
+
+        dtypes = scan_csv_dtypes(input_file, chunksize)
+        with stage('stream_datetime_features') as metrics, \
+                pd.read_csv(input_file, chunksize=chunksize, dtype=dtypes) as reader:
+            for chunk in reader:
+                if 'CallDateAndTimeStart' not in chunk.columns:
+                    logger.error(
+                        "Required column 'CallDateAndTimeStart' not found in the dataset")
+                    return None
+
+                nat_count += add_datetime_features(chunk, parser)
+                chunk.to_csv(output_file, index=False, date_format=OUTPUT_DATE_FORMAT,
+                             mode='w' if rows == 0 else 'a', header=rows == 0)
+
+                if sample is None:
+                    sample = chunk[SAMPLE_COLUMNS].head()
+                distribution += DistributionCounts.from_timestamps(
+                    chunk['CallDateAndTimeStart'])
+                rows += len(chunk)
+                metrics.rows = rows
+                logger.info(f"Processed {rows} rows")
+
+        if nat_count > 0:
+            logger.warning(
+                f"Found {nat_count} invalid date values that were converted to NaT")
+
+        logger.info(f"Processed data saved to {output_file}")
+        logger.info("Processing completed successfully")
+        day_of_week_counts = distribution.day_of_week()
+        hour_counts = distribution.hour()
+        return {
+            'rows': rows,
+            'sample': sample,
+            'day_of_week_counts': day_of_week_counts[day_of_week_counts > 0].sort_values(
+                ascending=False, kind='stable'),
+            'hour_counts': hour_counts[hour_counts > 0],
+        }
+
+    except Exception as e:
+        logger.error(f"Error processing data: {str(e)}")
+        return None
+
+
 def main():
     """
     Main function to execute the data processing workflow.
     """
+    parser = argparse.ArgumentParser(description='Extract date/time features from call reports')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='stream the input in chunks of this many rows')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='derive the features of the chunks in this many processes')
+    args = parser.parse_args()
+
+    # Set up logging (here rather than on import, so importing the module
+    # does not create a log file in the working directory)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('data_processing.log'),
+            logging.StreamHandler()
+        ]
+    )
+
     # Define file paths
     project_folder = "/Users/mikebaran/Desktop/National Mental Health Datathon"
     input_file = os.path.join(project_folder, "Primary_CallReports_v1.2.csv")
     output_file = os.path.join(project_folder, "processed_call_reports.csv")
 
     # Process the data
-    processed_data = create_datetime_features(input_file, output_file)
+    if args.workers:
+        from parallel_backend import parallel_datetime_features
+        summary = parallel_datetime_features(input_file, output_file,
+                                             args.chunksize or DEFAULT_CHUNKSIZE, args.workers)
+    elif args.chunksize:
+        summary = stream_datetime_features(input_file, output_file, args.chunksize)
+    else:
+        processed_data = create_datetime_features(input_file, output_file)
+        summary = None if processed_data is None else summarize_datetime_features(processed_data)
 
-    if processed_data is not None:
+    if summary is not None:
         # Display sample of processed data
         print("\nSample of processed data:")
-        cols_to_show = ['CallDateAndTimeStart', 'Year',
-                        'Month', 'MonthName', 'Day', 'Hour', 'DayOfWeek']
-        print(processed_data[cols_to_show].head())
+        print(summary['sample'])
 
         # Display summary statistics
         print("\nDistribution by day of week:")
-        print(processed_data['DayOfWeek'].value_counts())
+        print(summary['day_of_week_counts'])
 
         print("\nDistribution by hour:")
-        print(processed_data['Hour'].value_counts().sort_index())
+        print(summary['hour_counts'])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,411 @@
+"""
+Mental Health Datathon - Interactive Call Volume Query Service
+==============================================================
+
+A long-running local service that loads the call volume cube (see
+call_cube.py) once and answers filter / group-by / correlate questions
+against it in memory, instead of a copied script re-reading the full CSV for
+every question. The cube is at the (date, hour) grain, so every filter and
+group-by below is a rollup of it.
+
+Answers are kept in an LRU cache keyed on the normalized query (defaults
+filled in, lists sorted), so rephrasings of the same question share an entry.
+The cache is dropped whenever the cube changes on disk (e.g. after
+incremental_ingest.py appended a batch) or a batch is ingested through the
+service.
+
+Queries (Python dicts or JSON):
+-------------------------------
+    {"kind": "aggregate",
+     "filter": {"start": "2022 Q1", "end": "2023-06", "months": [12, 1, 2],
+                "days_of_week": ["Saturday"], "hours": [20, 21]},
+     "group_by": ["Hour"]}
+
+    {"kind": "correlate", "filter": {"start": "2022 Q1"},
+     "covariates": ["QuarterlyOpioidEMSResponsesAB"], "lags": [0, 1],
+     "methods": ["pearson"]}
+
+group_by takes any of Year, Quarter, Year&Month, Month, MonthName, Date,
+DayOfWeek and Hour. For correlate, hour and day-of-week filters restrict the
+calls that are counted per month.
+
+Usage:
+------
+    python query_service.py Primary_CallReports_v1.7.csv --port 8765
+    curl -s localhost:8765/query -d '{"kind": "aggregate", "group_by": ["Hour"]}'
+    curl -s localhost:8765/ingest -d '{"batch": "new_calls_2024_01.csv"}'
+
+Batches ingested through the service get the unemployment, weather and EMS
+columns from the tables in the data folder given at startup (--data-dir,
+default: the folder of the source), as incremental_ingest.py does.
+
+    from query_service import QueryService
+    service = QueryService("Primary_CallReports_v1.7.csv")
+    service.query({"kind": "aggregate", "group_by": ["DayOfWeek"]})
+
+Author: [Mike Baran]
+"""
+
+import argparse
+import collections
+import json
+import logging
+import os
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from call_cube import cube_path_for, load_or_build_cube
+from correlation import METHODS, correlate, monthly_series
+from resampling import filter_period, month_bounds
+from schema import DAY_ORDER, MONTH_ORDER
+
+logger = logging.getLogger(__name__)
+
+GROUP_BY = ['Year', 'Quarter', 'Year&Month', 'Month', 'MonthName', 'Date', 'DayOfWeek', 'Hour']
+FILTER_KEYS = ['start', 'end', 'months', 'days_of_week', 'hours']
+DEFAULT_CACHE_SIZE = 256
+
+
+# ----------------------------------------------------------------------
+# Query normalization
+# ----------------------------------------------------------------------
+
+def _normalize_filter(spec):
+    unknown = set(spec) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown filter keys: {sorted(unknown)}")
+    result = {}
+    for key in ('start', 'end'):
+        if spec.get(key):
+            month_bounds(spec[key])  # rejects malformed labels early
+            result[key] = str(spec[key]).strip()
+    if spec.get('months'):
+        months = sorted({int(m) for m in spec['months']})
+        if not all(1 <= m <= 12 for m in months):
+            raise ValueError(f"months must be 1-12, got {months}")
+        result['months'] = months
+    if spec.get('days_of_week'):
+        days = [str(d).strip().capitalize() for d in spec['days_of_week']]
+        unknown = [d for d in days if d not in DAY_ORDER]
+        if unknown:
+            raise ValueError(f"Unknown days of week: {unknown}")
+        result['days_of_week'] = sorted(set(days), key=DAY_ORDER.index)
+    if spec.get('hours'):
+        hours = sorted({int(h) for h in spec['hours']})
+        if not all(0 <= h <= 23 for h in hours):
+            raise ValueError(f"hours must be 0-23, got {hours}")
+        result['hours'] = hours
+    return result
+
+
+def normalize_query(query):
+    """
+    Validate a query and return its canonical form (used as the cache key).
+
+    Raises:
+    -------
+    ValueError
+        For unknown kinds, keys or values
+    """
+    if isinstance(query, str):
+        query = json.loads(query)
+    kind = query.get('kind', 'aggregate')
+    normalized = {'kind': kind, 'filter': _normalize_filter(query.get('filter') or {})}
+
+    if kind == 'aggregate':
+        group_by = list(query.get('group_by') or [])
+        unknown = [g for g in group_by if g not in GROUP_BY]
+        if unknown:
+            raise ValueError(f"Unknown group_by columns: {unknown} (use {GROUP_BY})")
+        normalized['group_by'] = group_by
+    elif kind == 'correlate':
+        methods = sorted(set(query.get('methods') or METHODS))
+        unknown = [m for m in methods if m not in METHODS]
+        if unknown:
+            raise ValueError(f"Unknown correlation methods: {unknown}")
+        normalized['covariates'] = sorted(set(query.get('covariates') or []))
+        normalized['lags'] = sorted({int(lag) for lag in query.get('lags') or [0]})
+        normalized['methods'] = methods
+    else:
+        raise ValueError(f"Unknown query kind '{kind}' (use 'aggregate' or 'correlate')")
+    return normalized
+
+
+def _records(frame):
+    """JSON-ready list of row dicts (timestamps as ISO strings, NaN as null)."""
+    return json.loads(frame.to_json(orient='records', date_format='iso'))
+
+
+# ----------------------------------------------------------------------
+# Service
+# ----------------------------------------------------------------------
+
+class QueryService:
+    """
+    In-memory query engine over a call volume cube with an LRU result cache.
+
+    Parameters:
+    -----------
+    source : str
+        Call report CSV or store folder the cube is built from
+    cache_size : int
+        Maximum number of cached answers
+    data_dir : str, optional
+        Folder of the exogenous tables used by ingest(), defaults to the
+        folder of source
+    """
+
+    def __init__(self, source, cache_size=DEFAULT_CACHE_SIZE, data_dir=None):
+        self.source = source
+        self.cube_path = cube_path_for(source)
+        self.data_dir = data_dir or os.path.dirname(os.path.abspath(source))
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = self.misses = 0
+        self._load()
+
+    def _cube_version(self):
+        try:
+            stat = os.stat(os.path.join(self.cube_path, 'meta.json'))
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _load(self):
+        started = time.perf_counter()
+        self.cube = load_or_build_cube(self.source, self.cube_path)
+        counts = self.cube.counts
+        dates = counts['Date']
+        # Per-cell attributes used by filters and group-bys, derived once
+        self._cells = pd.DataFrame({
+            'Year': dates.dt.year.astype('Int16'),
+            'Quarter': counts['Quarter'],
+            'Year&Month': counts['Year&Month'],
+            'Month': dates.dt.month.astype('Int8'),
+            'MonthName': pd.Categorical(dates.dt.month_name(), categories=MONTH_ORDER,
+                                        ordered=True),
+            'Date': dates,
+            'DayOfWeek': pd.Categorical(counts['DayOfWeek'], categories=DAY_ORDER, ordered=True),
+            'Hour': counts['Hour'],
+            'Calls': counts['Calls'],
+        })
+        self._month_start = dates.to_numpy().astype('datetime64[M]')
+        self._monthly = monthly_series(self.cube)
+        self._version = self._cube_version()
+        logger.info(f"Loaded cube with {len(counts)} cells in {time.perf_counter() - started:.2f}s")
+
+    def invalidate(self):
+        """Reload the cube and drop every cached answer."""
+        with self._lock:
+            self._load()
+            self._cache.clear()
+
+    def _check_version(self):
+        if self._cube_version() != self._version:
+            logger.info("Cube changed on disk; reloading and clearing the query cache")
+            self.invalidate()
+
+    def ingest(self, batch_csv):
+        """
+        Append a call batch (see incremental_ingest.ingest_batch) and invalidate.
+
+        The exogenous tables are the ones found in self.data_dir. When the
+        source is a CSV without a store yet, the store is converted from it
+        first, so the batch is appended to the whole call history.
+        """
+        from call_store import store_path_for
+        from incremental_ingest import exogenous_tables, ingest_batch
+
+        if os.path.isdir(self.source):
+            root, source = self.source, None
+        else:
+            root, source = store_path_for(self.source), self.source
+        with self._lock:
+            summary = ingest_batch(batch_csv, root, cube_path=self.cube_path, source=source,
+                                   **exogenous_tables(self.data_dir))
+            self.invalidate()
+        return summary
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+
+    def _mask(self, spec):
+        cells = self._cells
+        keep = np.ones(len(cells), dtype=bool)
+        if 'start' in spec:
+            keep &= self._month_start >= month_bounds(spec['start'])[0].to_datetime64()
+        if 'end' in spec:
+            keep &= self._month_start <= month_bounds(spec['end'])[1].to_datetime64()
+        if 'months' in spec:
+            keep &= cells['Month'].isin(spec['months']).to_numpy()
+        if 'days_of_week' in spec:
+            keep &= cells['DayOfWeek'].isin(spec['days_of_week']).to_numpy()
+        if 'hours' in spec:
+            keep &= cells['Hour'].isin(spec['hours']).to_numpy()
+        return keep
+
+    def _aggregate(self, query):
+        cells = self._cells[self._mask(query['filter'])]
+        if not query['group_by']:
+            return [{'TotalCalls': int(cells['Calls'].sum())}]
+        totals = (cells.groupby(query['group_by'], observed=True)['Calls'].sum()
+                  .reset_index(name='TotalCalls'))
+        return _records(totals)
+
+    def _correlate(self, query):
+        spec = query['filter']
+        frame = filter_period(self._monthly, spec.get('start'), spec.get('end'))
+        if 'months' in spec:
+            month_numbers = frame.index.to_series().map(
+                lambda label: month_bounds(label)[0].month)
+            frame = frame[month_numbers.isin(spec['months']).to_numpy()]
+        if 'days_of_week' in spec or 'hours' in spec:
+            cells = self._cells[self._mask(spec)]
+            counted = cells.groupby('Year&Month')['Calls'].sum()
+            # Months missing from the calendar stay NaN rather than zero calls
+            totals = counted.reindex(frame.index, fill_value=0).where(frame['TotalCalls'].notna())
+            frame = frame.assign(TotalCalls=totals.to_numpy())
+
+        covariates = query['covariates'] or [c for c in frame.columns if c != 'TotalCalls']
+        missing = [c for c in covariates if c not in frame.columns]
+        if missing:
+            raise ValueError(f"Unknown covariates: {missing}")
+        results = correlate(frame['TotalCalls'], frame[covariates],
+                            lags=query['lags'], methods=query['methods'])
+        return _records(results)
+
+    def query(self, query):
+        """
+        Answer a query, from the cache when the same normalized query was seen.
+
+        Returns:
+        --------
+        dict
+            'result' (list of row dicts), 'cached' and 'seconds'
+        """
+        started = time.perf_counter()
+        normalized = normalize_query(query)
+        key = json.dumps(normalized, sort_keys=True)
+
+        with self._lock:
+            self._check_version()
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return {'result': self._cache[key], 'cached': True,
+                        'seconds': round(time.perf_counter() - started, 6)}
+
+            self.misses += 1
+            if normalized['kind'] == 'aggregate':
+                result = self._aggregate(normalized)
+            else:
+                result = self._correlate(normalized)
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return {'result': result, 'cached': False,
+                'seconds': round(time.perf_counter() - started, 6)}
+
+    def stats(self):
+        return {'cells': len(self._cells), 'cached_queries': len(self._cache),
+                'hits': self.hits, 'misses': self.misses}
+
+
+# ----------------------------------------------------------------------
+# HTTP endpoint
+# ----------------------------------------------------------------------
+
+def make_handler(service):
+    """Request handler class bound to one QueryService."""
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _answer(self, call):
+            try:
+                self._send(200, call())
+            except (ValueError, KeyError, FileNotFoundError) as e:
+                self._send(400, {'error': str(e)})
+            except Exception as e:  # keep serving after an unexpected failure
+                logger.exception("Query failed")
+                self._send(500, {'error': str(e)})
+
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            if url.path == '/health':
+                self._send(200, service.stats())
+            elif url.path == '/query':
+                params = urllib.parse.parse_qs(url.query)
+                self._answer(lambda: service.query(params.get('q', ['{}'])[0]))
+            else:
+                self._send(404, {'error': f"Unknown path {url.path}"})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length).decode('utf-8') or '{}'
+            if self.path == '/query':
+                self._answer(lambda: service.query(body))
+            elif self.path == '/ingest':
+                def ingest():
+                    request = json.loads(body)
+                    unknown = set(request) - {'batch'}
+                    if unknown:
+                        raise ValueError(f"Unknown ingest fields {sorted(unknown)}; the "
+                                         f"exogenous tables come from the service's --data-dir")
+                    return service.ingest(request['batch'])
+                self._answer(ingest)
+            else:
+                self._send(404, {'error': f"Unknown path {self.path}"})
+
+        def log_message(self, format, *args):
+            logger.info(f"{self.address_string()} {format % args}")
+
+    return Handler
+
+
+def serve(service, host='127.0.0.1', port=8765):
+    """Serve the JSON endpoint until interrupted."""
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    logger.info(f"Query service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    """
+    Start the query service for one call report source.
+    """
+    parser = argparse.ArgumentParser(description='Serve call volume queries over HTTP')
+    parser.add_argument('source', nargs='?', default='Primary_CallReports_v1.7.csv')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE)
+    parser.add_argument('--data-dir',
+                        help='folder of the exogenous tables for ingested batches '
+                             '(default: the folder of source)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    serve(QueryService(args.source, args.cache_size, args.data_dir), args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
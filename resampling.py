@@ -0,0 +1,296 @@
+"""
+Mental Health Datathon - Resampling Significance Tests
+======================================================
+
+The correlation scripts report a single parametric p-value from about 60
+monthly points, and the EMS covariate is a quarterly value repeated over
+three months, so neighbouring observations are not independent. This module
+tests the same correlations by resampling instead:
+
+- block permutation test: blocks of consecutive months of the covariate are
+  shuffled, which keeps within-block dependence intact
+- moving block bootstrap: confidence interval and standard error for r
+
+Resamples are generated in fixed-size batches, each with its own seed
+spawned from one SeedSequence, and each batch is evaluated as a single
+NumPy array operation. Batches are spread across a process pool; because
+the batching does not depend on the number of workers, results are
+identical for any n_jobs.
+
+Usage:
+------
+    python resampling.py Primary_CallReports_v1.7.csv --start "2022 Q1" --resamples 100000
+
+Author: [Mike Baran]
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from datetime_parsing import parse_year_month
+from period_keys import parse_quarter
+
+DEFAULT_BATCH_SIZE = 2000
+
+
+def _rowwise_pearson(x, y):
+    """Pearson r of each row pair of two (batch, n) arrays."""
+    dx = x - x.mean(axis=1, keepdims=True)
+    dy = y - y.mean(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (dx * dy).sum(axis=1) / np.sqrt((dx ** 2).sum(axis=1) * (dy ** 2).sum(axis=1))
+
+
+def _permutation_indices(rng, n, block_size, batch, offset=0):
+    """
+    Indices that shuffle whole blocks, the first one starting at offset.
+
+    The leading `offset` observations and a trailing partial block stay in place.
+    """
+    offset = min(offset, n)
+    n_blocks = (n - offset) // block_size
+    order = rng.random((batch, n_blocks)).argsort(axis=1)
+    idx = offset + (order[:, :, None] * block_size + np.arange(block_size)).reshape(batch, -1)
+    head = np.broadcast_to(np.arange(offset), (batch, offset))
+    end = offset + n_blocks * block_size
+    tail = np.broadcast_to(np.arange(end, n), (batch, n - end))
+    return np.concatenate([head, idx, tail], axis=1)
+
+
+def _bootstrap_indices(rng, n, block_size, batch):
+    """Moving block bootstrap: random block starts, concatenated and trimmed to n."""
+    n_blocks = -(-n // block_size)
+    starts = rng.integers(0, n - block_size + 1, size=(batch, n_blocks))
+    return (starts[:, :, None] + np.arange(block_size)).reshape(batch, -1)[:, :n]
+
+
+def _run_batch(kind, x, y, block_size, batch, seed_sequence, offset=0):
+    """Correlations of one batch of resamples (runs in a worker process)."""
+    rng = np.random.default_rng(seed_sequence)
+    n = len(x)
+    if kind == 'permutation':
+        idx = _permutation_indices(rng, n, block_size, batch, offset)
+        return _rowwise_pearson(np.broadcast_to(x, (batch, n)), y[idx])
+    idx = _bootstrap_indices(rng, n, block_size, batch)
+    return _rowwise_pearson(x[idx], y[idx])
+
+
+def resample(kind, x, y, n_resamples, block_size=1, seed=0, n_jobs=None,
+             batch_size=DEFAULT_BATCH_SIZE, offset=0):
+    """
+    Correlation coefficients of n_resamples permuted or bootstrapped samples.
+
+    Parameters:
+    -----------
+    kind : str
+        'permutation' or 'bootstrap'
+    x, y : array-like
+        Paired observations without missing values
+    n_resamples : int
+        Number of resamples
+    block_size : int
+        Length of the blocks of consecutive observations
+    seed : int
+        Seed of the SeedSequence the batch seeds are spawned from
+    n_jobs : int, optional
+        Worker processes (default: all cores; 1 runs in-process)
+    batch_size : int
+        Resamples evaluated per array operation
+    offset : int
+        Position of the first permutation block boundary; observations
+        before it stay in place (bootstrap blocks start anywhere)
+
+    Returns:
+    --------
+    np.ndarray
+        n_resamples correlation coefficients
+    """
+    if kind not in ('permutation', 'bootstrap'):
+        raise ValueError(f"kind must be 'permutation' or 'bootstrap', got '{kind}'")
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if not 1 <= block_size <= len(x):
+        raise ValueError(f"block_size must be between 1 and {len(x)}")
+
+    sizes = [batch_size] * (n_resamples // batch_size)
+    if n_resamples % batch_size:
+        sizes.append(n_resamples % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(kind, x, y, block_size, size, s, offset) for size, s in zip(sizes, seeds)]
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs == 1 or len(args) == 1:
+        batches = [_run_batch(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(args))) as pool:
+            batches = list(pool.map(_run_batch, *zip(*args)))
+    return np.concatenate(batches) if batches else np.empty(0)
+
+
+def permutation_test(x, y, n_resamples=10_000, block_size=1, seed=0, n_jobs=None,
+                     method='pearson', offset=0):
+    """
+    Two-sided block permutation test of the correlation between x and y.
+
+    Spearman correlation is tested by permuting the ranks of x and y. Blocks
+    start at position offset of the complete (x, y) pairs.
+
+    Returns:
+    --------
+    dict
+        'r', 'p_value' and 'n_resamples'
+    """
+    x, y = _prepare(x, y, method)
+    observed = _rowwise_pearson(x[None, :], y[None, :])[0]
+    null = resample('permutation', x, y, n_resamples, block_size, seed, n_jobs, offset=offset)
+    extreme = np.count_nonzero(np.abs(null) >= abs(observed) - 1e-12)
+    return {'r': observed, 'p_value': (extreme + 1) / (n_resamples + 1),
+            'n_resamples': n_resamples}
+
+
+def bootstrap_ci(x, y, n_resamples=10_000, block_size=3, confidence=0.95, seed=0,
+                 n_jobs=None, method='pearson'):
+    """
+    Moving block bootstrap percentile interval for the correlation of x and y.
+
+    For Spearman the ranks of the original samples are resampled.
+
+    Returns:
+    --------
+    dict
+        'r', 'ci_low', 'ci_high', 'std_err' and 'n_resamples'
+    """
+    x, y = _prepare(x, y, method)
+    observed = _rowwise_pearson(x[None, :], y[None, :])[0]
+    samples = resample('bootstrap', x, y, n_resamples, block_size, seed, n_jobs)
+    samples = samples[~np.isnan(samples)]
+    alpha = (1 - confidence) / 2
+    return {'r': observed,
+            'ci_low': np.quantile(samples, alpha),
+            'ci_high': np.quantile(samples, 1 - alpha),
+            'std_err': samples.std(ddof=1),
+            'n_resamples': n_resamples}
+
+
+def _prepare(x, y, method):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = ~np.isnan(x) & ~np.isnan(y)
+    x, y = x[keep], y[keep]
+    if method == 'spearman':
+        from scipy import stats
+        x, y = stats.rankdata(x), stats.rankdata(y)
+    elif method != 'pearson':
+        raise ValueError(f"Unknown correlation method '{method}'")
+    return x, y
+
+
+def month_bounds(label):
+    """First and last month (as timestamps) covered by a month or 'YYYY Q#' label."""
+    try:
+        quarter = parse_quarter(label)
+    except ValueError:
+        pass
+    else:
+        first = pd.Timestamp(1970 + quarter // 4, 3 * (quarter % 4) + 1, 1)
+        return first, first + pd.DateOffset(months=2)
+    month = pd.Period(label, freq='M').to_timestamp()
+    return month, month
+
+
+def filter_period(frame, start=None, end=None):
+    """
+    Keep the months of a monthly_series() frame between start and end.
+
+    start and end are inclusive month ('2022-01') or quarter ('2022 Q1') labels.
+    """
+    months = parse_year_month(frame.index.to_series()).to_numpy()
+    keep = np.ones(len(frame), dtype=bool)
+    if start is not None:
+        keep &= months >= month_bounds(start)[0].to_datetime64()
+    if end is not None:
+        keep &= months <= month_bounds(end)[1].to_datetime64()
+    return frame[keep]
+
+
+def resample_correlations(frame, covariates=None, target='TotalCalls', start=None, end=None,
+                          n_resamples=10_000, block_size=3, seed=0, n_jobs=None,
+                          method='pearson'):
+    """
+    Permutation p-value and bootstrap interval for each covariate.
+
+    Parameters:
+    -----------
+    frame : pd.DataFrame
+        Output of correlation.monthly_series()
+    covariates : list of str, optional
+        Columns to test, defaults to every column except target
+    start, end : str, optional
+        Inclusive period filter, e.g. start='2022 Q1'
+    block_size : int
+        Block length in months. Permutation blocks start on the first quarter
+        boundary of the tested months, so with 3 each quarterly value is
+        shuffled as one block (months before that boundary stay in place).
+        A gap in the months shifts the boundaries after it. Covariates with
+        fewer complete pairs than max(block_size, 3) get NaN results.
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per covariate
+    """
+    frame = filter_period(frame, start, end)
+    covariates = covariates or [c for c in frame.columns if c != target]
+    rows = []
+    months = parse_year_month(frame.index.to_series()).dt.month.to_numpy()
+    for column in covariates:
+        complete = (frame[column].notna() & frame[target].notna()).to_numpy()
+        if complete.sum() < max(block_size, 3):
+            rows.append({'covariate': column, 'method': method, 'r': np.nan,
+                         'permutation_p': np.nan, 'ci_low': np.nan, 'ci_high': np.nan,
+                         'std_err': np.nan, 'n_resamples': n_resamples})
+            continue
+        # Months until the first quarter start among the complete pairs
+        offset = int((3 - (months[complete][0] - 1) % 3) % 3) if complete.any() else 0
+        test = permutation_test(frame[column], frame[target], n_resamples, block_size,
+                                seed, n_jobs, method, offset=offset)
+        interval = bootstrap_ci(frame[column], frame[target], n_resamples, block_size,
+                                seed=seed, n_jobs=n_jobs, method=method)
+        rows.append({'covariate': column, 'method': method, 'r': test['r'],
+                     'permutation_p': test['p_value'], 'ci_low': interval['ci_low'],
+                     'ci_high': interval['ci_high'], 'std_err': interval['std_err'],
+                     'n_resamples': n_resamples})
+    return pd.DataFrame(rows)
+
+
+def main():
+    """
+    Resampling tests of monthly call volume against every covariate.
+    """
+    from call_cube import load_or_build_cube
+    from correlation import monthly_series
+
+    parser = argparse.ArgumentParser(description='Block permutation and bootstrap correlation tests')
+    parser.add_argument('source', nargs='?', default='Primary_CallReports_v1.7.csv')
+    parser.add_argument('--start', help="first month or quarter, e.g. '2022 Q1'")
+    parser.add_argument('--end', help='last month or quarter')
+    parser.add_argument('--resamples', type=int, default=10_000)
+    parser.add_argument('--block-size', type=int, default=3)
+    parser.add_argument('--method', choices=['pearson', 'spearman'], default='pearson')
+    parser.add_argument('--jobs', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    frame = monthly_series(load_or_build_cube(args.source))
+    results = resample_correlations(frame, start=args.start, end=args.end,
+                                    n_resamples=args.resamples, block_size=args.block_size,
+                                    seed=args.seed, n_jobs=args.jobs, method=args.method)
+    print(results.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Mental Health Datathon - Rolling Daily Feature Matrix
+=====================================================
+
+Builds a compact daily feature matrix (float32, one row per calendar day)
+from the daily call series in the call volume cube and the daily weather
+table:
+
+- calls_7d, calls_30d, calls_90d      rolling call volumes
+- calls_<w>d_yoy                      change against the same window 365 days earlier
+- weather aggregates, e.g. temperature_2m_min_min_7d (coldest minimum of the
+  last 7 days) and sunshine_hours_sum_7d
+
+Every window ends on (and includes) its day and is NaN until it is full,
+as with pandas rolling(window) defaults. Sums come from one cumulative sum
+(O(n) for any window); minima and maxima use a monotonic deque (O(n)).
+
+The matrix is saved as Parquet with the raw daily inputs alongside the
+features. When it is updated, only days from the first new or changed input
+day onwards are recomputed, using the preceding 454 days (longest window
+plus the year-over-year lag) as context, so a nightly update costs the
+same whatever the length of the history.
+
+Usage:
+------
+    python rolling_features.py Primary_CallReports_v1.7.csv \\
+        --weather edmonton_daily_weather.parquet --output daily_features.parquet
+
+Author: [Mike Baran]
+"""
+
+import argparse
+import collections
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from call_cube import load_or_build_cube
+from weather_decode import find_weather, read_weather
+
+logger = logging.getLogger(__name__)
+
+CALL_WINDOWS = (7, 30, 90)
+YOY_LAG = 365
+# (input column, aggregate, window in days)
+WEATHER_WINDOWS = [
+    ('temperature_2m_min', 'min', 7),
+    ('temperature_2m_max', 'max', 7),
+    ('temperature_2m_max', 'mean', 30),
+    ('sunshine_hours', 'sum', 7),
+    ('rain_sum', 'sum', 7),
+    ('rain_sum', 'sum', 30),
+    ('precipitation_hours', 'sum', 7),
+]
+LOOKBACK = max(max(CALL_WINDOWS) + YOY_LAG,
+               max(window for _, _, window in WEATHER_WINDOWS)) - 1
+
+
+# ----------------------------------------------------------------------
+# O(n) sliding windows
+# ----------------------------------------------------------------------
+
+def sliding_sum(values, window):
+    """
+    Sum of each trailing window of `window` values (NaN until full or if any NaN).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    totals = np.concatenate([[0.0], np.cumsum(np.where(missing, 0.0, values))])
+    gaps = np.concatenate([[0], np.cumsum(missing)])
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        end = np.arange(window, len(values) + 1)
+        sums = totals[end] - totals[end - window]
+        result[window - 1:] = np.where(gaps[end] - gaps[end - window] > 0, np.nan, sums)
+    return result
+
+
+def _sliding_extreme(values, window, keep_left):
+    """Monotonic-deque minimum or maximum of each trailing window."""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    candidates = collections.deque()
+    last_missing = -window
+    for i, value in enumerate(values):
+        if np.isnan(value):
+            last_missing = i
+        else:
+            while candidates and not keep_left(values[candidates[-1]], value):
+                candidates.pop()
+            candidates.append(i)
+        while candidates and candidates[0] <= i - window:
+            candidates.popleft()
+        if i >= window - 1 and last_missing <= i - window and candidates:
+            result[i] = values[candidates[0]]
+    return result
+
+
+def sliding_min(values, window):
+    """Minimum of each trailing window (NaN until full or if any NaN)."""
+    return _sliding_extreme(values, window, lambda left, new: left < new)
+
+
+def sliding_max(values, window):
+    """Maximum of each trailing window (NaN until full or if any NaN)."""
+    return _sliding_extreme(values, window, lambda left, new: left > new)
+
+
+def lag_delta(values, lag):
+    """values[t] - values[t - lag] (NaN for the first `lag` days)."""
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(len(values), np.nan)
+    result[lag:] = values[lag:] - values[:-lag]
+    return result
+
+
+# ----------------------------------------------------------------------
+# Feature matrix
+# ----------------------------------------------------------------------
+
+def feature_columns():
+    columns = [f"calls_{w}d" for w in CALL_WINDOWS] + [f"calls_{w}d_yoy" for w in CALL_WINDOWS]
+    return columns + [f"{c}_{how}_{w}d" for c, how, w in WEATHER_WINDOWS]
+
+
+def compute_features(raw):
+    """
+    Feature columns for a dense daily frame of raw inputs.
+
+    Parameters:
+    -----------
+    raw : pd.DataFrame
+        Indexed by consecutive days, with 'TotalCalls' and the weather inputs
+
+    Returns:
+    --------
+    pd.DataFrame
+        Feature columns (float32), same index
+    """
+    features = {}
+    calls = raw['TotalCalls'].to_numpy(dtype=np.float64)
+    for window in CALL_WINDOWS:
+        volume = sliding_sum(calls, window)
+        features[f"calls_{window}d"] = volume
+        features[f"calls_{window}d_yoy"] = lag_delta(volume, YOY_LAG)
+
+    aggregates = {'sum': sliding_sum, 'min': sliding_min, 'max': sliding_max,
+                  'mean': lambda v, w: sliding_sum(v, w) / w}
+    for column, how, window in WEATHER_WINDOWS:
+        values = raw[column].to_numpy(dtype=np.float64) if column in raw.columns \
+            else np.full(len(raw), np.nan)
+        features[f"{column}_{how}_{window}d"] = aggregates[how](values, window)
+    return pd.DataFrame(features, index=raw.index).astype(np.float32)
+
+
+def daily_inputs(cube, weather_path=None, location=None):
+    """
+    Dense daily frame of call totals and weather inputs.
+
+    Days without calls get 0 calls; weather is keyed by its UTC date (as in
+    dimension_join.weather_dimension) and sunshine is converted to hours.
+    """
+    calls = cube.daily().dropna(subset=['Date']).set_index('Date')['TotalCalls']
+    raw = pd.DataFrame({'TotalCalls': calls})
+
+    if weather_path:
+        weather = read_weather(weather_path)
+        if 'location' in weather.columns:
+            if location is not None:
+                weather = weather[weather['location'] == location]
+            weather = weather.drop(columns=['location'])
+        days = pd.to_datetime(weather['date'], utc=True).dt.tz_localize(None).dt.normalize()
+        weather = weather.drop(columns=['date']).set_index(days).groupby(level=0).first()
+        if 'sunshine_duration' in weather.columns:
+            weather['sunshine_hours'] = weather['sunshine_duration'] / 3600
+        raw = raw.join(weather, how='outer')
+
+    if raw.empty:
+        return raw
+    days = pd.date_range(raw.index.min(), raw.index.max(), freq='D', name='Date')
+    raw = raw.reindex(days)
+    # A day inside the call history with no calls is a zero, not a gap
+    inside = (days >= calls.index.min()) & (days <= calls.index.max()) if len(calls) \
+        else np.zeros(len(days), dtype=bool)
+    raw.loc[inside, 'TotalCalls'] = raw.loc[inside, 'TotalCalls'].fillna(0)
+    return raw.astype(np.float32)
+
+
+class RollingFeatures:
+    """
+    Daily feature matrix with its raw inputs, updated incrementally.
+
+    Parameters:
+    -----------
+    matrix : pd.DataFrame
+        Indexed by day; raw input columns followed by feature_columns()
+    """
+
+    def __init__(self, matrix=None):
+        self.matrix = matrix if matrix is not None else pd.DataFrame()
+
+    @property
+    def raw(self):
+        return self.matrix.drop(columns=feature_columns(), errors='ignore')
+
+    @classmethod
+    def build(cls, raw):
+        return cls(raw.join(compute_features(raw)))
+
+    def _first_change(self, raw):
+        """First day whose raw inputs are new or differ from the stored ones."""
+        if self.matrix.empty:
+            return raw.index.min()
+        stored = self.raw
+        if list(stored.columns) != list(raw.columns) or raw.index.min() != stored.index.min():
+            return raw.index.min()
+        common = raw.index.intersection(stored.index)
+        changed = ~np.isclose(raw.loc[common].to_numpy(dtype=np.float64),
+                              stored.loc[common].to_numpy(dtype=np.float64),
+                              equal_nan=True).all(axis=1)
+        new_days = raw.index.difference(stored.index)
+        candidates = list(common[changed]) + list(new_days)
+        return min(candidates) if candidates else None
+
+    def update(self, raw):
+        """
+        Bring the matrix up to date with a full dense raw frame.
+
+        Only days from the first new or changed day onwards are recomputed,
+        with LOOKBACK preceding days as window context. Stored days after
+        the end of raw are dropped.
+
+        Returns:
+        --------
+        int
+            Number of days recomputed
+        """
+        if not self.matrix.empty and not raw.empty:
+            self.matrix = self.matrix.loc[:raw.index.max()]
+        first = self._first_change(raw)
+        if first is None:
+            return 0
+        if first == raw.index.min():
+            self.matrix = raw.join(compute_features(raw))
+            return len(raw)
+
+        start = raw.index.get_loc(first)
+        context = raw.iloc[max(0, start - LOOKBACK):]
+        fresh = context.join(compute_features(context)).loc[first:]
+        self.matrix = pd.concat([self.matrix.loc[:first - pd.Timedelta(days=1)], fresh])
+        return len(fresh)
+
+    def save(self, path):
+        self.matrix.to_parquet(path)
+
+    @classmethod
+    def load(cls, path):
+        return cls(pd.read_parquet(path))
+
+
+def main():
+    """
+    Build or incrementally update the daily feature matrix.
+    """
+    parser = argparse.ArgumentParser(description='Rolling daily call and weather features')
+    parser.add_argument('source', nargs='?', default='Primary_CallReports_v1.7.csv')
+    parser.add_argument('--weather', default=find_weather(),
+                        help='daily weather table (default: Parquet, else the legacy CSV)')
+    parser.add_argument('--location', help='weather location for multi-location files')
+    parser.add_argument('--output', default='daily_features.parquet')
+    parser.add_argument('--rebuild', action='store_true', help='recompute every day')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    weather = args.weather if args.weather and os.path.exists(args.weather) else None
+    if weather is None:
+        logger.warning(f"Weather file {args.weather} not found; weather features will be NaN")
+    raw = daily_inputs(load_or_build_cube(args.source), weather, args.location)
+
+    if os.path.exists(args.output) and not args.rebuild:
+        features = RollingFeatures.load(args.output)
+        recomputed = features.update(raw)
+    else:
+        features = RollingFeatures.build(raw)
+        recomputed = len(raw)
+    features.save(args.output)
+    print(f"{len(features.matrix)} days in {args.output} ({recomputed} recomputed)")
+
+
+if __name__ == "__main__":
+    main()
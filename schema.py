@@ -0,0 +1,140 @@
+"""
+Mental Health Datathon - Call Report Column Schema
+==================================================
+
+Declares a compact dtype for every known call report column, across all
+dataset versions (v1.2 through v1.7), and applies it at load time and after
+each derivation step:
+
+- MonthName and DayOfWeek as ordered categoricals
+- Year as Int16 and Month/Day/Hour as Int8 (nullable, so NaT rows stay NA
+  instead of turning the column into float64)
+- 'Year&Month' and 'Quarter' join keys as categoricals instead of repeated
+  Python strings (to_period_keys() converts them to period dtypes)
+- exogenous measurements as float32
+
+compact() applies the schema and logs the bytes per row before and after.
+
+Usage:
+------
+    from schema import compact
+    df = compact(pd.read_csv("Primary_CallReports_v1.7.csv"))
+
+Author: [Mike Baran]
+"""
+
+import logging
+
+import pandas as pd
+
+from datetime_parsing import TimestampParser, parse_year_month
+from period_keys import quarter_keys_from_labels
+
+logger = logging.getLogger(__name__)
+
+MONTH_ORDER = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+TIMESTAMP_COLUMN = 'CallDateAndTimeStart'
+
+CALL_REPORT_SCHEMA = {
+    'CallReportNum': 'string',
+    TIMESTAMP_COLUMN: 'datetime64[ns]',
+    'Year': 'Int16',
+    'Month': 'Int8',
+    'MonthName': pd.CategoricalDtype(MONTH_ORDER, ordered=True),
+    'Day': 'Int8',
+    'Hour': 'Int8',
+    'DayOfWeek': pd.CategoricalDtype(DAY_ORDER, ordered=True),
+    'Year&Month': 'category',
+    'Quarter': 'category',
+    'AlbertaUnemploymentRate': 'float32',
+    'QuarterlyOpioidEMSResponsesAB': 'float32',
+    'temperature_2m_max': 'float32',
+    'temperature_2m_min': 'float32',
+    'rain_sum': 'float32',
+    'precipitation_hours': 'float32',
+    'daylight_duration': 'float32',
+    'sunshine_duration': 'float32',
+}
+
+
+def columns_of_type(kind):
+    """
+    Schema columns of one kind: 'string', 'category', 'integer' or 'float'.
+    """
+    def matches(dtype):
+        if kind == 'category':
+            return isinstance(dtype, pd.CategoricalDtype) or dtype == 'category'
+        if kind == 'integer':
+            return isinstance(dtype, str) and dtype.startswith('Int')
+        if kind == 'float':
+            return dtype == 'float32'
+        return dtype == kind
+    return [c for c, dtype in CALL_REPORT_SCHEMA.items() if matches(dtype)]
+
+
+def apply_schema(df, parser=None):
+    """
+    Convert every known column present in df to its schema dtype, in place.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Call report rows (any dataset version); unknown columns are kept as is
+    parser : TimestampParser, optional
+        Parser reused for 'CallDateAndTimeStart' (e.g. across chunks)
+
+    Returns:
+    --------
+    pd.DataFrame
+        The same frame
+    """
+    for column, dtype in CALL_REPORT_SCHEMA.items():
+        if column not in df.columns or df[column].dtype == dtype:
+            continue
+        if column == TIMESTAMP_COLUMN:
+            df[column] = (parser or TimestampParser()).parse(df[column])
+        elif dtype == 'float32' or (isinstance(dtype, str) and dtype.startswith('Int')):
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+        elif isinstance(dtype, str) and dtype == 'category':
+            # (an ordered CategoricalDtype also compares equal to 'category')
+            values = df[column]
+            if values.dtype != object:
+                values = values.astype(str).where(values.notna())
+            df[column] = values.astype('category')
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def bytes_per_row(df):
+    """Resident bytes per row, counting the contents of object columns."""
+    return df.memory_usage(deep=True, index=False).sum() / max(len(df), 1)
+
+
+def compact(df, parser=None, label='call reports'):
+    """
+    Apply the schema and log the memory footprint before and after.
+    """
+    before = bytes_per_row(df)
+    apply_schema(df, parser)
+    after = bytes_per_row(df)
+    logger.info(f"Memory for {label}: {before:.1f} -> {after:.1f} bytes/row "
+                f"({before / max(after, 1e-9):.1f}x smaller)")
+    return df
+
+
+def to_period_keys(df):
+    """
+    Replace the 'Year&Month' and 'Quarter' labels with period dtypes in place.
+    """
+    if 'Year&Month' in df.columns:
+        df['Year&Month'] = parse_year_month(df['Year&Month'].astype(object)).dt.to_period('M')
+    if 'Quarter' in df.columns:
+        keys = quarter_keys_from_labels(df['Quarter'])
+        quarters = pd.PeriodIndex.from_ordinals(keys, freq='Q') if hasattr(
+            pd.PeriodIndex, 'from_ordinals') else pd.PeriodIndex(ordinal=keys, freq='Q')
+        df['Quarter'] = pd.Series(quarters, index=df.index).where(keys >= 0)
+    return df
@@ -0,0 +1,236 @@
+"""
+Mental Health Datathon - Parallel Correlation Parameter Sweep
+=============================================================
+
+Replaces forked copies of the correlation scripts (one per start quarter,
+granularity or covariate) with one sweep over a grid of:
+
+    period start x period end x granularity x covariate x correlation method
+
+The daily call totals and every covariate mapped to days (monthly
+unemployment, quarterly EMS responses, daily weather) are taken from the
+call volume cube once and placed in a single shared-memory block. Worker
+processes attach to that block rather than receiving a copy. Each task
+handles one (start, end, granularity) combination: it rolls the days in the
+period up to days, ISO weeks, months or quarters with np.bincount and
+correlates every covariate with every method in one vectorized call
+(correlation.correlate). Covariates are averaged over each period.
+
+All results go to one tidy table with the columns start, end, granularity,
+covariate, method, r, p_value and n.
+
+Usage:
+------
+    python sweep.py Primary_CallReports_v1.7.csv \\
+        --start "2019 Q1" "2020 Q1" "2021 Q1" "2022 Q1" --end "2023 Q4" \\
+        --granularity daily weekly monthly quarterly --output sweep_results.csv
+
+Author: [Mike Baran]
+"""
+
+import argparse
+import itertools
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from call_cube import DAILY_EXOGENOUS, MONTHLY_EXOGENOUS, QUARTERLY_EXOGENOUS, load_or_build_cube
+from correlation import METHODS, correlate
+from datetime_parsing import day_key, month_key
+from period_keys import iso_week_keys, quarter_keys_from_months
+from resampling import month_bounds
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ('daily', 'weekly', 'monthly', 'quarterly')
+# Leading columns of the shared table; covariates follow
+KEY_COLUMNS = ['day', 'week', 'month', 'quarter']
+CALLS_COLUMN = len(KEY_COLUMNS)
+GRANULARITY_COLUMN = dict(zip(GRANULARITIES, range(len(KEY_COLUMNS))))
+
+# Set in each worker by _attach()
+_shared = None
+_table = None
+
+
+def daily_table(cube):
+    """
+    Every day of the call history with its period keys, call totals and covariates.
+
+    Days without calls are included with 0 calls (as in
+    rolling_features.daily_inputs), so daily correlations and the covariate
+    means of longer periods cover every day.
+
+    Returns:
+    --------
+    (np.ndarray, list of str)
+        float64 array of shape (days, 5 + covariates) and the covariate names
+    """
+    calls = cube.daily().dropna(subset=['Date']).set_index('Date')['TotalCalls']
+    days = pd.date_range(calls.index.min(), calls.index.max(), freq='D', name='Date') \
+        if len(calls) else pd.DatetimeIndex([], name='Date')
+    daily = calls.reindex(days, fill_value=0).reset_index()
+
+    # A day without calls takes the month and quarter labels of its month
+    labels = cube.counts[['Date', 'Year&Month', 'Quarter']].dropna(subset=['Date']) \
+        .drop_duplicates('Date')
+    by_month = labels.groupby(month_key(labels['Date']))[['Year&Month', 'Quarter']].first()
+    months = month_key(daily['Date'])
+    daily = daily.join(by_month.reindex(months).reset_index(drop=True))
+
+    covariates = {}
+    for level, key, candidates in [('monthly', 'Year&Month', MONTHLY_EXOGENOUS),
+                                   ('quarterly', 'Quarter', QUARTERLY_EXOGENOUS),
+                                   ('daily', 'Date', DAILY_EXOGENOUS)]:
+        table = cube.exogenous[level]
+        for column in candidates:
+            if column in table.columns:
+                covariates[column] = daily[key].map(table[column]).to_numpy(dtype=np.float64)
+
+    columns = [day_key(daily['Date']), iso_week_keys(daily['Date']), months,
+               quarter_keys_from_months(months), daily['TotalCalls'].to_numpy()]
+    table = np.column_stack([np.asarray(c, dtype=np.float64) for c in columns]
+                            + list(covariates.values()))
+    return table, list(covariates)
+
+
+def build_grid(starts, ends, granularities, covariates, methods):
+    """Every configuration of the grid as a tidy DataFrame (one row each)."""
+    return pd.DataFrame(list(itertools.product(starts, ends, granularities, covariates, methods)),
+                        columns=['start', 'end', 'granularity', 'covariate', 'method'])
+
+
+def _day_bounds(start, end):
+    """Inclusive day keys of the period between two month or quarter labels."""
+    first = -np.inf if start is None else \
+        day_key(pd.Series([month_bounds(start)[0]]))[0]
+    last = np.inf if end is None else \
+        day_key(pd.Series([month_bounds(end)[1] + pd.offsets.MonthEnd(0)]))[0]
+    return first, last
+
+
+def _attach(name, shape):
+    """Worker initializer: map the shared table without copying it."""
+    global _shared, _table
+    _shared = shared_memory.SharedMemory(name=name)
+    _table = np.ndarray(shape, dtype=np.float64, buffer=_shared.buf)
+
+
+def _evaluate(task):
+    """Correlations of one (start, end, granularity) for the requested covariates."""
+    start, end, granularity, covariate_names, covariate_columns, methods = task
+    first, last = _day_bounds(start, end)
+    rows = _table[(_table[:, 0] >= first) & (_table[:, 0] <= last)]
+
+    keys = rows[:, GRANULARITY_COLUMN[granularity]].astype(np.int64)
+    periods, inverse = np.unique(keys, return_inverse=True)
+    calls = np.bincount(inverse, weights=rows[:, CALLS_COLUMN], minlength=len(periods))
+
+    values = rows[:, covariate_columns]
+    present = ~np.isnan(values)
+    means = np.column_stack([
+        np.bincount(inverse, weights=np.where(present[:, i], values[:, i], 0.0),
+                    minlength=len(periods))
+        / np.bincount(inverse, weights=present[:, i], minlength=len(periods))
+        for i in range(len(covariate_columns))]) if covariate_columns else \
+        np.empty((len(periods), 0))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = correlate(pd.Series(calls), pd.DataFrame(means, columns=covariate_names),
+                           lags=(0,), methods=methods)
+    result.insert(0, 'granularity', granularity)
+    result.insert(0, 'end', end)
+    result.insert(0, 'start', start)
+    return result.drop(columns=['lag'])
+
+
+def run_sweep(table, covariates, grid, max_workers=None):
+    """
+    Evaluate a grid of configurations in parallel over one shared table.
+
+    Parameters:
+    -----------
+    table : np.ndarray
+        Output of daily_table()
+    covariates : list of str
+        Covariate names of the table's trailing columns
+    grid : pd.DataFrame
+        Output of build_grid()
+    max_workers : int, optional
+        Process pool size (default: number of cores)
+
+    Returns:
+    --------
+    pd.DataFrame
+        One row per configuration: start, end, granularity, covariate,
+        method, r, p_value, n
+    """
+    unknown = sorted(set(grid['covariate']) - set(covariates))
+    if unknown:
+        raise ValueError(f"Covariates not in the data: {unknown}")
+    unknown = sorted(set(grid['granularity']) - set(GRANULARITIES))
+    if unknown:
+        raise ValueError(f"Unknown granularities: {unknown} (use {list(GRANULARITIES)})")
+
+    tasks = []
+    for (start, end, granularity), configs in grid.groupby(
+            ['start', 'end', 'granularity'], sort=False, dropna=False):
+        names = sorted(set(configs['covariate']))
+        tasks.append((None if pd.isna(start) else start, None if pd.isna(end) else end,
+                      granularity, names, [CALLS_COLUMN + 1 + covariates.index(n) for n in names],
+                      sorted(set(configs['method']))))
+
+    logger.info(f"Sweeping {len(grid)} configurations as {len(tasks)} tasks "
+                f"over {len(table)} days ({table.nbytes / 1e6:.1f} MB shared)")
+    shared = shared_memory.SharedMemory(create=True, size=max(table.nbytes, 1))
+    try:
+        np.ndarray(table.shape, dtype=np.float64, buffer=shared.buf)[:] = table
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach,
+                                 initargs=(shared.name, table.shape)) as pool:
+            parts = list(pool.map(_evaluate, tasks, chunksize=max(1, len(tasks) // 256)))
+    finally:
+        shared.close()
+        shared.unlink()
+
+    results = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    # Keep exactly the requested configurations, in grid order
+    return grid.merge(results, on=['start', 'end', 'granularity', 'covariate', 'method'],
+                      how='left')
+
+
+def main():
+    """
+    Run a correlation sweep and write the tidy results table.
+    """
+    parser = argparse.ArgumentParser(description='Parallel correlation parameter sweep')
+    parser.add_argument('source', nargs='?', default='Primary_CallReports_v1.7.csv')
+    parser.add_argument('--start', nargs='+', default=[None],
+                        help="month or quarter labels, e.g. 2022-01 or '2022 Q1'")
+    parser.add_argument('--end', nargs='+', default=[None])
+    parser.add_argument('--granularity', nargs='+', choices=GRANULARITIES, default=['monthly'])
+    parser.add_argument('--covariate', nargs='+', help='default: every covariate in the cube')
+    parser.add_argument('--method', nargs='+', choices=METHODS, default=list(METHODS))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='sweep_results.csv')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    table, covariates = daily_table(load_or_build_cube(args.source))
+    grid = build_grid(args.start, args.end, args.granularity,
+                      args.covariate or covariates, args.method)
+
+    started = time.perf_counter()
+    results = run_sweep(table, covariates, grid, args.workers)
+    results.to_csv(args.output, index=False)
+    print(f"{len(results)} configurations in {time.perf_counter() - started:.2f}s "
+          f"written to {args.output}")
+    with pd.option_context('display.width', 120):
+        print(results.sort_values('p_value').head(20).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Mental Health Datathon - Synthetic Call Report Generator
+========================================================
+
+Writes a deterministic, synthetic copy of the pipeline's source files so
+performance can be measured outside the secure environment that holds the
+real call data:
+
+- Primary_CallReports_v1.2.csv with CallReportNum and CallDateAndTimeStart,
+  with calls skewed towards the evening and towards weekends
+- Unemployment Rate Alberta.csv (Date, Value, labels), one row per month
+- edmonton_daily_weather.parquet in the layout written by weather_decode.py
+- OpiodEMSResponsesAlberta.csv (Year_Quarter, Value), one row per quarter
+
+The same (rows, seed, chunksize) always produce byte-identical files. Rows
+are generated and written one chunk at a time, so 100M rows need no more
+memory than one chunk.
+
+Usage:
+------
+    python synthetic_data.py bench_data/1M --rows 1M
+    python synthetic_data.py bench_data/100M --rows 100M --seed 7
+
+Author: [Mike Baran]
+"""
+
+import argparse
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from weather_decode import write_weather
+
+logger = logging.getLogger(__name__)
+
+SIZES = {'1M': 1_000_000, '10M': 10_000_000, '100M': 100_000_000}
+DEFAULT_START = '2019-01-01'
+DEFAULT_END = '2023-12-31'
+DEFAULT_CHUNKSIZE = 1_000_000
+
+CALLS_FILE = 'Primary_CallReports_v1.2.csv'
+UNEMPLOYMENT_FILE = 'Unemployment Rate Alberta.csv'
+WEATHER_FILE = 'edmonton_daily_weather.parquet'
+EMS_FILE = 'OpiodEMSResponsesAlberta.csv'
+
+# Relative call volume by hour of day (quiet early morning, evening peak)
+HOUR_WEIGHTS = np.array([4, 3, 2, 2, 1, 1, 2, 3, 4, 5, 5, 5,
+                         5, 5, 5, 6, 6, 7, 8, 9, 10, 10, 8, 6], dtype=float)
+# Relative call volume by day of week, Monday to Sunday
+DAY_OF_WEEK_WEIGHTS = np.array([1.00, 0.95, 0.95, 0.97, 1.05, 1.15, 1.20])
+
+
+def parse_size(text):
+    """'1M', '10M', '100M' or a plain row count."""
+    return SIZES[text] if text in SIZES else int(text.replace('_', ''))
+
+
+def _day_probabilities(days):
+    """Probability of each day: day-of-week skew plus a slow upward trend."""
+    # 1970-01-01 was a Thursday (Monday = 0)
+    day_of_week = (days.astype(np.int64) + 3) % 7
+    trend = np.linspace(1.0, 1.3, len(days))
+    weights = DAY_OF_WEEK_WEIGHTS[day_of_week] * trend
+    return weights / weights.sum()
+
+
+def generate_calls(n_rows, seed=0, start=DEFAULT_START, end=DEFAULT_END,
+                   chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Yield synthetic call report chunks with the real column layout.
+
+    Each chunk is drawn from its own generator seeded by (seed, chunk number),
+    so the output does not depend on how many chunks are consumed.
+
+    Yields:
+    -------
+    pd.DataFrame
+        'CallReportNum' and 'CallDateAndTimeStart' (text, as in the source CSV)
+    """
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    day_p = _day_probabilities(days)
+    hour_p = HOUR_WEIGHTS / HOUR_WEIGHTS.sum()
+
+    for number, first in enumerate(range(0, n_rows, chunksize)):
+        size = min(chunksize, n_rows - first)
+        rng = np.random.default_rng([seed, number])
+        day = rng.choice(days, size=size, p=day_p)
+        seconds = rng.choice(24, size=size, p=hour_p) * 3600 + rng.integers(0, 3600, size=size)
+        timestamps = day.astype('datetime64[s]') + seconds.astype('timedelta64[s]')
+        # Calls are logged in time order within a chunk, like the real export
+        timestamps.sort()
+        text = np.char.replace(np.datetime_as_string(timestamps, unit='s'), 'T', ' ')
+        yield pd.DataFrame({
+            'CallReportNum': np.char.add('CR', np.char.zfill(
+                np.arange(first + 1, first + size + 1).astype(str), 10)),
+            'CallDateAndTimeStart': text,
+        })
+
+
+def write_calls(path, n_rows, seed=0, start=DEFAULT_START, end=DEFAULT_END,
+                chunksize=DEFAULT_CHUNKSIZE):
+    """Write generate_calls() output to one CSV, chunk by chunk."""
+    rows = 0
+    for chunk in generate_calls(n_rows, seed, start, end, chunksize):
+        chunk.to_csv(path, index=False, mode='w' if rows == 0 else 'a', header=rows == 0)
+        rows += len(chunk)
+        logger.info(f"Generated {rows}/{n_rows} call rows")
+    return rows
+
+
+def unemployment_table(start=DEFAULT_START, end=DEFAULT_END, seed=0):
+    """Monthly unemployment rate in the raw download layout."""
+    rng = np.random.default_rng([seed, 1])
+    months = pd.date_range(pd.Timestamp(start).to_period('M').to_timestamp(), end, freq='MS')
+    rate = np.clip(7.0 + np.cumsum(rng.normal(0, 0.3, len(months))), 3.0, 16.0)
+    return pd.DataFrame({'Date': months.strftime('%Y-%m-%d'), 'Value': rate.round(1),
+                         'labels': 'Unemployment rate'})
+
+
+def weather_table(start=DEFAULT_START, end=DEFAULT_END, seed=0, location='Edmonton'):
+    """Daily weather as an Arrow table in the weather_decode.py layout."""
+    rng = np.random.default_rng([seed, 2])
+    dates = pd.date_range(start, end, freq='D', tz='UTC')
+    n = len(dates)
+    season = np.cos(2 * np.pi * (dates.dayofyear.to_numpy() - 200) / 365.25)
+    t_max = 10 + 15 * season + rng.normal(0, 4, n)
+    rain = np.where(rng.random(n) < 0.3, rng.gamma(1.5, 3.0, n), 0.0)
+    daylight = 3600 * (12 + 4.5 * season)
+    columns = {
+        'temperature_2m_max': t_max,
+        'temperature_2m_min': t_max - 8 - rng.random(n) * 6,
+        'rain_sum': rain,
+        'precipitation_hours': np.where(rain > 0, rng.integers(1, 12, n), 0),
+        'daylight_duration': daylight,
+        'sunshine_duration': daylight * rng.uniform(0.2, 0.9, n),
+    }
+    return pa.table({
+        'location': pa.array([location] * n).dictionary_encode(),
+        'date': pa.array(dates.tz_localize(None).to_numpy('datetime64[s]'),
+                         type=pa.timestamp('s', tz='UTC')),
+        **{name: pa.array(values.astype(np.float32)) for name, values in columns.items()},
+    })
+
+
+def ems_table(start=DEFAULT_START, end=DEFAULT_END, seed=0):
+    """Quarterly opioid EMS responses (Year_Quarter, Value)."""
+    rng = np.random.default_rng([seed, 3])
+    quarters = pd.period_range(start, end, freq='Q')
+    values = np.round(1500 + np.cumsum(rng.normal(40, 120, len(quarters)))).astype(int)
+    return pd.DataFrame({'Year_Quarter': [f"{q.year} Q{q.quarter}" for q in quarters],
+                         'Value': values})
+
+
+def generate_dataset(data_dir, n_rows, seed=0, start=DEFAULT_START, end=DEFAULT_END,
+                     chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Write the call reports and the three exogenous tables into data_dir.
+
+    Returns:
+    --------
+    dict
+        Paths of the written files by role
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    paths = {role: os.path.join(data_dir, name) for role, name in
+             [('calls', CALLS_FILE), ('unemployment', UNEMPLOYMENT_FILE),
+              ('weather', WEATHER_FILE), ('ems', EMS_FILE)]}
+    write_calls(paths['calls'], n_rows, seed, start, end, chunksize)
+    unemployment_table(start, end, seed).to_csv(paths['unemployment'], index=False)
+    write_weather(weather_table(start, end, seed), paths['weather'])
+    ems_table(start, end, seed).to_csv(paths['ems'], index=False)
+    return paths
+
+
+def main():
+    """
+    Generate a synthetic data folder for the pipeline and benchmarks.
+    """
+    parser = argparse.ArgumentParser(description='Generate synthetic call report data')
+    parser.add_argument('data_dir')
+    parser.add_argument('--rows', default='1M', help="'1M', '10M', '100M' or a row count")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--start', default=DEFAULT_START)
+    parser.add_argument('--end', default=DEFAULT_END)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    paths = generate_dataset(args.data_dir, parse_size(args.rows), args.seed,
+                             args.start, args.end, args.chunksize)
+    print(f"Synthetic data written to: {', '.join(paths.values())}")
+
+
+if __name__ == "__main__":
+    main()
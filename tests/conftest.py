@@ -0,0 +1,73 @@
+"""
+Shared test setup.
+
+The analysis modules live flat at the repository root; make them importable
+and keep the log and metrics files that several of them write on import out
+of the working tree. The fixtures write the small input files several test
+modules share.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_scratch = tempfile.mkdtemp(prefix='datathon-tests-')
+os.environ.setdefault('DATATHON_METRICS_FILE', os.path.join(_scratch, 'metrics.jsonl'))
+# Scripts write their logs and outputs to the working directory
+os.chdir(_scratch)
+
+
+@pytest.fixture(scope='session')
+def write_calls_with_blanks():
+    """
+    Writer of a raw call CSV whose columns are blank in some chunks only.
+
+    Age (integers) is blank in row 7, Flag (booleans) in row 9, Note is empty
+    in the first four rows and row 5 has an invalid timestamp, so chunked
+    reads infer other dtypes per chunk than a whole-file read.
+    """
+    def write(path, rows=10):
+        lines = ['CallReportNum,CallDateAndTimeStart,Age,Score,Flag,Note']
+        for i in range(rows):
+            age = '' if i == 7 else str(30 + i)
+            flag = '' if i == 9 else str(i % 2 == 0)
+            note = '' if i < 4 else f'note {i}'
+            timestamp = 'not a date' if i == 5 else f'2023-01-{1 + i % 28:02d} {i % 24:02d}:15:00'
+            lines.append(f'CR{i},{timestamp},{age},{i}.50,{flag},{note}')
+        path.write_text('\n'.join(lines) + '\n')
+    return write
+
+
+@pytest.fixture(scope='session')
+def write_batch():
+    """Writer of a raw call batch with ids prefix+first .. prefix+(first+count-1)."""
+    def write(path, first=0, count=5, prefix='CR', year=2023):
+        lines = ['CallReportNum,CallDateAndTimeStart']
+        for i in range(first, first + count):
+            lines.append(f'{prefix}{i},{year}-{1 + i % 3:02d}-{1 + i % 28:02d} '
+                         f'{i % 24:02d}:30:00')
+        path.write_text('\n'.join(lines) + '\n')
+    return write
+
+
+@pytest.fixture(scope='session')
+def pipeline_data():
+    """
+    Writer of a synthetic data folder run through the pipeline.
+
+    Returns the generate_dataset() paths plus 'source', the v1.7 call reports.
+    """
+    from pipeline import run_pipeline
+    from synthetic_data import generate_dataset
+
+    def write(data_dir, rows, seed=0, start='2022-01-01', end='2022-06-30', chunksize=1000):
+        paths = generate_dataset(str(data_dir), rows, seed, start, end, chunksize)
+        run_pipeline(str(data_dir))
+        paths['source'] = os.path.join(str(data_dir), 'Primary_CallReports_v1.7.csv')
+        return paths
+    return write
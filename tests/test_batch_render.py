@@ -0,0 +1,48 @@
+"""A batch of chart specs renders once per format and is listed in the manifest."""
+
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from batch_render import default_specs, render_batch
+from call_cube import CallCube
+
+
+@pytest.fixture(scope='module')
+def cube(tmp_path_factory, pipeline_data):
+    return CallCube.from_calls(pd.read_csv(
+        pipeline_data(tmp_path_factory.mktemp('data'), 500)['source']))
+
+
+def test_default_specs_have_unique_names_per_period():
+    specs = default_specs('2022 Q1', '2022-03', formats=('png', 'svg'))
+
+    assert len({s['name'] for s in specs}) == len(specs)
+    assert all(s['name'].endswith('_2022Q1_2022-03') for s in specs)
+    assert all(s['formats'] == ['png', 'svg'] for s in specs)
+
+
+def test_duplicate_names_are_rejected_before_rendering(cube, tmp_path):
+    specs = default_specs()[:1] * 2
+    with pytest.raises(ValueError, match='Duplicate chart names'):
+        render_batch(cube, specs, str(tmp_path))
+    assert not os.listdir(tmp_path)
+
+
+def test_every_spec_and_format_is_written(cube, tmp_path):
+    pytest.importorskip('matplotlib')
+    pytest.importorskip('seaborn')
+    specs = default_specs('2022-02', '2022 Q2', formats=('png', 'svg'))
+
+    manifest = render_batch(cube, specs, str(tmp_path), max_workers=2)
+
+    with open(tmp_path / 'manifest.json') as f:
+        assert json.load(f)['charts'] == manifest['charts']
+    charts = {c['name']: c for c in manifest['charts']}
+    assert set(charts) == {s['name'] for s in specs}
+    assert charts['calls_by_MonthName_2022-02_2022Q2']['rows'] == 12
+    for chart in manifest['charts']:
+        assert sorted(chart['files']) == [f"{chart['name']}.png", f"{chart['name']}.svg"]
+        assert all(os.path.getsize(tmp_path / name) > 0 for name in chart['files'])
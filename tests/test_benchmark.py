@@ -0,0 +1,10 @@
+"""A benchmark step selected on its own first produces the inputs it reads."""
+
+from benchmark import run_benchmarks
+
+
+def test_correlations_step_runs_without_the_steps_before_it(tmp_path):
+    entry = run_benchmarks('600', ['correlations'], str(tmp_path))
+
+    [result] = entry['results']
+    assert result['step'] == 'correlations' and result['rows'] == 600
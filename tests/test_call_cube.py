@@ -0,0 +1,39 @@
+"""The cube answers the same totals as the raw rows, however it was built."""
+
+import pandas as pd
+import pytest
+
+from call_cube import CallCube
+
+SORT = ['Date', 'Hour', 'Year&Month', 'Quarter', 'DayOfWeek']
+
+
+@pytest.fixture(scope='module')
+def calls(tmp_path_factory, pipeline_data):
+    return pd.read_csv(pipeline_data(tmp_path_factory.mktemp('data'), 800)['source'])
+
+
+def _counts(cube):
+    return cube.counts.sort_values(SORT, ignore_index=True)
+
+
+def test_monthly_totals_match_the_raw_rows(calls):
+    monthly = CallCube.from_calls(calls).monthly(['AlbertaUnemploymentRate'])
+
+    expected = calls.groupby('Year&Month').agg(TotalCalls=('CallReportNum', 'size'),
+                                               AlbertaUnemploymentRate=(
+                                                   'AlbertaUnemploymentRate', 'first'))
+    pd.testing.assert_frame_equal(monthly.set_index('Year&Month'), expected)
+
+
+def test_updates_in_batches_equal_one_build_and_survive_a_save(calls, tmp_path):
+    cube = CallCube.from_calls(calls.iloc[:300])
+    cube.update(calls.iloc[300:550], batch='b1').update(calls.iloc[550:], batch='b2')
+    cube.update(calls.iloc[550:], batch='b2')
+    cube.save(str(tmp_path / 'calls.cube'))
+
+    loaded = CallCube.load(str(tmp_path / 'calls.cube'))
+
+    assert loaded.batches == {'b1', 'b2'}
+    pd.testing.assert_frame_equal(_counts(loaded), _counts(CallCube.from_calls(calls)),
+                                  check_dtype=False)
@@ -0,0 +1,41 @@
+"""run_command imports a module's main() or runs a script file, with its arguments."""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+from cli import COMMANDS, NO_PLOT_ENV, run_command
+from synthetic_data import CALLS_FILE
+
+
+@pytest.fixture(autouse=True)
+def restore_process_state(monkeypatch):
+    # run_command sets sys.argv and the no-plot variable for the subcommand
+    monkeypatch.setattr(sys, 'argv', list(sys.argv))
+    monkeypatch.delenv(NO_PLOT_ENV, raising=False)
+
+
+def test_module_command_runs_main_with_the_arguments(tmp_path):
+    run_command('synthetic', [str(tmp_path), '--rows', '50', '--seed', '3'])
+
+    assert sys.argv[0] == 'synthetic_data.py'
+    assert len(pd.read_csv(tmp_path / CALLS_FILE)) == 50
+
+
+def test_script_command_runs_the_file_as_main(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pd.DataFrame({'Year&Month': ['22-Jan', '2022-05']}).to_csv(
+        'Primary_CallReports_v1.5.csv', index=False)
+
+    run_command('convert-quarterly', [], no_plot=True)
+
+    assert list(pd.read_csv('test.csv')['Quarter']) == ['2022 Q1', '2022 Q2']
+    assert sys.argv[0].endswith(COMMANDS['convert-quarterly'][0])
+    assert os.environ[NO_PLOT_ENV] == '1'
+
+
+def test_unknown_command_is_rejected():
+    with pytest.raises(KeyError):
+        run_command('no-such-command', [])
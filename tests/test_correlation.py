@@ -0,0 +1,39 @@
+"""Lags in the correlation engine are calendar months, even with gaps in the data."""
+
+import numpy as np
+import pandas as pd
+
+from call_cube import CallCube
+from correlation import correlate, monthly_series
+
+
+def _calls(months):
+    """One call per (month, count) with the month's unemployment rate."""
+    rows = []
+    for month, count, rate in months:
+        for i in range(count):
+            rows.append({'CallDateAndTimeStart': f'{month}-{1 + i % 28:02d} 10:00:00',
+                         'Year&Month': month, 'AlbertaUnemploymentRate': rate})
+    return pd.DataFrame(rows)
+
+
+def test_monthly_series_has_one_row_per_calendar_month():
+    cube = CallCube.from_calls(_calls([('2022-01', 3, 5.0), ('2022-02', 4, 6.0),
+                                       ('2022-04', 6, 8.0)]))
+    frame = monthly_series(cube)
+
+    assert list(frame.index) == ['2022-01', '2022-02', '2022-03', '2022-04']
+    assert np.isnan(frame.loc['2022-03', 'TotalCalls'])
+    assert frame.loc['2022-04', 'TotalCalls'] == 6
+
+
+def test_lag_pairs_months_one_calendar_month_apart():
+    # Calls track the previous month's rate; March is missing from the data
+    months = [('2022-01', 10, 1.0), ('2022-02', 20, 3.0), ('2022-04', 50, 2.0),
+              ('2022-05', 20, 5.0), ('2022-06', 50, 4.0)]
+    frame = monthly_series(CallCube.from_calls(_calls(months)))
+    result = correlate(frame['TotalCalls'], frame[['AlbertaUnemploymentRate']], lags=[1],
+                       methods=['pearson'])
+
+    # Only Feb/Jan, May/Apr and Jun/May are one month apart and both present
+    assert result['n'].iloc[0] == 3
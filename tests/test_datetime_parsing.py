@@ -0,0 +1,33 @@
+"""The memoizing parser gives the same timestamps as pandas, across calls."""
+
+import numpy as np
+import pandas as pd
+
+from datetime_parsing import MISSING_KEY, TimestampParser, day_key, detect_format, month_key
+
+
+def test_parse_matches_pandas_and_reuses_the_cache():
+    first = pd.Series(['2023-01-05 08:15:00', None, '2023-01-05 08:15:00', 'not a date',
+                       '2023-02-28 23:59:59'])
+    second = pd.Series(['2023-02-28 23:59:59', '2023-03-01 00:00:00', '03/02/2023 10:00'])
+    parser = TimestampParser()
+
+    parsed = [parser.parse(first), parser.parse(second)]
+
+    assert parser.format == '%Y-%m-%d %H:%M:%S'
+    for values, result in zip([first, second], parsed):
+        expected = pd.Series([pd.to_datetime(v, errors='coerce') for v in values],
+                             dtype='datetime64[ns]')
+        pd.testing.assert_series_equal(result, expected)
+    assert len(parser._cache) == 5
+
+
+def test_detect_format_prefers_the_layout_most_values_have():
+    assert detect_format(['01/02/2023 3:04 PM', '12/31/2022 11:59 AM', 'junk']) == \
+        '%m/%d/%Y %I:%M %p'
+
+
+def test_keys_of_missing_timestamps():
+    timestamps = pd.Series(pd.to_datetime(['1970-01-01', '2022-03-15', None]))
+    np.testing.assert_array_equal(day_key(timestamps), [0, 19066, MISSING_KEY])
+    np.testing.assert_array_equal(month_key(timestamps), [0, 626, MISSING_KEY])
@@ -0,0 +1,41 @@
+"""Integer-key joins give the same rows as the label merges they replaced."""
+
+import os
+import runpy
+
+import pandas as pd
+import pytest
+
+from dimension_join import DimensionJoiner, ems_dimension
+from period_keys import quarter_keys_from_labels
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def data(tmp_path_factory, pipeline_data):
+    return pipeline_data(tmp_path_factory.mktemp('data'), 400)
+
+
+def test_ems_attach_matches_a_merge_on_the_quarter_label(data):
+    calls = pd.read_csv(os.path.join(os.path.dirname(data['source']),
+                                     'Primary_CallReports_v1.6.csv'))
+    ems = pd.read_csv(data['ems']).rename(columns={'Year_Quarter': 'Quarter',
+                                                   'Value': 'QuarterlyOpioidEMSResponsesAB'})
+    expected = calls.merge(ems, on='Quarter', how='left')
+
+    joiner = DimensionJoiner()
+    joiner.register(ems_dimension(data['ems']))
+    calls['quarter_key'] = quarter_keys_from_labels(calls['Quarter'])
+    result = joiner.attach(calls).drop(columns=['quarter_key'])
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_merge_ems_script_writes_the_pipeline_output(data, monkeypatch):
+    monkeypatch.chdir(os.path.dirname(data['source']))
+    expected = pd.read_csv(data['source'])
+
+    runpy.run_path(os.path.join(ROOT, 'Merge EMS Responses with Primary Dataset.py'))
+
+    pd.testing.assert_frame_equal(pd.read_csv(data['source']), expected)
@@ -0,0 +1,47 @@
+"""Rows missing one date/time component still count in the other histograms."""
+
+import numpy as np
+import pandas as pd
+
+from distributions import DAY_ORDER, DistributionCounts
+
+
+def _frame():
+    return pd.DataFrame({
+        'Year': [2021, 2021, 2022, 2022, 2022, np.nan],
+        'Month': [1, 2, 2, np.nan, 12, 5],
+        'Day': [1, 15, 28, 3, 31, 9],
+        'Hour': [0, np.nan, 23, 10, 10, 4],
+        'DayOfWeek': ['Monday', 'Friday', None, 'Sunday', 'Friday', 'Tuesday'],
+    })
+
+
+def _value_counts(series, index):
+    return series.value_counts().reindex(index, fill_value=0).astype(np.int64)
+
+
+def test_histograms_match_per_column_value_counts():
+    df = _frame()
+    counts = DistributionCounts.from_frame(df)
+
+    assert counts.total == 2 and counts.missing == 4
+    expected_year = df['Year'].dropna().astype(int).value_counts().sort_index()
+    assert counts.year().to_dict() == expected_year.to_dict()
+    assert counts.month().tolist() == _value_counts(df['Month'], range(1, 13)).tolist()
+    assert counts.day().tolist() == _value_counts(df['Day'], range(1, 32)).tolist()
+    assert counts.hour().tolist() == _value_counts(df['Hour'], range(24)).tolist()
+    assert counts.day_of_week().tolist() == _value_counts(df['DayOfWeek'], DAY_ORDER).tolist()
+    # Cross-tabs keep only the rows with every component
+    assert counts.hour_by_day_of_week().to_numpy().sum() == 2
+
+
+def test_merged_chunks_equal_one_pass():
+    df = _frame()
+    whole = DistributionCounts.from_frame(df)
+    merged = DistributionCounts.empty()
+    for start in range(0, len(df), 2):
+        merged += DistributionCounts.from_frame(df.iloc[start:start + 2])
+
+    for name in ('year', 'month', 'day', 'hour', 'day_of_week'):
+        pd.testing.assert_series_equal(getattr(merged, name)(), getattr(whole, name)())
+    assert merged.missing == whole.missing
@@ -0,0 +1,60 @@
+"""Retrying an interrupted batch leaves the cube equal to a rebuild from the store."""
+
+import pytest
+
+import incremental_ingest
+from call_cube import CallCube, cube_path_for, load_or_build_cube
+from call_store import read_call_store, write_partitions
+from incremental_ingest import ingest_batch
+
+
+def _monthly_totals(cube):
+    return cube.counts_by(['Year&Month']).set_index('Year&Month')['TotalCalls'].to_dict()
+
+
+@pytest.mark.parametrize('written', [0, 1, 3])
+def test_retry_after_interrupted_write_counts_every_row_once(tmp_path, monkeypatch, written,
+                                                             write_batch):
+    root = str(tmp_path / 'store')
+    write_batch(tmp_path / 'first.csv', 0, 30)
+    ingest_batch(str(tmp_path / 'first.csv'), root)
+    load_or_build_cube(root)
+
+    def interrupted(batch, root_):
+        # Write some months, then fail before the rest reach the store
+        months = sorted(batch['Year&Month'].astype(str).unique())[:written]
+        if months:
+            write_partitions(batch[batch['Year&Month'].astype(str).isin(months)].copy(), root_)
+        raise OSError('disk full')
+
+    write_batch(tmp_path / 'second.csv', 20, 40)
+    monkeypatch.setattr(incremental_ingest, 'write_partitions', interrupted)
+    with pytest.raises(OSError):
+        ingest_batch(str(tmp_path / 'second.csv'), root)
+    monkeypatch.undo()
+
+    ingest_batch(str(tmp_path / 'second.csv'), root)
+
+    stored = read_call_store(root, columns=['CallReportNum'])
+    assert len(stored) == stored['CallReportNum'].nunique() == 60
+    cube = CallCube.load(cube_path_for(root))
+    expected = CallCube.from_calls(read_call_store(root))
+    assert _monthly_totals(cube) == _monthly_totals(expected)
+    assert cube.counts['Calls'].sum() == 60
+
+
+def test_reingesting_archived_rows_of_a_csv_only_source_is_a_no_op(tmp_path, pipeline_data):
+    from call_store import load_call_reports, store_path_for
+
+    paths = pipeline_data(tmp_path, 500, seed=2)
+    source = paths['source']
+    load_or_build_cube(source)
+    batch = tmp_path / 'again.csv'
+    with open(paths['calls']) as f:
+        batch.write_text(''.join(f.readlines()[:11]))
+
+    summary = ingest_batch(str(batch), store_path_for(source))
+
+    assert summary['appended'] == 0 and summary['duplicates'] == 10
+    assert len(load_call_reports(source, columns=['CallReportNum'])) == 500
+    assert CallCube.load(cube_path_for(source)).counts['Calls'].sum() == 500
@@ -0,0 +1,59 @@
+"""A value that does not fit its numeric column is quarantined, not a failed load."""
+
+import pandas as pd
+import pytest
+
+from ingest import read_call_reports
+
+CSV = ('CallReportNum,CallDateAndTimeStart,AlbertaUnemploymentRate,rain_sum\n'
+       'A1,2022-01-03 10:00:00,5.5,0.0\n'
+       'A2,2022-01-04 11:00:00,5.5,1.0,extra\n'
+       '"A3\nsecond line",2022-01-05 12:00:00,n/a?,2.0\n'
+       '\n'
+       'A4,2022-01-06 13:00:00,,3.5\n'
+       'A5,2022-01-07 14:00:00,6.0,wet\n'
+       'A6,2022-01-08 15:00:00,6.5,4.0\n')
+
+
+@pytest.mark.parametrize('engine', ['c', 'pyarrow'])
+def test_bad_float_values_are_quarantined(tmp_path, engine):
+    path = tmp_path / 'calls.csv'
+    path.write_text(CSV)
+    quarantine = tmp_path / 'bad.csv'
+
+    df = read_call_reports(str(path), engine=engine, quarantine_path=str(quarantine))
+
+    assert df['CallReportNum'].tolist() == ['A1', 'A4', 'A6']
+    assert str(df['AlbertaUnemploymentRate'].dtype) == 'float32'
+    assert df['AlbertaUnemploymentRate'].isna().tolist() == [False, True, False]
+    assert df['rain_sum'].tolist() == [0.0, 3.5, 4.0]
+
+    bad = pd.read_csv(quarantine)
+    assert bad['line_number'].tolist() == [3, 4, 8]
+    assert 'AlbertaUnemploymentRate' in bad['reason'].iloc[1]
+    assert bad['text'].iloc[1].startswith('"A3\nsecond line"')
+    assert "rain_sum value 'wet'" in bad['reason'].iloc[2]
+    assert bad['text'].iloc[2] == 'A5,2022-01-07 14:00:00,6.0,wet'
+
+
+@pytest.mark.parametrize('engine', ['c', 'pyarrow'])
+def test_bad_integer_values_are_quarantined(tmp_path, engine):
+    path = tmp_path / 'calls.csv'
+    path.write_text('CallReportNum,Year,Month,Hour\n'
+                    'B1,2023,1,10\n'
+                    'B2,20x3,2,11\n'
+                    'B3,2023.0,3,\n'
+                    'B4,2023,4,12.5\n'
+                    'B5,2023,500,13\n'
+                    'B6,2024,6,14\n')
+    quarantine = tmp_path / 'bad.csv'
+
+    df = read_call_reports(str(path), engine=engine, quarantine_path=str(quarantine))
+
+    assert df['CallReportNum'].tolist() == ['B1', 'B3', 'B6']
+    assert str(df['Year'].dtype) == 'Int16' and df['Year'].tolist() == [2023, 2023, 2024]
+    assert df['Hour'].isna().tolist() == [False, True, False]
+    bad = pd.read_csv(quarantine)
+    assert bad['line_number'].tolist() == [3, 5, 6]
+    assert "Year value '20x3'" in bad['reason'].iloc[0]
+    assert 'Hour' in bad['reason'].iloc[1] and 'Month' in bad['reason'].iloc[2]
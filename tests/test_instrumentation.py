@@ -0,0 +1,44 @@
+"""Every stage appends one metrics line, also when it fails, and can be profiled."""
+
+import json
+import os
+
+import pytest
+
+from instrumentation import RUN_ID, stage
+
+
+def _records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_stage_records_throughput_and_errors(tmp_path):
+    path = str(tmp_path / 'metrics.jsonl')
+    with stage('load', path=path) as metrics:
+        (tmp_path / 'out.txt').write_text('x' * 100_000)
+        metrics.rows = 1000
+    with pytest.raises(ValueError):
+        with stage('transform', path=path):
+            raise ValueError('bad row')
+
+    load, transform = _records(path)
+    assert load == metrics.record
+    assert (load['stage'], load['status'], load['rows'], load['run_id']) == \
+        ('load', 'ok', 1000, RUN_ID)
+    assert load['rows_per_second'] > 0 and load['wall_seconds'] >= 0
+    assert load['write_bytes'] is None or load['write_bytes'] >= 100_000
+    assert (transform['stage'], transform['status'], transform['rows']) == \
+        ('transform', 'error', None)
+
+
+def test_profiling_is_limited_to_the_requested_stages(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATATHON_PROFILE', 'cprofile')
+    monkeypatch.setenv('DATATHON_PROFILE_STAGES', 'wanted')
+    monkeypatch.setenv('DATATHON_PROFILE_DIR', str(tmp_path / 'profiles'))
+
+    for name in ('wanted', 'other'):
+        with stage(name, path=str(tmp_path / 'metrics.jsonl')):
+            sum(range(1000))
+
+    assert os.listdir(tmp_path / 'profiles') == [f'wanted-{RUN_ID}.prof']
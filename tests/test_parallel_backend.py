@@ -0,0 +1,67 @@
+"""The parallel backend returns the same results as the single-process pandas code."""
+
+import pytest
+
+from parallel_backend import (build_cube, build_distributions, parallel_datetime_features,
+                              verify_cube, verify_distributions, verify_features)
+
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory, pipeline_data):
+    return pipeline_data(tmp_path_factory.mktemp('synthetic'), 3000, seed=3,
+                         start='2021-01-01', end='2022-12-31')
+
+
+def test_cube_matches_pandas(dataset):
+    source = dataset['source']
+    verify_cube(source, build_cube(source, max_workers=2))
+
+
+def test_distributions_match_pandas(dataset):
+    source = dataset['source']
+    verify_distributions(source, build_distributions(source, max_workers=2))
+
+
+def test_features_match_pandas(dataset, tmp_path):
+    paths = dataset
+    output = tmp_path / 'features.csv'
+    summary = parallel_datetime_features(paths['calls'], str(output), chunksize=700,
+                                         max_workers=2)
+
+    assert summary['rows'] == 3000
+    verify_features(paths['calls'], str(output))
+
+
+def test_features_match_pandas_when_nans_fall_in_some_chunks(tmp_path, write_calls_with_blanks):
+    source = tmp_path / 'calls.csv'
+    write_calls_with_blanks(source, rows=12)
+    output = tmp_path / 'features.csv'
+
+    parallel_datetime_features(str(source), str(output), chunksize=4, max_workers=2)
+    verify_features(str(source), str(output))
+
+
+def test_verify_raises_on_a_mismatch(dataset, tmp_path):
+    paths = dataset
+    output = tmp_path / 'features.csv'
+    parallel_datetime_features(paths['calls'], str(output), chunksize=700, max_workers=2)
+    lines = output.read_text().splitlines(keepends=True)
+    output.write_text(''.join(lines[:-1]))
+
+    with pytest.raises(RuntimeError, match='at line 3001'):
+        verify_features(paths['calls'], str(output))
+
+
+def test_cube_task_marks_the_cube_current(dataset, monkeypatch):
+    import call_cube
+    import parallel_backend
+
+    source = dataset['source']
+    monkeypatch.setattr('sys.argv', ['parallel_backend.py', 'cube', source, '--workers', '2'])
+    parallel_backend.main()
+
+    def rebuilt(*args, **kwargs):
+        raise AssertionError('the parallel cube was rebuilt')
+
+    monkeypatch.setattr(call_cube.CallCube, 'from_calls', rebuilt)
+    assert call_cube.load_or_build_cube(source).counts['Calls'].sum() == 3000
@@ -0,0 +1,27 @@
+"""Quarter keys agree whether they come from timestamps, months or labels."""
+
+import numpy as np
+import pandas as pd
+
+from datetime_parsing import MISSING_KEY
+from period_keys import (format_quarters, join_keys, month_keys, parse_quarter, quarter_keys,
+                         quarter_keys_from_labels)
+
+
+def test_quarter_keys_from_every_source_agree():
+    timestamps = pd.Series(pd.to_datetime(['1970-01-15', '2022-03-31', '2022-04-01', None]))
+    expected = np.array([0, parse_quarter('2022 Q1'), parse_quarter('2022 Q2'), MISSING_KEY])
+
+    labels = format_quarters(expected)
+    months = pd.Series(['1970-01', '2022-03', '22-Apr', None])
+
+    np.testing.assert_array_equal(quarter_keys(timestamps), expected)
+    np.testing.assert_array_equal(quarter_keys(labels), expected)
+    np.testing.assert_array_equal(quarter_keys(months), expected)
+    np.testing.assert_array_equal(join_keys(timestamps)['quarter_key'], expected)
+    np.testing.assert_array_equal(join_keys(timestamps)['month_key'], month_keys(timestamps))
+
+
+def test_unparseable_quarter_labels_are_missing():
+    keys = quarter_keys_from_labels(['2022 Q1', 'Q5 2022', None])
+    np.testing.assert_array_equal(keys, [parse_quarter('2022 Q1'), MISSING_KEY, MISSING_KEY])
@@ -0,0 +1,25 @@
+"""Stages rerun only when their inputs, code or outputs changed."""
+
+import os
+
+import pandas as pd
+
+from pipeline import run_pipeline
+
+
+def test_rerun_skips_unchanged_stages_and_reruns_changed_ones(tmp_path, pipeline_data):
+    paths = pipeline_data(tmp_path, 300)
+    assert run_pipeline(str(tmp_path)) == []
+
+    # An identical rebuild of a deleted output does not cascade downstream
+    os.remove(tmp_path / 'Primary_CallReports_v1.6.csv')
+    assert run_pipeline(str(tmp_path)) == ['quarter']
+
+    # A changed input reruns its stage and every stage downstream of it
+    unemployment = pd.read_csv(paths['unemployment'])
+    unemployment.loc[0, 'Value'] += 1
+    unemployment.to_csv(paths['unemployment'], index=False)
+    assert run_pipeline(str(tmp_path)) == ['clean_unemployment', 'merge_unemployment',
+                                           'merge_weather', 'quarter', 'merge_ems']
+    rates = pd.read_csv(paths['source'])['AlbertaUnemploymentRate']
+    assert unemployment.loc[0, 'Value'] in set(rates)
@@ -0,0 +1,29 @@
+"""Streaming datetime features must write the same bytes as the in-memory path."""
+
+from process_data import create_datetime_features, stream_datetime_features, summarize_datetime_features
+
+
+def test_stream_matches_in_memory_when_nans_fall_in_some_chunks(tmp_path, write_calls_with_blanks):
+    source = tmp_path / 'calls.csv'
+    write_calls_with_blanks(source)
+    in_memory, streamed = tmp_path / 'in_memory.csv', tmp_path / 'streamed.csv'
+
+    assert create_datetime_features(str(source), str(in_memory)) is not None
+    assert stream_datetime_features(str(source), str(streamed), chunksize=4) is not None
+    assert streamed.read_bytes() == in_memory.read_bytes()
+
+
+def test_stream_counts_match_in_memory_summary(tmp_path, write_calls_with_blanks):
+    source = tmp_path / 'calls.csv'
+    write_calls_with_blanks(source, rows=25)
+    df = create_datetime_features(str(source), str(tmp_path / 'in_memory.csv'))
+    expected = summarize_datetime_features(df)
+    summary = stream_datetime_features(str(source), str(tmp_path / 'streamed.csv'), chunksize=6)
+
+    assert summary['rows'] == expected['rows']
+    assert _as_dict(summary['hour_counts']) == _as_dict(expected['hour_counts'])
+    assert _as_dict(summary['day_of_week_counts']) == _as_dict(expected['day_of_week_counts'])
+
+
+def _as_dict(counts):
+    return {str(key): int(value) for key, value in counts.items() if value > 0}
@@ -0,0 +1,60 @@
+"""Batches ingested through the service get the exogenous tables of its data folder."""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from call_store import read_call_store, store_path_for
+from query_service import QueryService, make_handler
+
+
+@pytest.fixture
+def service(tmp_path, pipeline_data):
+    return QueryService(pipeline_data(tmp_path / 'data', 500, seed=5)['source'])
+
+
+@pytest.fixture
+def batch(tmp_path, write_batch):
+    path = tmp_path / 'batch.csv'
+    write_batch(path, prefix='NEW', year=2022)
+    return path
+
+
+def test_ingest_joins_the_tables_of_the_data_dir(service, batch):
+    assert service.ingest(str(batch))['appended'] == 5
+
+    stored = read_call_store(store_path_for(service.source))
+    new = stored[stored['CallReportNum'].str.startswith('NEW')]
+    for column in ['AlbertaUnemploymentRate', 'QuarterlyOpioidEMSResponsesAB',
+                   'temperature_2m_max']:
+        assert new[column].notna().all(), column
+
+
+def test_ingest_request_cannot_name_table_paths(service, batch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(service))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        body = json.dumps({'batch': str(batch),
+                           'tables': {'ems_csv': '/etc/passwd'}}).encode()
+        request = urllib.request.Request(f'http://127.0.0.1:{server.server_port}/ingest',
+                                         data=body)
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(request)
+        assert error.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_ingest_into_a_csv_source_keeps_the_archived_rows(service, batch):
+    from call_store import load_call_reports
+
+    service.ingest(str(batch))
+
+    calls = load_call_reports(service.source, columns=['CallReportNum'])
+    assert len(calls) == 505
+    assert service.cube.counts['Calls'].sum() == 505
@@ -0,0 +1,60 @@
+"""Permutation blocks follow quarter boundaries whatever month the series starts in."""
+
+import numpy as np
+import pandas as pd
+
+import resampling
+from resampling import _permutation_indices, resample_correlations
+
+
+def test_permutation_blocks_start_at_offset():
+    rng = np.random.default_rng(0)
+    idx = _permutation_indices(rng, n=12, block_size=3, batch=50, offset=2)
+
+    assert (idx[:, :2] == [0, 1]).all()
+    assert (np.sort(idx, axis=1) == np.arange(12)).all()
+    # Full blocks are [2, 5), [5, 8), [8, 11); the trailing month 11 stays in place
+    for row in idx:
+        blocks = row[2:11].reshape(-1, 3)
+        assert ((blocks - 2) % 3 == [0, 1, 2]).all()
+    assert (idx[:, 11] == 11).all()
+
+
+def test_series_starting_mid_quarter_is_blocked_by_quarter(monkeypatch):
+    months = pd.period_range('2022-02', '2023-06', freq='M')
+    frame = pd.DataFrame({'TotalCalls': np.arange(len(months), dtype=float),
+                          'QuarterlyOpioidEMSResponsesAB': np.repeat(np.arange(6.0), 3)[1:]},
+                         index=pd.Index(months.strftime('%Y-%m'), name='Year&Month'))
+    offsets = []
+    real_test = resampling.permutation_test
+
+    def recording_test(*args, **kwargs):
+        offsets.append(kwargs['offset'])
+        return real_test(*args, **kwargs)
+
+    monkeypatch.setattr(resampling, 'permutation_test', recording_test)
+    resample_correlations(frame, n_resamples=50, n_jobs=1)
+
+    # February and March come before the first quarter start (April)
+    assert offsets == [2]
+
+
+def test_covariate_without_complete_pairs_gets_nan():
+    months = pd.period_range('2021-01', '2022-12', freq='M')
+    frame = pd.DataFrame({'TotalCalls': np.arange(len(months), dtype=float),
+                          'AlbertaUnemploymentRate': np.arange(len(months), dtype=float) % 5,
+                          'QuarterlyOpioidEMSResponsesAB': np.r_[np.ones(12), np.full(12, np.nan)]},
+                         index=pd.Index(months.strftime('%Y-%m'), name='Year&Month'))
+
+    result = resample_correlations(frame, start='2022 Q1', n_resamples=200, n_jobs=1)
+
+    ems = result.set_index('covariate').loc['QuarterlyOpioidEMSResponsesAB']
+    assert ems[['r', 'permutation_p', 'ci_low', 'ci_high', 'std_err']].isna().all()
+    assert not np.isnan(result.set_index('covariate').loc['AlbertaUnemploymentRate', 'r'])
+
+
+def test_month_bounds_of_quarter_and_month_labels():
+    assert resampling.month_bounds('2022 Q3') == (pd.Timestamp('2022-07-01'),
+                                                  pd.Timestamp('2022-09-01'))
+    assert resampling.month_bounds('2022-05') == (pd.Timestamp('2022-05-01'),
+                                                  pd.Timestamp('2022-05-01'))
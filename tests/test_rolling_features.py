@@ -0,0 +1,34 @@
+"""An incremental update of the feature matrix equals a full rebuild."""
+
+import numpy as np
+import pandas as pd
+
+from rolling_features import RollingFeatures
+
+
+def _raw(days=900, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2021-01-01', periods=days, freq='D', name='Date')
+    return pd.DataFrame({'TotalCalls': rng.integers(0, 40, days),
+                         'temperature_2m_min': rng.normal(0, 10, days),
+                         'temperature_2m_max': rng.normal(10, 10, days),
+                         'rain_sum': rng.exponential(1, days)}, index=index).astype(np.float32)
+
+
+def test_update_with_new_and_changed_days_matches_build():
+    raw = _raw()
+    features = RollingFeatures.build(raw.iloc[:800])
+    raw.iloc[790, 0] += 5
+
+    recomputed = features.update(raw)
+
+    assert recomputed == 110
+    pd.testing.assert_frame_equal(features.matrix, RollingFeatures.build(raw).matrix)
+
+
+def test_update_with_shorter_input_drops_the_days_after_it():
+    raw = _raw()
+    features = RollingFeatures.build(raw)
+
+    assert features.update(raw.iloc[:700]) == 0
+    pd.testing.assert_frame_equal(features.matrix, RollingFeatures.build(raw.iloc[:700]).matrix)
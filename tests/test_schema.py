@@ -0,0 +1,35 @@
+"""Loaded call reports take the declared compact dtypes without losing values."""
+
+import pandas as pd
+import pytest
+
+from schema import CALL_REPORT_SCHEMA, bytes_per_row, compact, to_period_keys
+
+
+@pytest.fixture(scope='module')
+def source(tmp_path_factory, pipeline_data):
+    return pipeline_data(tmp_path_factory.mktemp('data'), 500)['source']
+
+
+def test_compact_applies_the_schema_and_keeps_the_values(source):
+    raw = pd.read_csv(source)
+    df = compact(pd.read_csv(source))
+
+    for column in df.columns:
+        if column in CALL_REPORT_SCHEMA:
+            assert df[column].dtype == CALL_REPORT_SCHEMA[column], column
+    assert bytes_per_row(df) < bytes_per_row(raw)
+    pd.testing.assert_series_equal(df['CallDateAndTimeStart'],
+                                   pd.to_datetime(raw['CallDateAndTimeStart']))
+    assert (df['Hour'].astype('float64') == raw['Hour']).all()
+    assert (df['DayOfWeek'].astype(str) == raw['DayOfWeek']).all()
+    pd.testing.assert_series_equal(df['AlbertaUnemploymentRate'].astype('float64'),
+                                   raw['AlbertaUnemploymentRate'], atol=1e-5)
+
+
+def test_period_keys_keep_missing_labels_missing():
+    df = to_period_keys(pd.DataFrame({'Year&Month': ['2022-01', '22-Feb', None],
+                                      'Quarter': ['2022 Q1', None, 'bad']}))
+
+    assert list(df['Year&Month'].astype(str)) == ['2022-01', '2022-02', 'NaT']
+    assert df['Quarter'].iloc[0] == pd.Period('2022Q1') and df['Quarter'].iloc[1:].isna().all()
@@ -0,0 +1,49 @@
+"""The sweep table covers days without calls and the sweep matches correlate()."""
+
+import numpy as np
+import pandas as pd
+
+from call_cube import CallCube
+from correlation import correlate
+from sweep import CALLS_COLUMN, build_grid, daily_table, run_sweep
+
+
+def _cube():
+    """Calls on a few days of each month of 2022 H1, with daily and monthly covariates."""
+    rng = np.random.default_rng(0)
+    rows = []
+    for month in range(1, 7):
+        for day in (3, 9, 17):
+            for _ in range(int(rng.integers(1, 6))):
+                rows.append({'CallDateAndTimeStart': f'2022-{month:02d}-{day:02d} 10:00:00',
+                             'Year&Month': f'2022-{month:02d}',
+                             'Quarter': f'2022 Q{(month - 1) // 3 + 1}',
+                             'AlbertaUnemploymentRate': 5 + month * rng.random(),
+                             'temperature_2m_max': float(day + month)})
+    return CallCube.from_calls(pd.DataFrame(rows))
+
+
+def test_daily_table_includes_days_without_calls():
+    cube = _cube()
+    table, covariates = daily_table(cube)
+
+    assert len(table) == (pd.Timestamp('2022-06-17') - pd.Timestamp('2022-01-03')).days + 1
+    assert table[:, CALLS_COLUMN].sum() == cube.counts['Calls'].sum()
+    assert (table[:, CALLS_COLUMN] == 0).sum() == len(table) - 18
+    # Days without calls still get the monthly covariate of their month
+    unemployment = table[:, CALLS_COLUMN + 1 + covariates.index('AlbertaUnemploymentRate')]
+    assert not np.isnan(unemployment).any()
+
+
+def test_run_sweep_matches_correlate_on_one_configuration():
+    cube = _cube()
+    table, covariates = daily_table(cube)
+    grid = build_grid([None], [None], ['monthly'], ['AlbertaUnemploymentRate'], ['pearson'])
+
+    [result] = run_sweep(table, covariates, grid, max_workers=1).itertuples()
+
+    monthly = cube.monthly(['AlbertaUnemploymentRate'])
+    [expected] = correlate(monthly['TotalCalls'], monthly[['AlbertaUnemploymentRate']],
+                           methods=['pearson']).itertuples()
+    assert result.n == expected.n == 6
+    assert np.isclose(result.r, expected.r) and np.isclose(result.p_value, expected.p_value)
@@ -0,0 +1,32 @@
+"""The same arguments always write the same synthetic files."""
+
+import filecmp
+
+import pandas as pd
+import pytest
+
+from synthetic_data import generate_dataset, parse_size
+
+
+def test_same_seed_writes_identical_files_and_another_seed_does_not(tmp_path):
+    first = generate_dataset(str(tmp_path / 'a'), 250, seed=1, start='2022-01-01',
+                             end='2022-03-31', chunksize=100)
+    second = generate_dataset(str(tmp_path / 'b'), 250, seed=1, start='2022-01-01',
+                              end='2022-03-31', chunksize=100)
+    other = generate_dataset(str(tmp_path / 'c'), 250, seed=2, start='2022-01-01',
+                             end='2022-03-31', chunksize=100)
+
+    assert all(filecmp.cmp(first[role], second[role], shallow=False) for role in first)
+    assert not filecmp.cmp(first['calls'], other['calls'], shallow=False)
+
+    calls = pd.read_csv(first['calls'])
+    times = pd.to_datetime(calls['CallDateAndTimeStart'])
+    assert len(calls) == 250 and calls['CallReportNum'].is_unique
+    assert times.min() >= pd.Timestamp('2022-01-01') and times.max() < pd.Timestamp('2022-04-01')
+    assert len(pd.read_csv(first['ems'])) == 1 and len(pd.read_csv(first['unemployment'])) == 3
+
+
+@pytest.mark.parametrize('text, rows', [('1M', 1_000_000), ('100M', 100_000_000),
+                                        ('2500', 2500)])
+def test_parse_size(text, rows):
+    assert parse_size(text) == rows
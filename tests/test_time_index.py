@@ -0,0 +1,35 @@
+"""A time-range read through the index returns exactly the calls in the window."""
+
+import pandas as pd
+import pytest
+
+from call_store import convert_csv_to_store, read_call_store
+from time_index import load_or_build_index, read_time_range
+
+COLUMNS = ['CallReportNum', 'CallDateAndTimeStart']
+
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory, pipeline_data):
+    paths = pipeline_data(tmp_path_factory.mktemp('data'), 1500)
+    # Several files per month, so the read has to pick files and row groups
+    return convert_csv_to_store(paths['source'], chunksize=400)
+
+
+@pytest.mark.parametrize('start, end', [('2022-02-10', '2022-03-20 12:30'),
+                                        (None, '2022-01-15'), ('2022-06-01', None)])
+def test_read_matches_a_filter_of_the_whole_store(store, start, end):
+    everything = read_call_store(store, columns=COLUMNS)
+    times = everything['CallDateAndTimeStart']
+    inside = times.notna()
+    if start is not None:
+        inside &= times >= pd.Timestamp(start)
+    if end is not None:
+        inside &= times < pd.Timestamp(end)
+    expected = everything[inside].sort_values(COLUMNS, ignore_index=True)
+
+    result = read_time_range(store, start, end, columns=COLUMNS)
+
+    assert result['CallDateAndTimeStart'].is_monotonic_increasing
+    assert load_or_build_index(store).count(start, end) == len(expected) > 0
+    pd.testing.assert_frame_equal(result.sort_values(COLUMNS, ignore_index=True), expected)
@@ -0,0 +1,79 @@
+"""Responses decode into one table with a row per location and day."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from weather_decode import decode_responses, read_weather, to_pandas, write_weather
+
+DAY = 86400
+
+
+class FakeVariable:
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=np.float32)
+
+    def ValuesAsNumpy(self):
+        return self.values
+
+
+class FakeBlock:
+    """The parts of an Open-Meteo daily block the decoder reads."""
+
+    def __init__(self, start, columns):
+        self.start, self.columns = start, columns
+
+    def Time(self):
+        return self.start
+
+    def TimeEnd(self):
+        return self.start + DAY * len(self.columns[0])
+
+    def Interval(self):
+        return DAY
+
+    def VariablesLength(self):
+        return len(self.columns)
+
+    def Variables(self, j):
+        return FakeVariable(self.columns[j])
+
+
+class FakeResponse:
+    def __init__(self, latitude, longitude, block):
+        self.latitude, self.longitude, self.block = latitude, longitude, block
+
+    def Latitude(self):
+        return self.latitude
+
+    def Longitude(self):
+        return self.longitude
+
+    def Daily(self):
+        return self.block
+
+
+def _responses():
+    return [FakeResponse(53.5, -113.5, FakeBlock(0, [[1, 2, 3], [0.5, 0, 0]])),
+            FakeResponse(51.0, -114.1, FakeBlock(DAY, [[4, 5], [1, 1]]))]
+
+
+@pytest.mark.parametrize('name', ['weather.parquet', 'weather.arrow'])
+def test_decoded_table_round_trips_through_the_file(tmp_path, name):
+    table = decode_responses(_responses(), ['temperature_2m_max', 'rain_sum'])
+    write_weather(table, str(tmp_path / name))
+
+    df = read_weather(str(tmp_path / name))
+
+    # Parquet has no second resolution, so dates come back in milliseconds
+    pd.testing.assert_frame_equal(df, to_pandas(table), check_dtype=False)
+    assert list(df['location'].astype(str)) == \
+        ['53.5000,-113.5000'] * 3 + ['51.0000,-114.1000'] * 2
+    assert list(df['date'].dt.day) == [1, 2, 3, 2, 3]
+    np.testing.assert_array_equal(df['temperature_2m_max'], [1, 2, 3, 4, 5])
+    assert df['rain_sum'].dtype == np.float32
+
+
+def test_variable_count_mismatch_is_rejected():
+    with pytest.raises(ValueError, match='expected 3'):
+        decode_responses(_responses(), ['a', 'b', 'c'], names=['Edmonton', 'Calgary'])
@@ -0,0 +1,89 @@
+"""WeatherFetcher against a local stub of the Open-Meteo archive API (no network)."""
+
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from weather_fetch import Location, WeatherFetcher
+
+EDMONTON = Location('Edmonton', 53.5461, -113.4938)
+
+
+@pytest.fixture
+def archive():
+    """Stub archive server; yields (url, list of (start_date, end_date, variables) requested)."""
+    requested = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            params = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+            start, end = params['start_date'][0], params['end_date'][0]
+            variables = params['daily'][0].split(',')
+            requested.append((start, end, tuple(variables)))
+            days = pd.date_range(start, end, freq='D')
+            daily = {'time': [d.strftime('%Y-%m-%d') for d in days]}
+            for number, variable in enumerate(variables):
+                daily[variable] = [float(d.day + number) for d in days]
+            body = json.dumps({'daily': daily}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/v1/archive", requested
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_missing_tiles_are_fetched_and_cached_tiles_reused(archive, tmp_path):
+    url, requested = archive
+    fetcher = WeatherFetcher(cache_dir=str(tmp_path), archive_url=url, max_workers=4,
+                             variables=['temperature_2m_max', 'rain_sum'])
+
+    first = fetcher.fetch([(EDMONTON, '2021-01-10', '2021-03-31')])
+    assert sorted(r[0] for r in requested) == ['2021-01-01', '2021-02-01', '2021-03-01']
+    assert first['date'].min() == pd.Timestamp('2021-01-10')
+    assert first['date'].max() == pd.Timestamp('2021-03-31')
+    assert len(first) == 81
+
+    requested.clear()
+    again = fetcher.fetch([(EDMONTON, '2021-01-10', '2021-03-31')])
+    assert requested == []
+    pd.testing.assert_frame_equal(again, first)
+
+    # Extending the range fetches only the new tile
+    extended = fetcher.fetch([(EDMONTON, '2021-01-10', '2021-04-30')])
+    assert [r[0] for r in requested] == ['2021-04-01']
+    assert len(extended) == 81 + 30
+
+
+def test_changed_request_parameters_do_not_reuse_cached_tiles(archive, tmp_path):
+    url, requested = archive
+    WeatherFetcher(cache_dir=str(tmp_path), archive_url=url,
+                   variables=['temperature_2m_max']).fetch([(EDMONTON, '2021-01-01', '2021-01-31')])
+
+    requested.clear()
+    weather = WeatherFetcher(cache_dir=str(tmp_path), archive_url=url,
+                             variables=['temperature_2m_max', 'rain_sum']) \
+        .fetch([(EDMONTON, '2021-01-01', '2021-01-31')])
+    assert len(requested) == 1 and 'rain_sum' in requested[0][2]
+    assert weather['rain_sum'].notna().all()
+
+    requested.clear()
+    moved = Location('Edmonton', 53.6, -113.5)
+    WeatherFetcher(cache_dir=str(tmp_path), archive_url=url,
+                   variables=['temperature_2m_max']).fetch([(moved, '2021-01-01', '2021-01-31')])
+    assert len(requested) == 1
@@ -1,49 +1,27 @@
+import os
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import sys
 
-# Set style for better visualization
-plt.style.use('ggplot')
-sns.set_palette("viridis")
+from distributions import DistributionCounts
+from ingest import read_call_reports
 
 # Read CSV data with debugging
 file_path = 'processed_call_reports.csv'  # Adjust if your file has a different name
 
-# Try reading with more basic settings first to diagnose the issue
+# Read the file once; malformed lines are quarantined instead of re-parsing
 try:
-    print("Attempting to read CSV file with basic settings...")
-    # Try reading with a specific separator
-    df = pd.read_csv(file_path, sep=',', engine='python')
-    print(f"Successfully read CSV using basic settings with {len(df)} rows.")
+    df = read_call_reports(file_path)
+    print(f"Successfully read CSV with {len(df)} rows.")
     print(f"Column count: {len(df.columns)}")
     print(f"First few column names: {list(df.columns)[:5]}")
-    
+
     # Display first few rows to verify content
     print("\nFirst 2 rows of data:")
     print(df.head(2).to_string())
-    
+
 except Exception as e:
-    print(f"Error reading CSV with basic settings: {e}")
-    
-    # Try an alternative approach with more flexibility
-    try:
-        print("\nAttempting alternative CSV reading approach...")
-        # Using error handling and low memory mode
-        df = pd.read_csv(file_path, engine='python', on_bad_lines='skip', low_memory=False)
-        print(f"Successfully read CSV using alternative approach with {len(df)} rows.")
-    except Exception as e:
-        print(f"Error with alternative approach: {e}")
-        print("Trying one more method with extreme flexibility...")
-        
-        # Final attempt with maximum flexibility
-        try:
-            df = pd.read_csv(file_path, engine='python', on_bad_lines='skip', 
-                             delimiter=None, header='infer', skiprows=0)
-            print(f"Successfully read CSV with final attempt. Found {len(df)} rows.")
-        except Exception as e:
-            print(f"All CSV reading attempts failed: {e}")
-            sys.exit(1)
+    print(f"Error reading CSV: {e}")
+    sys.exit(1)
 
 # Print DataFrame info to verify what was loaded
 print("\nDataFrame Summary:")
@@ -68,24 +46,31 @@ if not available_columns:
             if req.lower() in col.lower():
                 print(f"Potential match: '{col}' might correspond to '{req}'")
 
-# Create synthetic data for testing if needed
+# Stop rather than chart data that is not there
 if not available_columns:
-    print("\nCreating synthetic data for testing visualization...")
-    # Create a synthetic dataframe with the required columns
-    synthetic_df = pd.DataFrame({
-        'Year': [2020, 2021, 2022, 2023],
-        'Month': [1, 2, 3, 4],
-        'MonthName': ['January', 'February', 'March', 'April'],
-        'Day': [1, 15, 20, 25],
-        'Hour': [9, 12, 15, 18],
-        'DayOfWeek': ['Monday', 'Tuesday', 'Wednesday', 'Thursday']
-    })
-    
-    # Use a few rows of synthetic data to test visualization
-    df = synthetic_df
-    print("Using synthetic data for visualization test.")
-else:
-    print("\nUsing actual data for visualization.")
+    print("\nNo time-related columns were found in the data; nothing to visualize.")
+    sys.exit(1)
+
+print("\nUsing actual data for visualization.")
+
+# Count every time dimension in a single pass over integer-coded columns
+distributions = DistributionCounts.from_frame(df)
+
+# Without plotting (cli.py --no-plot), print the counts and skip the plotting imports
+if os.environ.get('DATATHON_NO_PLOT'):
+    for column, counts in [('Year', distributions.year), ('MonthName', distributions.month_name),
+                           ('Day', distributions.day), ('Hour', distributions.hour),
+                           ('DayOfWeek', distributions.day_of_week)]:
+        if column in df.columns:
+            print(f"\n{column} counts:\n{counts()}")
+    sys.exit(0)
+
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+# Set style for better visualization (only once there is data to chart)
+plt.style.use('ggplot')
+sns.set_palette("viridis")
 
 # Creating figure with subplots for each time dimension
 print("\nGenerating visualization...")
@@ -96,7 +81,7 @@ subplot_position = 1
 if 'Year' in df.columns:
     ax1 = fig.add_subplot(3, 2, subplot_position)
     subplot_position += 1
-    year_counts = df['Year'].value_counts().sort_index()
+    year_counts = distributions.year()
     print(f"Year counts: {year_counts}")
     sns.barplot(x=year_counts.index, y=year_counts.values, ax=ax1)
     ax1.set_title('Call Distribution by Year', fontsize=16)
@@ -118,13 +103,9 @@ if 'Year' in df.columns:
 if 'MonthName' in df.columns:
     ax3 = fig.add_subplot(3, 2, subplot_position)
     subplot_position += 1
-    # Create a mapping of month names to ensure they're in correct order
-    month_order = ['January', 'February', 'March', 'April', 'May', 'June', 
-                  'July', 'August', 'September', 'October', 'November', 'December']
-    month_name_counts = df['MonthName'].value_counts()
+    # Counts for all months, January to December
+    month_name_counts = distributions.month_name()
     print(f"Month name counts: {month_name_counts}")
-    # Reindex to ensure all months are included in correct order
-    month_name_counts = month_name_counts.reindex(month_order, fill_value=0)
     sns.barplot(x=month_name_counts.index, y=month_name_counts.values, ax=ax3)
     ax3.set_title('Call Distribution by Month Name', fontsize=16)
     ax3.set_xlabel('Month Name', fontsize=12)
@@ -135,7 +116,7 @@ if 'MonthName' in df.columns:
 if 'Day' in df.columns:
     ax4 = fig.add_subplot(3, 2, subplot_position)
     subplot_position += 1
-    day_counts = df['Day'].value_counts().sort_index()
+    day_counts = distributions.day()
     print(f"Day counts: {day_counts}")
     sns.barplot(x=day_counts.index, y=day_counts.values, ax=ax4)
     ax4.set_title('Call Distribution by Day of Month', fontsize=16)
@@ -146,7 +127,7 @@ if 'Day' in df.columns:
 if 'Hour' in df.columns:
     ax5 = fig.add_subplot(3, 2, subplot_position)
     subplot_position += 1
-    hour_counts = df['Hour'].value_counts().sort_index()
+    hour_counts = distributions.hour()
     print(f"Hour counts: {hour_counts}")
     sns.barplot(x=hour_counts.index, y=hour_counts.values, ax=ax5)
     ax5.set_title('Call Distribution by Hour of Day', fontsize=16)
@@ -157,12 +138,9 @@ if 'Hour' in df.columns:
 if 'DayOfWeek' in df.columns:
     ax6 = fig.add_subplot(3, 2, subplot_position)
     subplot_position += 1
-    # Create a mapping of days to ensure they're in correct order
-    day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    day_week_counts = df['DayOfWeek'].value_counts()
+    # Counts for all days, Monday to Sunday
+    day_week_counts = distributions.day_of_week()
     print(f"Day of week counts: {day_week_counts}")
-    # Reindex to ensure all days are included in correct order
-    day_week_counts = day_week_counts.reindex(day_order, fill_value=0)
     sns.barplot(x=day_week_counts.index, y=day_week_counts.values, ax=ax6)
     ax6.set_title('Call Distribution by Day of Week', fontsize=16)
     ax6.set_xlabel('Day of Week', fontsize=12)
@@ -181,20 +159,16 @@ if subplot_position == 1:
 # Adjust layout
 plt.tight_layout()
 
-# Save the figure with a timestamp to avoid overwriting
+# Stamp the generation time on the figure before saving it (once)
 import datetime
-timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-output_filename = f'call_time_distributions_{timestamp}.png'
-plt.savefig(output_filename, dpi=300)
-print(f"\nCharts generated and saved as '{output_filename}'")
-
-# Force the figure to have content
-plt.figtext(0.02, 0.02, f"Generated on {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", 
+generated = datetime.datetime.now()
+plt.figtext(0.02, 0.02, f"Generated on {generated.strftime('%Y-%m-%d %H:%M:%S')}",
            fontsize=8, color='gray')
 
-# Save again after adding the timestamp text
+# Save the figure with a timestamp to avoid overwriting
+output_filename = f'call_time_distributions_{generated.strftime("%Y%m%d_%H%M%S")}.png'
 plt.savefig(output_filename, dpi=300)
-print(f"Visualization saved with timestamp.")
+print(f"\nCharts generated and saved as '{output_filename}'")
 
 # Show the plot
 plt.show()
\ No newline at end of file
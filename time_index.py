@@ -0,0 +1,285 @@
+"""
+Mental Health Datathon - Timestamp Index over the Call Store
+============================================================
+
+A persisted, sorted index on CallDateAndTimeStart for the partitioned call
+store (call_store.py), so a time-window question reads only the rows in the
+window instead of loading the whole history and masking it.
+
+The index is three memory-mapped .npy arrays of equal length, sorted by time:
+
+timestamps.npy   int64 nanoseconds since 1970-01-01 (NaT rows are left out)
+file_ids.npy     int32 position of the Parquet file in files.json
+rows.npy         int64 row number inside that file
+
+plus files.json with the store files (size and modification time) and the
+first row of every row group. A range query binary-searches timestamps.npy,
+groups the matching (file, row) pairs by file and reads only the row groups
+that contain them.
+
+The index lives in '<store>/_time_index' (ignored by the Parquet reader) and
+is brought up to date automatically: files added by incremental ingestion
+are indexed on their own and merged in, any other change rebuilds it.
+
+Usage:
+------
+    from time_index import read_time_range
+    df = read_time_range("Primary_CallReports_v1.7.parquet", "2022-01-01", "2022-04-01",
+                         columns=["CallDateAndTimeStart", "QuarterlyOpioidEMSResponsesAB"])
+
+    python time_index.py Primary_CallReports_v1.7.parquet --start 2022-01-01 --end 2022-04-01
+
+Author: [Mike Baran]
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from call_store import PARTITION_COLUMN, partition_value
+from schema import TIMESTAMP_COLUMN, apply_schema
+
+logger = logging.getLogger(__name__)
+
+INDEX_FOLDER = '_time_index'
+ARRAYS = ('timestamps', 'file_ids', 'rows')
+
+
+def _store_files(root):
+    """Parquet files of the store, relative to root, in a stable order."""
+    files = []
+    for folder, dirs, names in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(('_', '.')))
+        files.extend(os.path.relpath(os.path.join(folder, n), root)
+                     for n in sorted(names) if n.endswith('.parquet'))
+    return files
+
+
+def _file_entry(root, relative):
+    path = os.path.join(root, relative)
+    metadata = pq.ParquetFile(path).metadata
+    starts = np.cumsum([0] + [metadata.row_group(i).num_rows
+                              for i in range(metadata.num_row_groups)])
+    return {'path': relative, 'size': os.path.getsize(path),
+            'mtime': os.path.getmtime(path), 'row_group_starts': starts.tolist()}
+
+
+def _unchanged(root, entry):
+    path = os.path.join(root, entry['path'])
+    return os.path.exists(path) and os.path.getsize(path) == entry['size'] \
+        and os.path.getmtime(path) == entry['mtime']
+
+
+def _index_files(root, entries, first_id):
+    """(timestamps, file_ids, rows) of the given files, unsorted."""
+    parts = []
+    for offset, entry in enumerate(entries):
+        table = pq.read_table(os.path.join(root, entry['path']), columns=[TIMESTAMP_COLUMN])
+        values = table.to_pandas()[TIMESTAMP_COLUMN].to_numpy(dtype='datetime64[ns]') \
+            .view(np.int64)
+        # NaT is stored as the smallest int64
+        valid = values != np.iinfo(np.int64).min
+        rows = np.flatnonzero(valid)
+        parts.append((values[valid], np.full(len(rows), first_id + offset, dtype=np.int32), rows))
+    if not parts:
+        return (np.empty(0, np.int64), np.empty(0, np.int32), np.empty(0, np.int64))
+    return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+
+class TimeIndex:
+    """
+    Sorted, memory-mapped timestamp index of one call store.
+
+    Parameters:
+    -----------
+    root : str
+        Store folder
+    files : list of dict
+        files.json entries
+    timestamps, file_ids, rows : np.ndarray
+        Index arrays (memory-mapped when loaded from disk)
+    """
+
+    def __init__(self, root, files, timestamps, file_ids, rows):
+        self.root = root
+        self.files = files
+        self.timestamps = timestamps
+        self.file_ids = file_ids
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @staticmethod
+    def folder(root):
+        return os.path.join(root, INDEX_FOLDER)
+
+    @classmethod
+    def build(cls, root, previous=None):
+        """
+        Index the store, reusing `previous` when the store only gained files.
+        """
+        current = _store_files(root)
+        if previous is not None and all(_unchanged(root, e) for e in previous.files):
+            known = {e['path'] for e in previous.files}
+            new_entries = [_file_entry(root, p) for p in current if p not in known]
+            files = previous.files + new_entries
+            added = _index_files(root, new_entries, len(previous.files))
+            arrays = [np.concatenate([np.asarray(old), new])
+                      for old, new in zip((previous.timestamps, previous.file_ids,
+                                           previous.rows), added)]
+            logger.info(f"Adding {len(new_entries)} new files to the time index of {root}")
+        else:
+            files = [_file_entry(root, p) for p in current]
+            arrays = list(_index_files(root, files, 0))
+            logger.info(f"Building the time index of {root} ({len(files)} files)")
+
+        order = np.argsort(arrays[0], kind='stable')
+        return cls(root, files, *(a[order] for a in arrays))
+
+    def save(self):
+        """Write the arrays and files.json (replacing any previous index)."""
+        folder = self.folder(self.root)
+        staging = folder + '.tmp'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name in ARRAYS:
+            np.save(os.path.join(staging, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(staging, 'files.json'), 'w') as f:
+            json.dump(self.files, f)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(staging, folder)
+
+    @classmethod
+    def load(cls, root):
+        """Open a saved index; the arrays are memory-mapped, not read."""
+        folder = cls.folder(root)
+        with open(os.path.join(folder, 'files.json')) as f:
+            files = json.load(f)
+        arrays = [np.load(os.path.join(folder, f'{name}.npy'), mmap_mode='r') for name in ARRAYS]
+        return cls(root, files, *arrays)
+
+    def is_current(self):
+        """True when the store holds exactly the indexed files, unchanged."""
+        if set(_store_files(self.root)) != {e['path'] for e in self.files}:
+            return False
+        return all(_unchanged(self.root, e) for e in self.files)
+
+    # ------------------------------------------------------------------
+    # Range queries
+    # ------------------------------------------------------------------
+
+    def locate(self, start=None, end=None):
+        """
+        Index positions [lo, hi) of calls with start <= time < end.
+        """
+        lo = 0 if start is None else int(np.searchsorted(
+            self.timestamps, pd.Timestamp(start).value, side='left'))
+        hi = len(self) if end is None else int(np.searchsorted(
+            self.timestamps, pd.Timestamp(end).value, side='left'))
+        return lo, max(lo, hi)
+
+    def count(self, start=None, end=None):
+        """Number of calls in the window, answered from the index alone."""
+        lo, hi = self.locate(start, end)
+        return hi - lo
+
+    def read(self, start=None, end=None, columns=None):
+        """
+        Read the calls with start <= CallDateAndTimeStart < end.
+
+        Only the row groups holding matching rows are read, and only the
+        requested columns.
+
+        Returns:
+        --------
+        pd.DataFrame
+            Sorted by CallDateAndTimeStart, typed with the call report schema
+        """
+        lo, hi = self.locate(start, end)
+        file_ids = np.asarray(self.file_ids[lo:hi])
+        rows = np.asarray(self.rows[lo:hi])
+        wanted = None if columns is None else list(columns)
+        read_columns = None if wanted is None else \
+            [c for c in dict.fromkeys(wanted + [TIMESTAMP_COLUMN]) if c != PARTITION_COLUMN]
+
+        frames = []
+        for file_id in np.unique(file_ids):
+            entry = self.files[file_id]
+            file_rows = np.sort(rows[file_ids == file_id])
+            starts = np.asarray(entry['row_group_starts'])
+            row_groups = np.searchsorted(starts, file_rows, side='right') - 1
+            groups = np.unique(row_groups)
+            table = pq.ParquetFile(os.path.join(self.root, entry['path'])) \
+                .read_row_groups(groups.tolist(), columns=read_columns)
+            # Row numbers relative to the concatenated row groups that were read
+            read_starts = np.concatenate([[0], np.cumsum(starts[groups + 1] - starts[groups])])
+            positions = file_rows - starts[row_groups] + \
+                read_starts[np.searchsorted(groups, row_groups)]
+            frame = table.take(pa.array(positions)).to_pandas()
+            if wanted is None or PARTITION_COLUMN in wanted:
+                frame[PARTITION_COLUMN] = _partition_value(entry['path'])
+            frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame(columns=wanted)
+        df = apply_schema(pd.concat(frames, ignore_index=True))
+        df = df.sort_values(TIMESTAMP_COLUMN, kind='stable', ignore_index=True)
+        return df if wanted is None else df[wanted]
+
+
+def _partition_value(relative):
+    """'Year&Month' value from a hive path like 'Year&Month=2022-01/part-0.parquet'."""
+    for part in relative.split(os.sep):
+        value = partition_value(part)
+        if value is not None:
+            return value
+    return None
+
+
+def load_or_build_index(root):
+    """Open the store's time index, updating or rebuilding it when the store changed."""
+    previous = None
+    if os.path.exists(os.path.join(TimeIndex.folder(root), 'files.json')):
+        previous = TimeIndex.load(root)
+        if previous.is_current():
+            return previous
+    index = TimeIndex.build(root, previous)
+    index.save()
+    return TimeIndex.load(root)
+
+
+def read_time_range(root, start=None, end=None, columns=None):
+    """Calls with start <= CallDateAndTimeStart < end, via the store's time index."""
+    return load_or_build_index(root).read(start, end, columns)
+
+
+def main():
+    """
+    Build or refresh the time index and optionally read one window.
+    """
+    parser = argparse.ArgumentParser(description='Timestamp index for the call store')
+    parser.add_argument('store', help='call store folder')
+    parser.add_argument('--start', help='inclusive start, e.g. 2022-01-01')
+    parser.add_argument('--end', help='exclusive end, e.g. 2022-04-01')
+    parser.add_argument('--columns', nargs='+')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    index = load_or_build_index(args.store)
+    print(f"Time index of {args.store}: {len(index)} calls in {len(index.files)} files")
+    if args.start or args.end:
+        df = index.read(args.start, args.end, args.columns)
+        print(f"{len(df)} calls in [{args.start}, {args.end})")
+        print(df.head())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Mental Health Datathon - Open-Meteo Response Decoding
+=====================================================
+
+Converts Open-Meteo API responses (FlatBuffer objects returned by
+openmeteo_requests) into a single Arrow table. The size of every response is
+known up front, so one float32 buffer is allocated for all variables of all
+responses and each variable is copied into it exactly once, straight from
+the FlatBuffer memory. Arrow columns are then created as zero-copy views of
+that buffer, with a dictionary-encoded location column.
+
+Tables are written to Parquet (.parquet) or Arrow IPC (.arrow/.feather)
+without going through CSV.
+
+Usage:
+------
+    responses = openmeteo.weather_api(url, params=params)
+    table = decode_responses(responses, params["daily"], names=["Edmonton"])
+    write_weather(table, "edmonton_daily_weather.parquet")
+
+Author: [Mike Baran]
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# Daily weather from HistoricalWeatherAPICall.py: Parquet now, CSV in older data folders
+WEATHER_FILES = ('edmonton_daily_weather.parquet', 'edmonton_daily_weather.csv')
+
+
+def _block(response, resolution):
+    if resolution == 'daily':
+        return response.Daily()
+    if resolution == 'hourly':
+        return response.Hourly()
+    raise ValueError(f"resolution must be 'daily' or 'hourly', got '{resolution}'")
+
+
+def _steps(block):
+    return (block.TimeEnd() - block.Time()) // block.Interval()
+
+
+def decode_responses(responses, variables, names=None, resolution='daily'):
+    """
+    Decode one or more Open-Meteo responses into one Arrow table.
+
+    Parameters:
+    -----------
+    responses : list of WeatherApiResponse
+        Responses from openmeteo_requests.Client.weather_api
+    variables : list of str
+        Variable names in the order they were requested
+    names : list of str, optional
+        Location name for each response; defaults to 'latitude,longitude'
+    resolution : str
+        'daily' or 'hourly' block to decode
+
+    Returns:
+    --------
+    pa.Table
+        'location', 'date' (UTC timestamp) and one float32 column per variable
+    """
+    blocks = [_block(response, resolution) for response in responses]
+    lengths = np.array([_steps(block) for block in blocks], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    total = int(offsets[-1])
+
+    if names is None:
+        names = [f"{r.Latitude():.4f},{r.Longitude():.4f}" for r in responses]
+
+    # One allocation for every value of every response; row j is variable j
+    values = np.empty((len(variables), total), dtype=np.float32)
+    seconds = np.empty(total, dtype=np.int64)
+
+    for i, block in enumerate(blocks):
+        start, stop = offsets[i], offsets[i + 1]
+        if block.VariablesLength() != len(variables):
+            raise ValueError(
+                f"Response {i} has {block.VariablesLength()} variables, expected {len(variables)}")
+        seconds[start:stop] = np.arange(block.Time(), block.TimeEnd(), block.Interval())
+        for j in range(len(variables)):
+            values[j, start:stop] = block.Variables(j).ValuesAsNumpy()
+
+    location = pa.DictionaryArray.from_arrays(
+        pa.array(np.repeat(np.arange(len(blocks), dtype=np.int32), lengths)),
+        pa.array(list(names), type=pa.string()))
+    columns = [location, pa.array(seconds, type=pa.timestamp('s', tz='UTC'))]
+    columns += [pa.array(values[j]) for j in range(len(variables))]
+    return pa.Table.from_arrays(columns, names=['location', 'date'] + list(variables))
+
+
+def to_pandas(table):
+    """Convert a decoded table to pandas, avoiding consolidation copies."""
+    return table.to_pandas(split_blocks=True)
+
+
+def write_weather(table, path):
+    """Write a decoded table to Parquet or Arrow IPC, chosen by extension."""
+    if path.endswith(('.arrow', '.feather')):
+        feather.write_feather(table, path)
+    else:
+        pq.write_table(table, path)
+
+
+def find_weather(data_dir='.'):
+    """
+    Path of the daily weather table in data_dir, preferring Parquet to the
+    legacy CSV (the Parquet path when neither exists).
+    """
+    for name in WEATHER_FILES:
+        path = os.path.join(data_dir, name)
+        if os.path.exists(path):
+            return path
+    return os.path.join(data_dir, WEATHER_FILES[0])
+
+
+def read_weather(path):
+    """
+    Load a weather table written as Parquet, Arrow IPC or (legacy) CSV.
+
+    Returns:
+    --------
+    pd.DataFrame
+    """
+    if path.endswith(('.arrow', '.feather')):
+        return feather.read_feather(path)
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    return pd.read_parquet(path)
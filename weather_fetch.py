@@ -0,0 +1,247 @@
+"""
+Mental Health Datathon - Batch Historical Weather Fetcher
+=========================================================
+
+Fetches daily weather from the Open-Meteo archive API for several locations
+and date ranges. Each (location, range) request is split into monthly or
+yearly tiles; tiles already in the local tile cache are read from disk and
+only missing tiles are requested, concurrently, with a bounded worker pool.
+
+Tiles are cached as one Parquet file per location and period, in a folder
+named after a hash of the request parameters (coordinates, timezone and
+variables), so changing any of them never returns a stale tile. A tile is only
+written to the cache once its whole period lies inside the archive's
+available range, so extending a request to newer dates fetches just the
+new (or still incomplete) tiles.
+
+Usage:
+------
+1. python weather_fetch.py --start 2020-01-01 --end 2024-12-31
+2. Add locations with --location "Calgary:51.0447:-114.0719" (repeatable)
+3. Point --archive-url at a local server to run without network access
+
+Author: [Mike Baran]
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+from retry_requests import retry
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+TIMEZONE = "America/Denver"
+DAILY_VARIABLES = ["temperature_2m_max", "temperature_2m_min", "rain_sum",
+                   "precipitation_hours", "daylight_duration", "sunshine_duration"]
+
+# The archive lags real time by a few days; newer tiles are never cached
+ARCHIVE_LAG_DAYS = 5
+
+Location = namedtuple('Location', ['name', 'latitude', 'longitude'])
+
+LOCATIONS = [
+    # Edmonton, Alberta, Canada: Latitude: 53.5461, Longitude: -113.4938
+    Location('Edmonton', 53.5461, -113.4938),
+]
+
+
+def split_tiles(start_date, end_date, tile='month'):
+    """
+    Split an inclusive date range into whole calendar tiles.
+
+    Parameters:
+    -----------
+    start_date, end_date : str or datetime.date
+        Inclusive range to cover
+    tile : str
+        'month' or 'year'
+
+    Returns:
+    --------
+    list of (pd.Timestamp, pd.Timestamp)
+        Inclusive (first day, last day) of every tile touching the range
+    """
+    freq = {'month': 'MS', 'year': 'YS'}[tile]
+    offset = pd.offsets.MonthBegin(1) if tile == 'month' else pd.offsets.YearBegin(1)
+    start = pd.Timestamp(start_date).to_period(freq[0]).to_timestamp()
+    starts = pd.date_range(start, pd.Timestamp(end_date), freq=freq)
+    return [(s, s + offset - pd.Timedelta(days=1)) for s in starts]
+
+
+def request_key(location, variables, timezone):
+    """Short hash of the request parameters a cached tile depends on."""
+    text = json.dumps([location.latitude, location.longitude, timezone, sorted(variables)])
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+
+
+def tile_path(cache_dir, location, tile_start, tile='month', key=''):
+    """Cache file of one location/tile for the request parameters hashed in key."""
+    label = tile_start.strftime('%Y-%m' if tile == 'month' else '%Y')
+    return os.path.join(cache_dir, location.name, key, f"{label}.parquet")
+
+
+class WeatherFetcher:
+    """
+    Concurrent, tile-cached client for the Open-Meteo archive API.
+
+    Parameters:
+    -----------
+    cache_dir : str
+        Folder of the Parquet tile cache
+    tile : str
+        Tile size, 'month' or 'year'
+    max_workers : int
+        Maximum number of concurrent requests
+    archive_url : str
+        Archive endpoint (a local stub server can be used for testing)
+    variables : list of str
+        Daily variables to request
+    """
+
+    def __init__(self, cache_dir='weather_tiles', tile='month', max_workers=8,
+                 archive_url=ARCHIVE_URL, variables=DAILY_VARIABLES, timezone=TIMEZONE):
+        self.cache_dir = cache_dir
+        self.tile = tile
+        self.max_workers = max_workers
+        self.archive_url = archive_url
+        self.variables = list(variables)
+        self.timezone = timezone
+        self._local = threading.local()
+
+    def _session(self):
+        # One retrying session per worker thread
+        if not hasattr(self._local, 'session'):
+            self._local.session = retry(requests.Session(), retries=5, backoff_factor=0.2)
+        return self._local.session
+
+    def fetch_tile(self, location, tile_start, tile_end):
+        """Request one tile from the archive API and return it as a DataFrame."""
+        params = {
+            "latitude": location.latitude,
+            "longitude": location.longitude,
+            "start_date": tile_start.strftime('%Y-%m-%d'),
+            "end_date": tile_end.strftime('%Y-%m-%d'),
+            "daily": ",".join(self.variables),
+            "timezone": self.timezone,
+        }
+        response = self._session().get(self.archive_url, params=params, timeout=60)
+        response.raise_for_status()
+        daily = response.json()["daily"]
+
+        df = pd.DataFrame({"date": pd.to_datetime(daily["time"])})
+        for variable in self.variables:
+            df[variable] = pd.to_numeric(pd.Series(daily[variable], dtype=object),
+                                         errors='coerce').astype('float32')
+        df.insert(0, "location", location.name)
+        return df
+
+    def _load_or_fetch(self, location, tile_start, tile_end, available_end):
+        key = request_key(location, self.variables, self.timezone)
+        path = tile_path(self.cache_dir, location, tile_start, self.tile, key)
+        if os.path.exists(path):
+            df = pd.read_parquet(path)
+            # Only trust a tile that holds every requested variable
+            if set(self.variables) <= set(df.columns):
+                return df, False
+            logger.warning(f"Cached tile {path} lacks requested variables; fetching it again")
+
+        df = self.fetch_tile(location, tile_start, min(tile_end, available_end))
+        if tile_end <= available_end:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp'
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        return df, True
+
+    def fetch(self, requests_):
+        """
+        Fetch daily weather for several locations and ranges.
+
+        Parameters:
+        -----------
+        requests_ : list of (Location, start_date, end_date)
+            Locations with the inclusive date range wanted for each
+
+        Returns:
+        --------
+        pd.DataFrame
+            'location', 'date' and one column per variable, sorted by
+            location and date
+        """
+        available_end = pd.Timestamp(datetime.date.today()) - pd.Timedelta(days=ARCHIVE_LAG_DAYS)
+
+        jobs = []
+        for location, start_date, end_date in requests_:
+            end = min(pd.Timestamp(end_date), available_end)
+            for tile_start, tile_end in split_tiles(start_date, end, self.tile):
+                jobs.append((location, tile_start, tile_end))
+        jobs = list(dict.fromkeys(jobs))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(
+                lambda job: self._load_or_fetch(*job, available_end), jobs))
+        fetched = sum(1 for _, was_fetched in results if was_fetched)
+        logger.info(f"Weather tiles: {len(jobs) - fetched} from cache, {fetched} fetched")
+
+        frames = [df for df, _ in results]
+        if not frames:
+            return pd.DataFrame(columns=['location', 'date'] + self.variables)
+        weather = pd.concat(frames, ignore_index=True)
+
+        # Trim whole tiles back to the requested ranges
+        keep = pd.Series(False, index=weather.index)
+        for location, start_date, end_date in requests_:
+            keep |= (weather['location'] == location.name) & \
+                weather['date'].between(pd.Timestamp(start_date), pd.Timestamp(end_date))
+        weather = weather[keep].drop_duplicates(['location', 'date'])
+        return weather.sort_values(['location', 'date'], ignore_index=True)
+
+
+def parse_location(text):
+    """Parse 'Name:latitude:longitude' into a Location."""
+    name, latitude, longitude = text.rsplit(':', 2)
+    return Location(name, float(latitude), float(longitude))
+
+
+def main():
+    """
+    Fetch daily weather for the service-area locations into one file.
+    """
+    parser = argparse.ArgumentParser(description='Batch fetch historical daily weather')
+    parser.add_argument('--start', default='2020-01-01')
+    parser.add_argument('--end', default='2024-12-31')
+    parser.add_argument('--location', action='append', type=parse_location,
+                        help='Name:latitude:longitude (default: Edmonton)')
+    parser.add_argument('--tile', choices=['month', 'year'], default='month')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--cache-dir', default='weather_tiles')
+    parser.add_argument('--archive-url', default=ARCHIVE_URL)
+    parser.add_argument('--output', default='daily_weather.parquet',
+                        help='.parquet or .csv output file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    fetcher = WeatherFetcher(cache_dir=args.cache_dir, tile=args.tile,
+                             max_workers=args.workers, archive_url=args.archive_url)
+    locations = args.location or LOCATIONS
+    weather = fetcher.fetch([(location, args.start, args.end) for location in locations])
+
+    if args.output.endswith('.csv'):
+        weather.to_csv(args.output, index=False)
+    else:
+        weather.to_parquet(args.output, index=False)
+    print(f"Daily weather for {len(locations)} location(s) saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()